@@ -0,0 +1,56 @@
+"""unique rating per user and course
+
+Revision ID: 02ad6fe4db7c
+Revises: 8aeb669743d3
+Create Date: 2026-10-17 10:02:47.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '02ad6fe4db7c'
+down_revision: Union[str, None] = '8aeb669743d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Concurrent votes of one user could both be inserted; keep the latest
+    op.execute(
+        """
+        DELETE FROM ratings
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, course_id ORDER BY id DESC
+                ) AS position
+                FROM ratings
+            ) ranked
+            WHERE position > 1
+        )
+        """
+    )
+    # The running aggregate counted the duplicates
+    op.execute(
+        """
+        UPDATE courses c
+        SET rating_sum = r.total,
+            ratings_count = r.votes,
+            rating_average = r.total::float / r.votes,
+            rating = round(r.total::float / r.votes)
+        FROM (
+            SELECT course_id, sum(rating) AS total, count(*) AS votes
+            FROM ratings
+            GROUP BY course_id
+        ) r
+        WHERE c.id = r.course_id
+        """
+    )
+    op.create_unique_constraint('_user_course_rating_uc', 'ratings', ['user_id', 'course_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('_user_course_rating_uc', 'ratings', type_='unique')
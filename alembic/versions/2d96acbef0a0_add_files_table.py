@@ -0,0 +1,50 @@
+"""add files table
+
+Revision ID: 2d96acbef0a0
+Revises: 877ea81ecc9f
+Create Date: 2026-10-16 11:02:17.338410
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d96acbef0a0'
+down_revision: Union[str, None] = '877ea81ecc9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('files',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('course_id', sa.Integer(), nullable=True),
+    sa.Column('assignment_id', sa.Integer(), nullable=True),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('etag', sa.String(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['assignment_id'], ['assignments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['owner_id'], ['our_users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    op.create_index('ix_files_id', 'files', ['id'], unique=False)
+    op.create_index('ix_files_course_id_kind', 'files', ['course_id', 'kind'], unique=False)
+    op.create_index('ix_files_assignment_id_kind_owner_id', 'files', ['assignment_id', 'kind', 'owner_id'], unique=False)
+    # Existing objects are indexed with: python -m backend.services.file_metadata
+
+
+def downgrade() -> None:
+    op.drop_index('ix_files_assignment_id_kind_owner_id', table_name='files')
+    op.drop_index('ix_files_course_id_kind', table_name='files')
+    op.drop_index('ix_files_id', table_name='files')
+    op.drop_table('files')
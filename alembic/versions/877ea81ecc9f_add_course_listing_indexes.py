@@ -0,0 +1,29 @@
+"""add course listing indexes
+
+Revision ID: 877ea81ecc9f
+Revises: d19095de1d8e
+Create Date: 2026-10-16 10:12:41.503127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '877ea81ecc9f'
+down_revision: Union[str, None] = 'd19095de1d8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination of course listings filtered by category or teacher.
+    # Enrollment listings are served by the (user_id, course_id) primary key.
+    op.create_index('ix_courses_category_id', 'courses', ['category', 'id'], unique=False)
+    op.create_index('ix_courses_teacher_id_id', 'courses', ['teacher_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_courses_teacher_id_id', table_name='courses')
+    op.drop_index('ix_courses_category_id', table_name='courses')
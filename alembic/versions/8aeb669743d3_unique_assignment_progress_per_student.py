@@ -0,0 +1,58 @@
+"""unique assignment progress per student
+
+Revision ID: 8aeb669743d3
+Revises: e3c92a13e599
+Create Date: 2026-10-17 09:14:32.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8aeb669743d3'
+down_revision: Union[str, None] = 'e3c92a13e599'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Progress writes used to insert a new record instead of updating the
+    # existing one; keep a completed record if there is one, else the latest
+    op.execute(
+        """
+        DELETE FROM assignment_progress
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY student_id, assignment_id
+                    ORDER BY is_completed DESC NULLS LAST, id DESC
+                ) AS position
+                FROM assignment_progress
+            ) ranked
+            WHERE position > 1
+        )
+        """
+    )
+    # Completed counts were taken over the duplicates
+    op.execute(
+        """
+        UPDATE course_progress cp
+        SET completed_assignments = (
+            SELECT count(*)
+            FROM assignment_progress ap
+            JOIN assignments a ON a.id = ap.assignment_id
+            WHERE ap.student_id = cp.student_id
+              AND a.course_id = cp.course_id
+              AND ap.is_completed
+        )
+        """
+    )
+    op.create_unique_constraint(
+        '_student_assignment_progress_uc', 'assignment_progress', ['student_id', 'assignment_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('_student_assignment_progress_uc', 'assignment_progress', type_='unique')
@@ -0,0 +1,44 @@
+"""add course rating aggregate
+
+Revision ID: e3c92a13e599
+Revises: fa83203390e7
+Create Date: 2026-10-16 12:41:09.552813
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c92a13e599'
+down_revision: Union[str, None] = 'fa83203390e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('courses', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('courses', sa.Column('rating_average', sa.Float(), server_default='0', nullable=False))
+    # Backfill the aggregate from the existing ratings
+    op.execute(
+        """
+        UPDATE courses c
+        SET rating_sum = r.total,
+            ratings_count = r.votes,
+            rating_average = r.total::float / r.votes,
+            rating = round(r.total::float / r.votes)
+        FROM (
+            SELECT course_id, sum(rating) AS total, count(*) AS votes
+            FROM ratings
+            GROUP BY course_id
+        ) r
+        WHERE c.id = r.course_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('courses', 'rating_average')
+    op.drop_column('courses', 'rating_sum')
@@ -0,0 +1,35 @@
+"""unique course progress per student
+
+Revision ID: fa83203390e7
+Revises: 2d96acbef0a0
+Create Date: 2026-10-16 12:05:48.917204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fa83203390e7'
+down_revision: Union[str, None] = '2d96acbef0a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the latest record when per-student updates created duplicates
+    op.execute(
+        """
+        DELETE FROM course_progress cp
+        USING course_progress newer
+        WHERE cp.student_id = newer.student_id
+          AND cp.course_id = newer.course_id
+          AND cp.id < newer.id
+        """
+    )
+    op.create_unique_constraint('_student_course_progress_uc', 'course_progress', ['student_id', 'course_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('_student_course_progress_uc', 'course_progress', type_='unique')
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from backend.config import RedisSettings
+from backend.services.instrumentation import InstrumentedRedis
+
+# Initialize Redis settings
+redis_settings = RedisSettings()
+
+CATALOG_CACHE_KEY = "cache:catalog:courses"
+USER_INVALIDATION_CHANNEL = "cache:users:invalidate"
+TOKEN_REVOCATION_CHANNEL = "cache:tokens:revoked"
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Shared async Redis client, connections are opened on first command"""
+    global _redis_client
+    if _redis_client is None:
+        # One pool per worker, idle connections are pinged before reuse
+        pool = redis.ConnectionPool(
+            host=redis_settings.REDIS_HOST,
+            port=redis_settings.REDIS_PORT,
+            password=redis_settings.REDIS_PASSWORD or None,
+            max_connections=redis_settings.REDIS_MAX_CONNECTIONS,
+            socket_connect_timeout=5,
+            health_check_interval=redis_settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        _redis_client = InstrumentedRedis(connection_pool=pool)
+    return _redis_client
+
+
+async def close_redis() -> None:
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose(close_connection_pool=True)
+        _redis_client = None
+
+
+async def get_catalog(page_key: str) -> Optional[bytes]:
+    """Serialized catalog page, None on a miss or when Redis is unavailable"""
+    try:
+        return await get_redis().hget(CATALOG_CACHE_KEY, page_key)
+    except RedisError as e:
+        print(f"Warning: catalog cache read failed: {str(e)}")
+        return None
+
+
+async def set_catalog(page_key: str, payload: bytes) -> None:
+    # All pages share one hash so a single DEL invalidates them, the TTL is
+    # only set when the hash is created so it counts from the first cached page
+    try:
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.hset(CATALOG_CACHE_KEY, page_key, payload)
+            pipe.expire(CATALOG_CACHE_KEY, redis_settings.CATALOG_CACHE_TTL, nx=True)
+            await pipe.execute()
+    except RedisError as e:
+        print(f"Warning: catalog cache write failed: {str(e)}")
+
+
+async def invalidate_catalog() -> None:
+    """Drop every cached catalog page, called after each course write"""
+    try:
+        await get_redis().delete(CATALOG_CACHE_KEY)
+    except RedisError as e:
+        print(f"Warning: catalog cache invalidation failed: {str(e)}")
+
+
+class TTLCache:
+    """Small in-process TTL/LRU map, each worker keeps its own copy"""
+
+    def __init__(self, ttl: int, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: Any) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# User id -> email of active users whose row matched the token, lets a valid
+# access token skip the user lookup. No endpoint deactivates, deletes or
+# changes the email of a user; code that does must call invalidate_user,
+# otherwise the user keeps authenticating for up to USER_CACHE_TTL seconds
+user_cache = TTLCache(redis_settings.USER_CACHE_TTL, redis_settings.USER_CACHE_SIZE)
+
+# Tokens recently confirmed not to be blacklisted
+token_negative_cache = TTLCache(
+    redis_settings.BLACKLIST_NEGATIVE_CACHE_TTL, redis_settings.BLACKLIST_NEGATIVE_CACHE_SIZE
+)
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Forget a user in every worker, call after deleting or deactivating it"""
+    user_cache.discard(user_id)
+    try:
+        await get_redis().publish(USER_INVALIDATION_CHANNEL, user_id)
+    except RedisError as e:
+        # Other workers drop the entry when its TTL runs out
+        print(f"Warning: user invalidation broadcast failed: {str(e)}")
+
+
+async def listen_for_invalidations() -> None:
+    """Apply invalidations published by other workers, runs for the app lifetime"""
+    while True:
+        try:
+            async with get_redis().pubsub() as pubsub:
+                await pubsub.subscribe(USER_INVALIDATION_CHANNEL, TOKEN_REVOCATION_CHANNEL)
+                # Messages may have been missed while disconnected
+                user_cache.clear()
+                token_negative_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    if message["channel"] == USER_INVALIDATION_CHANNEL.encode():
+                        user_cache.discard(int(message["data"]))
+                    else:
+                        token_negative_cache.discard(message["data"].decode())
+        except RedisError as e:
+            print(f"Warning: cache invalidation listener disconnected: {str(e)}")
+            user_cache.clear()
+            token_negative_cache.clear()
+            await asyncio.sleep(5)
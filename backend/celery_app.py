@@ -1,4 +1,8 @@
+import asyncio
+from typing import Optional
+
 from celery import Celery
+from redis.exceptions import RedisError
 from asgiref.sync import async_to_sync
 import os
 
@@ -7,6 +11,14 @@ celery_app = Celery(
     broker=os.getenv("REDIS_URL", "redis://redis:6379/0"),
     backend=os.getenv("REDIS_URL", "redis://redis:6379/0")
 )
+# Tasks are queued from request handlers, fail fast instead of retrying the
+# result backend connection for about 20 seconds when Redis is down
+celery_app.conf.result_backend_transport_options = {
+    "retry_policy": {"max_retries": 3}
+}
+
+# Purge owners are kept as long as Celery keeps task results by default
+PURGE_OWNER_TTL = 24 * 3600  # seconds
 
 
 @celery_app.task
@@ -16,3 +28,63 @@ def send_reset_password_email_task(email: str, token: str):
     )  # Import inside the task
 
     async_to_sync(send_reset_password_email)(email, token)
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 5},
+)
+def purge_s3_prefixes_task(self, prefixes: list):
+    from backend.services.storage import purge_prefixes  # Import inside the task
+
+    def report_progress(deleted: int):
+        self.update_state(
+            state="PROGRESS", meta={"deleted": deleted, "prefixes": prefixes}
+        )
+
+    return purge_prefixes(prefixes, on_progress=report_progress)
+
+
+def _purge_owner_key(task_id: str) -> str:
+    return f"purge:owner:{task_id}"
+
+
+def _queue_purge(prefixes: list) -> str:
+    return purge_s3_prefixes_task.apply_async(args=[prefixes], retry=False).id
+
+
+async def schedule_s3_purge(prefixes: list, background_tasks, owner_id: int) -> Optional[str]:
+    """Queue a purge and return the task id.
+
+    The id is recorded against ``owner_id`` so only that user (or an admin)
+    can poll its status. When the broker is unreachable the purge runs
+    in-process after the response is sent (FastAPI BackgroundTasks) and
+    None is returned.
+    """
+    from backend.cache import get_redis  # Import inside, workers do not use the app cache
+
+    try:
+        # Publishing connects to the broker synchronously, keep it off the event loop
+        task_id = await asyncio.to_thread(_queue_purge, prefixes)
+    except Exception as e:
+        print(f"Warning: could not queue S3 purge, running it in-process: {str(e)}")
+        from backend.services.storage import purge_prefixes
+
+        background_tasks.add_task(purge_prefixes, prefixes)
+        return None
+
+    try:
+        await get_redis().set(_purge_owner_key(task_id), owner_id, ex=PURGE_OWNER_TTL)
+    except RedisError as e:
+        print(f"Warning: purge owner not recorded, only admins can poll it: {str(e)}")
+    return task_id
+
+
+async def get_purge_owner(task_id: str) -> Optional[int]:
+    """User who scheduled a purge, None when unknown or expired"""
+    from backend.cache import get_redis
+
+    owner_id = await get_redis().get(_purge_owner_key(task_id))
+    return int(owner_id) if owner_id is not None else None
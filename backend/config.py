@@ -1,8 +1,37 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from pydantic_settings import BaseSettings
 
 
+# Engine defaults per environment, any DB_* variable overrides its profile value
+DATABASE_POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    "development": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "echo": True,
+    },
+    "test": {
+        "pool_size": 2,
+        "max_overflow": 5,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "echo": False,
+    },
+    "production": {
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "echo": False,
+    },
+}
+
+
 class DatabaseSettings(BaseSettings):
     DATABASE_PORT: int
     POSTGRES_PASSWORD: str
@@ -10,11 +39,62 @@ class DatabaseSettings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_HOST: str
 
+    ENVIRONMENT: str = "development"
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: Optional[int] = None
+    DB_POOL_RECYCLE: Optional[int] = None
+    DB_POOL_PRE_PING: Optional[bool] = None
+    DB_ECHO: Optional[bool] = None
+
+    def engine_options(self) -> Dict[str, Any]:
+        """Keyword arguments for create_engine based on ENVIRONMENT and DB_* overrides"""
+        if self.ENVIRONMENT not in DATABASE_POOL_PROFILES:
+            raise ValueError(
+                f"Unknown ENVIRONMENT '{self.ENVIRONMENT}', "
+                f"expected one of {', '.join(DATABASE_POOL_PROFILES)}"
+            )
+        options = dict(DATABASE_POOL_PROFILES[self.ENVIRONMENT])
+        overrides = {
+            "pool_size": self.DB_POOL_SIZE,
+            "max_overflow": self.DB_MAX_OVERFLOW,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+            "echo": self.DB_ECHO,
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return options
+
 
 class RedisSettings(BaseSettings):
     REDIS_PASSWORD: str
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds
+    CATALOG_CACHE_TTL: int = 300  # seconds
+    USER_CACHE_TTL: int = 60  # seconds
+    USER_CACHE_SIZE: int = 10000
+    COURSE_ACCESS_TTL: int = 3600  # seconds
+    BLACKLIST_NEGATIVE_CACHE_TTL: int = 30  # seconds
+    BLACKLIST_NEGATIVE_CACHE_SIZE: int = 10000
+    BLACKLIST_RETRY_INTERVAL: float = 10.0  # seconds Redis is skipped after a failed check
+    RATE_LIMIT_ENABLED: bool = True
+
+
+class PasswordHashSettings(BaseSettings):
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # defaults to the CPU count
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 32
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 10.0  # seconds
+
+
+class QueryBudgetSettings(BaseSettings):
+    # off | warn | raise, raise is meant for tests and CI
+    QUERY_BUDGET_MODE: str = "off"
+    QUERY_BUDGET_DEFAULT: Optional[int] = None  # for routes without a declared budget
+    QUERY_REPEAT_THRESHOLD: int = 5  # identical statements per request reported as N+1
 
 
 class AWSSettings(BaseSettings):
@@ -23,7 +103,9 @@ class AWSSettings(BaseSettings):
     BUCKET_NAME: str = "files-for-team-project"  # Default value
 
 
-class AppSettings(DatabaseSettings, RedisSettings, AWSSettings):
+class AppSettings(
+    DatabaseSettings, RedisSettings, PasswordHashSettings, QueryBudgetSettings, AWSSettings
+):
     class Config:
         env_file = "./.env"
         extra = "allow"
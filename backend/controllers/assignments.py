@@ -1,14 +1,28 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, Form
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    File,
+    UploadFile,
+    Form,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from fastapi.responses import StreamingResponse
-from sqlalchemy import func
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
 
-from backend.dependencies.getdb import get_db
-from backend.models import Course, OurUsers, Section, AssignmentProgress, CourseProgress
+from backend.celery_app import schedule_s3_purge
+from backend.dependencies.getdb import get_async_db
+from backend.dependencies.query_budget import QueryBudget
+from backend.models import Course, FileMetadata, OurUsers, Section, AssignmentProgress
 from backend.models.assignment import Assignment
 from backend.models.comment import Comment
 from backend.oauth2 import get_current_user_jwt
@@ -20,8 +34,21 @@ from backend.schemas.assignment import (
     AssignmentWithProgressResponse,
     AssignmentWithFileCreate,
 )
-from backend.schemas.file import FileUploadResponse
-from backend.controllers.filesForCourse import validate_file, s3, BUCKET_NAME
+from backend.schemas.file import FileUploadResponse, PresignedDownloadResponse
+from backend.controllers.filesForCourse import (
+    validate_file,
+    validate_file_access,
+    get_presigned_download,
+    s3,
+    BUCKET_NAME,
+    MAX_FILE_SIZE,
+)
+from backend.services.storage import upload_stream
+from backend.services.file_metadata import TASK_FILE, delete_task_files, record_upload, task_files
+from backend.services import progress_service
+from backend.services.course_access import get_course_access
+from backend.services.http_cache import changes, conditional_get
+from backend.responses import json_response
 import uuid
 import base64
 
@@ -30,12 +57,19 @@ router = APIRouter(
     tags=["Assignments"],
 )
 
+assignment_list_adapter = TypeAdapter(List[AssignmentResponse])
+
 
-@router.post("", status_code=status.HTTP_201_CREATED, response_model=AssignmentResponse)
+@router.post(
+    "",
+    status_code=status.HTTP_201_CREATED,
+    response_model=AssignmentResponse,
+    dependencies=[Depends(QueryBudget(8))],
+)
 async def create_assignment(
     course_id: int,
     assignment_data: AssignmentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     # Check if the user is a teacher or admin
@@ -43,14 +77,13 @@ async def create_assignment(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     # Check if the course exists AND belongs to the teacher (or if the user is an admin)
-    course = (
-        db.query(Course)
-        .filter(Course.id == course_id)
-        .filter(
+    course = await db.scalar(
+        select(Course)
+        .where(Course.id == course_id)
+        .where(
             (Course.teacher_id == current_user["user_id"])
             | (current_user.get("role") == "admin")
         )
-        .first()
     )
     if not course:
         raise HTTPException(
@@ -59,12 +92,10 @@ async def create_assignment(
 
     # Validate section_id if provided
     if assignment_data.section_id:
-        section = (
-            db.query(Section)
-            .filter(
+        section = await db.scalar(
+            select(Section).where(
                 Section.id == assignment_data.section_id, Section.course_id == course_id
             )
-            .first()
         )
         if not section:
             raise HTTPException(
@@ -76,19 +107,19 @@ async def create_assignment(
     # If section_id is provided, get the max order in that section
     # Otherwise, get the max order in assignments without a section
     if assignment_data.section_id:
-        max_order_result = db.query(
-            func.max(Assignment.order)
-        ).filter(
-            Assignment.course_id == course_id,
-            Assignment.section_id == assignment_data.section_id
-        ).scalar()
+        max_order_result = await db.scalar(
+            select(func.max(Assignment.order)).where(
+                Assignment.course_id == course_id,
+                Assignment.section_id == assignment_data.section_id
+            )
+        )
     else:
-        max_order_result = db.query(
-            func.max(Assignment.order)
-        ).filter(
-            Assignment.course_id == course_id,
-            Assignment.section_id.is_(None)
-        ).scalar()
+        max_order_result = await db.scalar(
+            select(func.max(Assignment.order)).where(
+                Assignment.course_id == course_id,
+                Assignment.section_id.is_(None)
+            )
+        )
 
     # Set order to max_order + 1 or 1 if no assignments exist
     new_order = (max_order_result or 0) + 1
@@ -102,40 +133,17 @@ async def create_assignment(
 
     db.add(new_assignment)
     try:
-        db.commit()
-        db.refresh(new_assignment)
+        await db.flush()
+        # Count the assignment in enrolled students' progress in the same transaction
+        await progress_service.add_assignment_to_progress(db, course_id)
+        await db.commit()
+        await db.refresh(new_assignment)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Error creating assignment: {str(e)}"
         )
 
-    # Update total assignments count in all student progress records
-    course_students = course.students
-    for student in course_students:
-        # Get or create course progress
-        course_progress = (
-            db.query(CourseProgress)
-            .filter(
-                CourseProgress.student_id == student.id,
-                CourseProgress.course_id == course_id,
-            )
-            .first()
-        )
-        
-        if not course_progress:
-            course_progress = CourseProgress(
-                student_id=student.id,
-                course_id=course_id,
-                completed_assignments=0,
-                total_assignments=1
-            )
-            db.add(course_progress)
-        else:
-            course_progress.total_assignments += 1
-        
-        db.commit()
-
     return new_assignment
 
 
@@ -148,7 +156,7 @@ async def create_assignment_with_file(
     teacher_comments: Optional[str] = Form(None),
     section_id: Optional[int] = Form(None),
     file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Create a new assignment with an optional file upload"""
@@ -157,14 +165,13 @@ async def create_assignment_with_file(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     # Check if the course exists AND belongs to the teacher (or if the user is an admin)
-    course = (
-        db.query(Course)
-        .filter(Course.id == course_id)
-        .filter(
+    course = await db.scalar(
+        select(Course)
+        .where(Course.id == course_id)
+        .where(
             (Course.teacher_id == current_user["user_id"])
             | (current_user.get("role") == "admin")
         )
-        .first()
     )
     if not course:
         raise HTTPException(
@@ -177,12 +184,10 @@ async def create_assignment_with_file(
 
     # Validate section_id if provided
     if section_id:
-        section = (
-            db.query(Section)
-            .filter(
+        section = await db.scalar(
+            select(Section).where(
                 Section.id == section_id, Section.course_id == course_id
             )
-            .first()
         )
         if not section:
             raise HTTPException(
@@ -194,19 +199,19 @@ async def create_assignment_with_file(
     # If section_id is provided, get the max order in that section
     # Otherwise, get the max order in assignments without a section
     if section_id:
-        max_order_result = db.query(
-            func.max(Assignment.order)
-        ).filter(
-            Assignment.course_id == course_id,
-            Assignment.section_id == section_id
-        ).scalar()
+        max_order_result = await db.scalar(
+            select(func.max(Assignment.order)).where(
+                Assignment.course_id == course_id,
+                Assignment.section_id == section_id
+            )
+        )
     else:
-        max_order_result = db.query(
-            func.max(Assignment.order)
-        ).filter(
-            Assignment.course_id == course_id,
-            Assignment.section_id.is_(None)
-        ).scalar()
+        max_order_result = await db.scalar(
+            select(func.max(Assignment.order)).where(
+                Assignment.course_id == course_id,
+                Assignment.section_id.is_(None)
+            )
+        )
 
     # Set order to max_order + 1 or 1 if no assignments exist
     new_order = (max_order_result or 0) + 1
@@ -224,10 +229,13 @@ async def create_assignment_with_file(
 
     db.add(new_assignment)
     try:
-        db.commit()
-        db.refresh(new_assignment)
+        await db.flush()
+        # Count the assignment in enrolled students' progress in the same transaction
+        await progress_service.add_assignment_to_progress(db, course_id)
+        await db.commit()
+        await db.refresh(new_assignment)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Error creating assignment: {str(e)}"
         )
@@ -237,48 +245,28 @@ async def create_assignment_with_file(
     if file and file.filename:  # Only process if file is provided and has a filename
         try:
             # Validate file
-            file_content = await validate_file(file)
+            await validate_file(file)
 
             # Create a structured key for assignments with uniqueness
             file_key = f"assignments/{new_assignment.id}/task/{uuid.uuid4().hex}_{file.filename}"
 
-            s3.put_object(
-                Bucket=BUCKET_NAME,
-                Key=file_key,
-                Body=file_content,
-                ContentType=file.content_type,
+            uploaded = await upload_stream(file, file_key, MAX_FILE_SIZE)
+            await record_upload(
+                db,
+                file_key,
+                size=uploaded["size"],
+                etag=uploaded["etag"],
+                content_type=file.content_type,
+                owner_id=current_user.get("user_id"),
+                course_id=course_id,
+                assignment_id=new_assignment.id,
             )
+            await db.commit()
 
         except Exception as e:
             print(f"Error uploading file: {str(e)}")
             # Don't raise an exception here since file is optional
 
-    # Update total assignments count in all student progress records
-    course_students = course.students
-    for student in course_students:
-        # Get or create course progress
-        course_progress = (
-            db.query(CourseProgress)
-            .filter(
-                CourseProgress.student_id == student.id,
-                CourseProgress.course_id == course_id,
-            )
-            .first()
-        )
-        
-        if not course_progress:
-            course_progress = CourseProgress(
-                student_id=student.id,
-                course_id=course_id,
-                completed_assignments=0,
-                total_assignments=1
-            )
-            db.add(course_progress)
-        else:
-            course_progress.total_assignments += 1
-        
-        db.commit()
-
     # Prepare response with file information
     assignment_dict = {
         "id": new_assignment.id,
@@ -294,19 +282,9 @@ async def create_assignment_with_file(
         "files": []
     }
 
-    # Add the uploaded file to the response if it exists
+    # Add the uploaded file to the response if it was recorded
     if file_key:
-        try:
-            response = s3.head_object(Bucket=BUCKET_NAME, Key=file_key)
-            assignment_dict["files"] = [{
-                "key": file_key,
-                "size": response["ContentLength"],
-                "last_modified": response["LastModified"],
-                "filename": file_key.split("/")[-1]
-            }]
-        except Exception as e:
-            print(f"Error getting file info for assignment {new_assignment.id}: {str(e)}")
-            assignment_dict["files"] = []
+        assignment_dict["files"] = (await task_files(db, [new_assignment.id]))[new_assignment.id]
 
     return AssignmentResponse(**assignment_dict)
 
@@ -315,28 +293,43 @@ async def create_assignment_with_file(
 async def get_assignment(
     course_id: int,
     assignment_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
-    user: Optional[OurUsers] = (
-        db.query(OurUsers).filter(OurUsers.id == current_user["user_id"]).first()
+    user: Optional[OurUsers] = await db.scalar(
+        select(OurUsers).where(OurUsers.id == current_user["user_id"])
     )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    assignment = (
-        db.query(Assignment)
-        .filter(Assignment.id == assignment_id, Assignment.course_id == course_id)
-        .first()
+    assignment = await db.scalar(
+        select(Assignment).where(
+            Assignment.id == assignment_id, Assignment.course_id == course_id
+        )
     )
 
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
+    # Only an existing assignment can be answered with 304
+    not_modified = await conditional_get(
+        request,
+        response,
+        db,
+        changes(Assignment, Assignment.id == assignment_id),
+        changes(Comment, Comment.assignment_id == assignment_id),
+    )
+    if not_modified is not None:
+        return not_modified
+
     # Get comments for the assignment
-    comments = db.query(Comment).filter(Comment.assignment_id == assignment_id).all()
+    comments = (
+        await db.scalars(select(Comment).where(Comment.assignment_id == assignment_id))
+    ).all()
 
     # Convert to response model
     assignment_dict = assignment.to_dict()
@@ -351,30 +344,28 @@ async def get_assignment(
 async def get_assignment_with_progress(
     course_id: int,
     assignment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get assignment with the current user's progress"""
     user_id = current_user.get("user_id")
 
     # Check if assignment exists and belongs to the course
-    assignment = (
-        db.query(Assignment)
-        .filter(Assignment.id == assignment_id, Assignment.course_id == course_id)
-        .first()
+    assignment = await db.scalar(
+        select(Assignment).where(
+            Assignment.id == assignment_id, Assignment.course_id == course_id
+        )
     )
 
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
     # Get progress for this assignment
-    progress = (
-        db.query(AssignmentProgress)
-        .filter(
+    progress = await db.scalar(
+        select(AssignmentProgress).where(
             AssignmentProgress.assignment_id == assignment_id,
             AssignmentProgress.student_id == user_id,
         )
-        .first()
     )
 
     # Convert to response model
@@ -402,16 +393,18 @@ async def get_assignment_with_progress(
     return AssignmentWithProgressResponse(**assignment_dict)
 
 
-@router.get("", response_model=List[AssignmentResponse])
+@router.get("", response_model=List[AssignmentResponse], dependencies=[Depends(QueryBudget(6))])
 async def get_course_assignments(
     course_id: int,
+    request: Request,
+    response: Response,
     section_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get all assignments for a course, optionally filtered by section"""
     # Check if course exists
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
@@ -422,11 +415,7 @@ async def get_course_assignments(
 
     if not (is_teacher or is_admin):
         # Check if student is enrolled
-        is_enrolled = False
-        for student in course.students:
-            if student.id == user_id:
-                is_enrolled = True
-                break
+        is_enrolled = (await get_course_access(db, user_id, course_id)).is_enrolled
 
         if not is_enrolled:
             raise HTTPException(
@@ -435,14 +424,12 @@ async def get_course_assignments(
             )
 
     # Build query
-    query = db.query(Assignment).filter(Assignment.course_id == course_id)
+    criteria = [Assignment.course_id == course_id]
 
     # Filter by section if provided
     if section_id is not None:
-        section = (
-            db.query(Section)
-            .filter(Section.id == section_id, Section.course_id == course_id)
-            .first()
+        section = await db.scalar(
+            select(Section).where(Section.id == section_id, Section.course_id == course_id)
         )
 
         if not section:
@@ -451,12 +438,33 @@ async def get_course_assignments(
                 detail="Section not found or does not belong to this course",
             )
 
-        query = query.filter(Assignment.section_id == section_id)
+        criteria.append(Assignment.section_id == section_id)
+
+    query = select(Assignment).where(*criteria)
+
+    # Answered before the assignments and their files are loaded
+    not_modified = await conditional_get(
+        request,
+        response,
+        db,
+        changes(Assignment, *criteria),
+        changes(
+            FileMetadata,
+            FileMetadata.kind == TASK_FILE,
+            FileMetadata.assignment_id.in_(select(Assignment.id).where(*criteria)),
+        ),
+    )
+    if not_modified is not None:
+        return not_modified
 
     # Order by section and then by order within section
-    assignments = query.order_by(Assignment.section_id, Assignment.order).all()
+    assignments = (
+        await db.scalars(query.order_by(Assignment.section_id, Assignment.order))
+    ).all()
+
+    # Task files of all assignments from the files table in one query
+    files_by_assignment = await task_files(db, (a.id for a in assignments))
 
-    # Get file information for each assignment
     result = []
     for assignment in assignments:
         assignment_dict = {
@@ -470,33 +478,11 @@ async def get_course_assignments(
             "order": assignment.order,
             "created_at": assignment.created_at,
             "updated_at": assignment.updated_at,
-            "files": []
+            "files": files_by_assignment.get(assignment.id, []),
         }
-        
-        # Get files for this assignment from S3
-        try:
-            prefix = f"assignments/{assignment.id}/task/"
-            response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix)
-            
-            if "Contents" in response:
-                files = []
-                for item in response["Contents"]:
-                    files.append({
-                        "key": item["Key"],
-                        "size": item["Size"],
-                        "last_modified": item["LastModified"],
-                        "filename": item["Key"].split("/")[-1]
-                    })
-                assignment_dict["files"] = files
-            else:
-                assignment_dict["files"] = []
-        except Exception as e:
-            print(f"Error getting files for assignment {assignment.id}: {str(e)}")
-            assignment_dict["files"] = []
-
         result.append(AssignmentResponse(**assignment_dict))
 
-    return result
+    return json_response(assignment_list_adapter.dump_json(result), response)
 
 
 @router.put("/{assignment_id}", response_model=AssignmentResponse)
@@ -511,7 +497,7 @@ async def update_assignment(
     order: Optional[int] = Form(None),
     file: Optional[UploadFile] = File(None),
     delete_files: bool = Form(False),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Update an assignment with optional file upload"""
@@ -520,17 +506,17 @@ async def update_assignment(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     # Check if assignment exists and belongs to the course
-    assignment = (
-        db.query(Assignment)
-        .filter(Assignment.id == assignment_id, Assignment.course_id == course_id)
-        .first()
+    assignment = await db.scalar(
+        select(Assignment).where(
+            Assignment.id == assignment_id, Assignment.course_id == course_id
+        )
     )
 
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
     # Check if user is the teacher of the course or admin
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if current_user.get("role") != "admin" and course.teacher_id != current_user.get(
         "user_id"
     ):
@@ -542,13 +528,11 @@ async def update_assignment(
     # Validate section_id if being updated
     if section_id is not None:
         if section_id > 0:  # Allow setting to None by using 0
-            section = (
-                db.query(Section)
-                .filter(
+            section = await db.scalar(
+                select(Section).where(
                     Section.id == section_id,
                     Section.course_id == course_id,
                 )
-                .first()
             )
             if not section:
                 raise HTTPException(
@@ -575,26 +559,27 @@ async def update_assignment(
     try:
         # Delete existing files if requested
         if delete_files:
-            prefix = f"assignments/{assignment_id}/task/"
-            response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix)
-            if "Contents" in response:
-                for item in response["Contents"]:
-                    s3.delete_object(Bucket=BUCKET_NAME, Key=item["Key"])
+            await delete_task_files(db, assignment_id)
 
         # Upload new file if provided
         if file and file.filename:  # Check both file and filename
             # Validate file
-            file_content = await validate_file(file)
+            await validate_file(file)
 
             # Create a structured key for assignments with uniqueness
             key = f"assignments/{assignment_id}/task/{uuid.uuid4().hex}_{file.filename}"
 
             # Upload to S3
-            s3.put_object(
-                Bucket=BUCKET_NAME,
-                Key=key,
-                Body=file_content,
-                ContentType=file.content_type,
+            uploaded = await upload_stream(file, key, MAX_FILE_SIZE)
+            await record_upload(
+                db,
+                key,
+                size=uploaded["size"],
+                etag=uploaded["etag"],
+                content_type=file.content_type,
+                owner_id=current_user.get("user_id"),
+                course_id=course_id,
+                assignment_id=assignment_id,
             )
 
     except Exception as e:
@@ -604,10 +589,10 @@ async def update_assignment(
 
     # Commit changes to database
     try:
-        db.commit()
-        db.refresh(assignment)
+        await db.commit()
+        await db.refresh(assignment)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error updating assignment: {str(e)}",
@@ -628,23 +613,8 @@ async def update_assignment(
         "files": []
     }
 
-    # Get files for this assignment from S3
-    try:
-        prefix = f"assignments/{assignment_id}/task/"
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix)
-        
-        if "Contents" in response:
-            files = []
-            for item in response["Contents"]:
-                files.append({
-                    "key": item["Key"],
-                    "size": item["Size"],
-                    "last_modified": item["LastModified"],
-                    "filename": item["Key"].split("/")[-1]
-                })
-            assignment_dict["files"] = files
-    except Exception as e:
-        print(f"Error getting files for assignment {assignment_id}: {str(e)}")
+    # Get files for this assignment
+    assignment_dict["files"] = (await task_files(db, [assignment_id]))[assignment_id]
 
     return AssignmentResponse(**assignment_dict)
 
@@ -653,7 +623,8 @@ async def update_assignment(
 async def delete_assignment(
     course_id: int,
     assignment_id: int,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Delete an assignment"""
@@ -662,17 +633,17 @@ async def delete_assignment(
         raise HTTPException(status_code=403, detail="Not authorized")
 
     # Check if assignment exists and belongs to the course
-    assignment = (
-        db.query(Assignment)
-        .filter(Assignment.id == assignment_id, Assignment.course_id == course_id)
-        .first()
+    assignment = await db.scalar(
+        select(Assignment).where(
+            Assignment.id == assignment_id, Assignment.course_id == course_id
+        )
     )
 
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
     # Check if user is the teacher of the course or admin
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if current_user.get("role") != "admin" and course.teacher_id != current_user.get(
         "user_id"
     ):
@@ -681,86 +652,47 @@ async def delete_assignment(
             detail="Not authorized to delete assignments for this course",
         )
         
-    # Delete associated files from S3
-    try:
-        # 1. Delete task files
-        task_prefix = f"assignments/{assignment_id}/task/"
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=task_prefix)
-        if "Contents" in response:
-            for item in response["Contents"]:
-                s3.delete_object(Bucket=BUCKET_NAME, Key=item["Key"])
-                print(f"Deleted task file: {item['Key']}")
-                
-        # 2. Delete student submissions
-        submissions_prefix = f"assignments/{assignment_id}/submissions/"
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=submissions_prefix)
-        if "Contents" in response:
-            for item in response["Contents"]:
-                s3.delete_object(Bucket=BUCKET_NAME, Key=item["Key"])
-                print(f"Deleted submission file: {item['Key']}")
-    except Exception as e:
-        print(f"Error deleting files for assignment {assignment_id}: {str(e)}")
-        # Continue with assignment deletion even if file deletion fails
-
-    # Delete assignment
-    db.delete(assignment)
-    db.commit()
-
-    # Update total assignments count in all student progress records
-    course_students = course.students
-    for student in course_students:
-        progress = (
-            db.query(AssignmentProgress)
-            .filter(
-                AssignmentProgress.student_id == student.id,
-                AssignmentProgress.course_id == course_id,
-            )
-            .first()
-        )
-
-        if progress and progress.total_assignments > 0:
-            progress.total_assignments -= 1
-            db.commit()
+    # Delete assignment together with its progress records
+    await progress_service.remove_assignments_from_progress(db, course_id, [assignment_id])
+    await db.delete(assignment)
+    await db.commit()
+
+    # Task files and submissions are removed in the background
+    purge_task_id = await schedule_s3_purge(
+        [f"assignments/{assignment_id}/"], background_tasks, current_user.get("user_id")
+    )
 
-    return {"message": "Assignment deleted successfully"}
+    return {"message": "Assignment deleted successfully", "purge_task_id": purge_task_id}
 
 
-@router.get("/{assignment_id}/files/{file_key:path}", response_class=StreamingResponse)
+@router.get("/{assignment_id}/files/{file_key:path}", response_model=None)
 async def download_assignment_file(
     course_id: int,
     assignment_id: int,
     file_key: str,
-    db: Session = Depends(get_db),
+    presigned: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
-):
+) -> Union[StreamingResponse, PresignedDownloadResponse]:
     """Download a file associated with an assignment"""
     # Check if assignment exists and belongs to the course
-    assignment = (
-        db.query(Assignment)
-        .filter(Assignment.id == assignment_id, Assignment.course_id == course_id)
-        .first()
+    assignment = await db.scalar(
+        select(Assignment).where(
+            Assignment.id == assignment_id, Assignment.course_id == course_id
+        )
     )
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
-    # Check if user has permission to view (teacher, admin, or enrolled student)
-    user_id = current_user.get("user_id")
-    is_teacher = assignment.course.teacher_id == user_id
-    is_admin = current_user.get("role") == "admin"
+    # Only files of this assignment can be downloaded through it
+    if not file_key.startswith(f"assignments/{assignment_id}/"):
+        raise HTTPException(status_code=404, detail="File not found")
 
-    if not (is_teacher or is_admin):
-        # Check if student is enrolled
-        is_enrolled = False
-        for student in assignment.course.students:
-            if student.id == user_id:
-                is_enrolled = True
-                break
+    # Teacher, admin, enrolled student, and only the owner for submissions
+    await validate_file_access(db, file_key, current_user)
 
-        if not is_enrolled:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to download this file",
-            )
+    if presigned:
+        return await get_presigned_download(db, file_key)
 
     try:
         # Get file from S3
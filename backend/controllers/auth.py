@@ -6,15 +6,16 @@ from fastapi import APIRouter, Cookie, Depends, HTTPException, Response, status,
 
 from jose import jwt
 from pydantic import BaseModel, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapi.security import OAuth2PasswordRequestForm
 
 
-from backend.dependencies.getdb import get_db
+from backend.dependencies.getdb import get_async_db
+from backend.dependencies.rate_limit import RateLimiter
 from backend.models.ourusers import OurUsers
 from backend.oauth2 import (
-    bcrypt_context,
     authenticate_user,
     create_access_token,
     get_current_user_jwt,
@@ -28,12 +29,18 @@ from backend.services.token_blacklist import add_to_blacklist
 
 from backend.schemas.user import CreateUserRequest, UserResponse, UserLoginResponseAuth
 from backend.schemas.auth import UserLogin, LoginResponse
+from backend.services.password_hasher import hash_password
 from backend.services.security import generate_password_reset_token
 from backend.services.user_service import check_if_user_exists
 from backend.celery_app import send_reset_password_email_task
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+### Throttling of endpoints that hash passwords or send emails ###
+login_rate_limit = RateLimiter("login", limit=10, window=60)
+registration_rate_limit = RateLimiter("register", limit=5, window=60)
+password_reset_rate_limit = RateLimiter("reset-password", limit=5, window=900)
+
 
 ### ROUTE FOR REGISTRATION ###
 @router.get("/me", response_model=UserLoginResponseAuth)
@@ -51,68 +58,68 @@ async def logout(
     access_token: Optional[str] = Cookie(None, alias="access_token"),
     refresh_token: Optional[str] = Cookie(None, alias="refresh_token"),
 ):
-    if access_token:
-        # Add access token to blacklist with its remaining expiration time
+    # Blacklist both tokens for their remaining lifetime
+    revoked = {}
+    for token in (access_token, refresh_token):
+        if not token:
+            continue
         try:
-            payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             exp = payload.get("exp")
             if exp:
                 current_time = datetime.now(timezone.utc).timestamp()
                 remaining_time = int(exp - current_time)
                 if remaining_time > 0:
-                    add_to_blacklist(access_token, remaining_time)
-        except jwt.JWTError:
-            pass  # Token is already invalid, no need to blacklist
-
-    if refresh_token:
-        # Add refresh token to blacklist with its remaining expiration time
-        try:
-            payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-            exp = payload.get("exp")
-            if exp:
-                current_time = datetime.now(timezone.utc).timestamp()
-                remaining_time = int(exp - current_time)
-                if remaining_time > 0:
-                    add_to_blacklist(refresh_token, remaining_time)
+                    revoked[token] = remaining_time
         except jwt.JWTError:
             pass  # Token is already invalid, no need to blacklist
+    if revoked:
+        await add_to_blacklist(revoked)
 
     response.delete_cookie(key="access_token")
     response.delete_cookie(key="refresh_token")
     return {"message": "Successfully logged out"}
 
 
-@router.post("/users", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/users",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(registration_rate_limit)],
+)
 async def create_user(
-    create_user_request: CreateUserRequest, db: Session = Depends(get_db)
+    create_user_request: CreateUserRequest, db: AsyncSession = Depends(get_async_db)
 ):
-    check_if_user_exists(db, create_user_request.email)
+    await check_if_user_exists(db, create_user_request.email)
 
     create_user_model = OurUsers(
         email=create_user_request.email,
-        hashed_password=bcrypt_context.hash(create_user_request.password),
+        hashed_password=await hash_password(create_user_request.password),
         first_name=create_user_request.first_name,
         last_name=create_user_request.last_name,
         role=UserRole.STUDENT.value,
         is_active=True,
     )
     db.add(create_user_model)
-    db.commit()
-    db.refresh(create_user_model)
+    await db.commit()
+    await db.refresh(create_user_model)
     return create_user_model
 
 
 ### ROUTE FOR LOGIN ###
-@router.post("/token", response_model=LoginResponse)
+@router.post(
+    "/token",
+    response_model=LoginResponse,
+    dependencies=[Depends(login_rate_limit)],
+)
 async def login_for_access_token(
     response: Response,
     login_data: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Login using email and password.
     """
-    user = authenticate_user(login_data.email, login_data.password, db)
+    user = await authenticate_user(login_data.email, login_data.password, db)
     if not user:
         raise HTTPException(
             status_code=401,
@@ -153,7 +160,7 @@ async def login_for_access_token(
 async def refresh_token_get(
     response: Response,
     refresh_token: Optional[str] = Cookie(None, alias="refresh_token"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
 
     if refresh_token is None or not refresh_token.strip():
@@ -165,9 +172,7 @@ async def refresh_token_get(
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid refresh token payload")
 
-        user = (
-            db.query(OurUsers).filter(OurUsers.id == user_id).first()
-        ) 
+        user = await db.scalar(select(OurUsers).where(OurUsers.id == user_id))
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -199,7 +204,7 @@ async def refresh_token_get(
 @router.post("/register/teacher", status_code=status.HTTP_201_CREATED)
 async def register_teacher(
     create_user_request: CreateUserRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Register a new teacher account (admin only)"""
@@ -211,12 +216,12 @@ async def register_teacher(
         )
 
     # Check if user already exists
-    check_if_user_exists(db, create_user_request.email)
+    await check_if_user_exists(db, create_user_request.email)
 
     # Create teacher account
     create_user_model = OurUsers(
         email=create_user_request.email,
-        hashed_password=bcrypt_context.hash(create_user_request.password),
+        hashed_password=await hash_password(create_user_request.password),
         first_name=create_user_request.first_name,
         last_name=create_user_request.last_name,
         role=UserRole.TEACHER.value,
@@ -224,14 +229,14 @@ async def register_teacher(
     )
 
     db.add(create_user_model)
-    db.commit()
+    await db.commit()
     return create_user_model
 
 
 @router.post("/users/admin", status_code=status.HTTP_201_CREATED)  # Changed from /create/admin to /users/admin
 async def register_admin(
     create_user_request: CreateUserRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Register a new admin account"""
     # This endpoint is usually protected by environment-based access
@@ -239,12 +244,12 @@ async def register_admin(
     # For this example, we'll assume it's restricted by network/infrastructure
 
     # Check if user already exists
-    check_if_user_exists(db, create_user_request.email)
+    await check_if_user_exists(db, create_user_request.email)
 
     # Create admin account
     create_user_model = OurUsers(
         email=create_user_request.email,
-        hashed_password=bcrypt_context.hash(create_user_request.password),
+        hashed_password=await hash_password(create_user_request.password),
         first_name=create_user_request.first_name,
         last_name=create_user_request.last_name,
         role=UserRole.ADMIN.value,
@@ -252,28 +257,28 @@ async def register_admin(
     )
 
     db.add(create_user_model)
-    db.commit()
+    await db.commit()
     return create_user_model
 
 
 @router.get("/users", response_model=List[UserResponse], status_code=status.HTTP_200_OK)
 async def get_all_users(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    users = db.query(OurUsers).all()
+    users = (await db.scalars(select(OurUsers))).all()
     return users
 
 
-@router.post("/reset-password")
-async def request_password_reset(email: str, db: Session = Depends(get_db)):
-    user = db.query(OurUsers).filter(OurUsers.email == email).first()
+@router.post("/reset-password", dependencies=[Depends(password_reset_rate_limit)])
+async def request_password_reset(email: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(OurUsers).where(OurUsers.email == email))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     token, hashed_token = generate_password_reset_token()
     user.reset_token = hashed_token
     user.reset_token_expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
-    db.commit()
+    await db.commit()
 
     send_reset_password_email_task.delay(
         email, token
@@ -282,17 +287,17 @@ async def request_password_reset(email: str, db: Session = Depends(get_db)):
 
 
 @router.post("/reset-password/{token}")
-async def reset_password(token: str, new_password: str, db: Session = Depends(get_db)):
+async def reset_password(token: str, new_password: str, db: AsyncSession = Depends(get_async_db)):
     hashed_token = hashlib.sha256(token.encode()).hexdigest()
-    user = db.query(OurUsers).filter(OurUsers.reset_token == hashed_token).first()
+    user = await db.scalar(select(OurUsers).where(OurUsers.reset_token == hashed_token))
 
     if not user or user.reset_token_expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=400, detail="Token is expired or wrong")
 
-    user.hashed_password = bcrypt_context.hash(new_password)
+    user.hashed_password = await hash_password(new_password)
     user.reset_token = None
     user.reset_token_expires_at = None
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return {"message": "Password was changed!"}
@@ -1,20 +1,24 @@
 from typing import List
-import os
 
 import sqlalchemy
-import boto3
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response
 from fastapi.params import Depends
-from sqlalchemy.orm import Session, joinedload
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from starlette import status
 
 
-from backend.dependencies.getdb import get_db
-from backend.models import Course, OurUsers, Assignment
+from backend.cache import get_catalog, set_catalog, invalidate_catalog
+from backend.celery_app import schedule_s3_purge
+from backend.dependencies.getdb import get_async_db
+from backend.dependencies.pagination import CoursePageParams
+from backend.models import Course, OurUsers, Assignment, Section
 from backend.models.enrollment import Enrollment
 from backend.models.rating import Rating
-from backend.models.progress import CourseProgress
+from backend.models.progress import AssignmentProgress, CourseProgress
 from backend.oauth2 import get_current_user_jwt
 from backend.schemas.course import (
     CourseCreate,
@@ -24,16 +28,13 @@ from backend.schemas.course import (
 )
 from backend.schemas.rating import RatingResponse, RatingCreate
 from backend.schemas.user import UserResponse, TeacherOfCourse
+from backend.services import course_access, rating_service
+from backend.services.http_cache import changes, conditional_get
+from backend.responses import json_response
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 
-# Initialize S3 client
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=os.getenv("ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"),
-)
-BUCKET_NAME = os.getenv("BUCKET_NAME", "files-for-team-project")
+catalog_adapter = TypeAdapter(List[CourseInfo])
 
 
 @router.post(
@@ -41,7 +42,7 @@ BUCKET_NAME = os.getenv("BUCKET_NAME", "files-for-team-project")
 )
 async def create_course(
     create_course_request: CourseCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     if current_user.get("role") not in ["teacher", "admin"]:
@@ -56,37 +57,55 @@ async def create_course(
 
     db.add(course)
     try:
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating course: {e}")
-    db.refresh(course)
+    await db.refresh(course)
+    await invalidate_catalog()
+    await course_access.grant_teaching(course.teacher_id, course.id)
 
+    teacher = await db.get(OurUsers, course.teacher_id)
     course_dict = course.to_dict()
-    course_dict["teacher"] = TeacherOfCourse.model_validate(course.teacher.to_dict())
+    course_dict["teacher"] = TeacherOfCourse.model_validate(teacher.to_dict())
     return CourseResponse.model_validate(course_dict)
 
 
 @router.get(
     "/{course_id}", response_model=CourseResponse, status_code=status.HTTP_200_OK
 )
-async def get_course_by_id(course_id: int, db: Session = Depends(get_db)):
-
+async def get_course_by_id(
+    course_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
     # Use joinedload specifically for the teacher relationship
-    course = (
-        db.query(Course)
+    course = await db.scalar(
+        select(Course)
         .options(joinedload(Course.teacher))
-        .filter(Course.id == course_id)
-        .first()
+        .where(Course.id == course_id)
     )
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
         )
 
+    # Only an existing course can be answered with 304
+    not_modified = await conditional_get(
+        request,
+        response,
+        db,
+        changes(Course, Course.id == course_id),
+        changes(OurUsers, OurUsers.id == course.teacher_id),
+        collection=False,
+    )
+    if not_modified is not None:
+        return not_modified
+
     course_dict = course.to_dict()
     course_dict["teacher"] = TeacherOfCourse.model_validate(course.teacher.to_dict())
-    return CourseResponse.model_validate(course_dict)
+    return json_response(CourseResponse.model_validate(course_dict).model_dump_json(), response)
 
 
 @router.put(
@@ -95,7 +114,7 @@ async def get_course_by_id(course_id: int, db: Session = Depends(get_db)):
 async def update_course(
     course_id: int,
     update_course_request: CourseUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
 
@@ -104,7 +123,7 @@ async def update_course(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access Denied"
         )
 
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
@@ -119,45 +138,68 @@ async def update_course(
         setattr(course, key, value)
 
     try:
-        db.commit()
-        db.refresh(course)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating course: {e}",
         )
+    await invalidate_catalog()
+
+    # Relationships used by CourseResponse must be loaded before serialization
+    course = await db.scalar(
+        select(Course)
+        .options(
+            selectinload(Course.teacher),
+            selectinload(Course.sections).selectinload(Section.assignments),
+        )
+        .where(Course.id == course_id)
+        .execution_options(populate_existing=True)
+    )
     return course
 
 
 @router.get("", response_model=List[CourseInfo])
-async def get_all_courses(db: Session = Depends(get_db)):
+async def get_all_courses(
+    page: CoursePageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Serve the cached page as-is, Postgres is only queried on a miss
+    cached = await get_catalog(page.cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
     try:
-        courses = db.query(Course).options(joinedload(Course.teacher)).all()
-
-        courses_info = []
-        for course in courses:
-            courses_info.append(
-                CourseInfo(
-                    id=course.id,
-                    title=course.title,
-                    category=course.category,
-                    rating=course.rating,
-                    teacher_id=course.teacher_id,
+        rows = (
+            await db.execute(
+                page.apply(
+                    select(
+                        Course.id,
+                        Course.title,
+                        Course.category,
+                        Course.rating_average.label("rating"),
+                        Course.teacher_id,
+                    )
                 )
             )
-        return courses_info
-
+        ).all()
+        courses_info = [CourseInfo.model_validate(row._mapping) for row in rows]
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    payload = catalog_adapter.dump_json(courses_info)
+    await set_catalog(page.cache_key, payload)
+    return Response(content=payload, media_type="application/json")
+
 
 @router.delete("/{course_id}", status_code=status.HTTP_200_OK)
 async def delete_course(
     course_id: int,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
 
     if current_user.get("role") not in ["teacher", "admin"]:
@@ -165,66 +207,56 @@ async def delete_course(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
         )
 
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:  # Check if the course exists
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
         )
     
-    # Delete all course files from S3
-    try:
-        # 1. Delete course-level files
-        course_prefix = f"course_{course_id}/"
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=course_prefix)
-        if "Contents" in response:
-            for item in response["Contents"]:
-                s3.delete_object(Bucket=BUCKET_NAME, Key=item["Key"])
-                print(f"Deleted course file: {item['Key']}")
-                
-        # 2. Get all assignments in the course and delete their files
-        assignments = db.query(Assignment).filter(Assignment.course_id == course_id).all()
-        for assignment in assignments:
-            # Delete assignment task files
-            assignment_prefix = f"assignments/{assignment.id}/task/"
-            response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=assignment_prefix)
-            if "Contents" in response:
-                for item in response["Contents"]:
-                    s3.delete_object(Bucket=BUCKET_NAME, Key=item["Key"])
-                    print(f"Deleted assignment file: {item['Key']}")
-            
-            # Delete student submissions for this assignment
-            submissions_prefix = f"assignments/{assignment.id}/submissions/"
-            response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=submissions_prefix)
-            if "Contents" in response:
-                for item in response["Contents"]:
-                    s3.delete_object(Bucket=BUCKET_NAME, Key=item["Key"])
-                    print(f"Deleted submission file: {item['Key']}")
-                    
-    except Exception as e:
-        print(f"Error deleting files for course {course_id}: {str(e)}")
-        # Continue with course deletion even if file deletion fails
+    # Collect S3 prefixes before the assignments are deleted with the course
+    assignment_ids = (
+        await db.scalars(select(Assignment.id).where(Assignment.course_id == course_id))
+    ).all()
+    prefixes = [f"course_{course_id}/"] + [
+        f"assignments/{assignment_id}/" for assignment_id in assignment_ids
+    ]
 
     try:
         # First, delete all enrollments for this course to avoid foreign key constraint violation
-        db.query(Enrollment).filter(Enrollment.course_id == course_id).delete()
+        student_ids = (
+            await db.scalars(
+                delete(Enrollment)
+                .where(Enrollment.course_id == course_id)
+                .returning(Enrollment.user_id)
+            )
+        ).all()
         
         # Delete any progress records for this course
-        db.query(CourseProgress).filter(CourseProgress.course_id == course_id).delete()
+        await db.execute(delete(CourseProgress).where(CourseProgress.course_id == course_id))
+        await db.execute(
+            delete(AssignmentProgress).where(AssignmentProgress.assignment_id.in_(assignment_ids))
+        )
         
         # Delete ratings for this course if any
-        db.query(Rating).filter(Rating.course_id == course_id).delete()
+        await db.execute(delete(Rating).where(Rating.course_id == course_id))
         
         # Delete the course (will cascade delete assignments due to relationship)
-        db.delete(course)
-        db.commit()
+        await db.delete(course)
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting course: {str(e)}"
         )
+    await invalidate_catalog()
+    await course_access.revoke_enrollment(student_ids, course_id)
+    await course_access.revoke_teaching(course.teacher_id, course_id)
+
+    # Files are removed in the background, the course is already gone
+    purge_task_id = await schedule_s3_purge(prefixes, background_tasks, current_user.get("user_id"))
 
-    return {"message": "Course deleted successfully"}
+    return {"message": "Course deleted successfully", "purge_task_id": purge_task_id}
 
 
 @router.post("/{course_id}/rate", response_model=RatingResponse, status_code=201)
@@ -232,35 +264,17 @@ async def rate_course(
     course_id: int,
     rating_data: RatingCreate,
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
 
-    existing_rating = (
-        db.query(Rating)
-        .filter(Rating.user_id == current_user["user_id"], Rating.course_id == course_id)
-        .first()
+    # A repeated vote replaces the earlier one
+    rating = await rating_service.save_rating(
+        db, current_user["user_id"], course_id, rating_data.rating
     )
+    await db.commit()
+    await invalidate_catalog()
 
-    if existing_rating:
-        raise HTTPException(status_code=400, detail="User already rated this course")
-
-    new_rating = Rating(
-        user_id=current_user["user_id"], course_id=course_id, rating=rating_data.rating
-    )
-    db.add(new_rating)
-    db.commit()
-    db.refresh(new_rating)
-
-    # Update course rating
-    all_ratings = db.query(Rating).filter(Rating.course_id == course_id).all()
-    total_rating = sum(r.rating for r in all_ratings)
-    course.ratings_count = len(all_ratings)
-    course.rating = (
-        total_rating / course.ratings_count if course.ratings_count else 0.0
-    )  # Calculate the new average
-    db.commit()
-
-    return new_rating
+    return rating
@@ -1,29 +1,60 @@
 """
 Module for handling file operations in courses, including uploads, downloads, and management.
 """
+import asyncio
 import os
-from typing import List, Optional
+from typing import List, Optional, Union
 import uuid
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import boto3
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Query
 from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from backend.dependencies.getdb import get_db
-from backend.oauth2 import get_current_user_jwt
-from backend.models import Course, Assignment, Enrollment
+from backend.celery_app import celery_app, get_purge_owner
+from backend.dependencies.getdb import get_async_db
+from backend.oauth2 import (
+    get_current_user_jwt,
+    create_upload_token,
+    verify_upload_token,
+)
+from backend.models import Course, Assignment, FileMetadata
 from backend.schemas.file import (
     FileResponse,
     FileUploadResponse,
     FileDeleteResponse,
+    PresignedDownloadResponse,
+    PresignedUploadRequest,
+    PresignedUploadResponse,
+    UploadConfirmRequest,
+    PurgeStatusResponse,
 )
 
 from backend.models import OurUsers
-from backend.models.enrollment import Enrollment
+from backend.services.course_access import get_course_access
+from backend.services.file_metadata import (
+    record_upload,
+    record_deletion,
+    COURSE_FILE,
+    TASK_FILE,
+    SUBMISSION_FILE,
+    COURSE_KEY,
+    TASK_KEY,
+    SUBMISSION_KEY,
+)
+from backend.services.storage import (
+    s3,
+    BUCKET_NAME,
+    upload_stream,
+    presigned_download_url,
+    presigned_upload,
+    PRESIGNED_URL_EXPIRES,
+)
 
 from dotenv import load_dotenv
 
@@ -31,12 +62,6 @@ load_dotenv()  # take environment variables from .env.
 
 router = APIRouter(prefix="/files", tags=["files"])
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=os.getenv("ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"),
-)
-BUCKET_NAME = os.getenv("BUCKET_NAME", "files-for-team-project")  
 TEMP_DOWNLOAD_DIR = "temp_downloads"
 
 os.makedirs(TEMP_DOWNLOAD_DIR, exist_ok=True)
@@ -65,65 +90,40 @@ ALLOWED_CONTENT_TYPES = [
 ]
 
 
-# Helper function to check file type and size
-async def validate_file(file: Optional[UploadFile] = None):
-    # If no file provided, return None to indicate optional file
-    if not file or not file.filename:
-        return None
-
-    # Check content type
-    content_type = file.content_type
+# Helper function to check file type
+def check_content_type(content_type: Optional[str]) -> None:
     if content_type not in ALLOWED_CONTENT_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type {content_type} not allowed",
         )
 
-    # Check file size
-    try:
-        # Read first chunk to check size without loading entire file
-        first_chunk = await file.read(MAX_FILE_SIZE + 1)
-        if len(first_chunk) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024 * 1024)} MB",
-            )
 
-        # Reset file position for later reading
-        await file.seek(0)
-        return first_chunk
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error validating file: {str(e)}",
-        )
+# Helper function to check file type, the size is enforced while streaming to S3
+async def validate_file(file: Optional[UploadFile] = None) -> bool:
+    # If no file provided, return False to indicate optional file
+    if not file or not file.filename:
+        return False
+
+    check_content_type(file.content_type)
+    return True
 
 
 # Helper function to check course enrollment
-def check_enrollment(db: Session, user_id: int, course_id: int) -> bool:
-    return (
-        db.query(Enrollment)
-        .filter(Enrollment.user_id == user_id, Enrollment.course_id == course_id)
-        .first()
-        is not None
-    )
+async def check_enrollment(db: AsyncSession, user_id: int, course_id: int) -> bool:
+    return (await get_course_access(db, user_id, course_id)).is_enrolled
 
 
 # Helper function to check course ownership
-def check_course_ownership(db: Session, user_id: int, course_id: int) -> bool:
-    return (
-        db.query(Course)
-        .filter(Course.id == course_id, Course.teacher_id == user_id)
-        .first()
-        is not None
-    )
+async def check_course_ownership(db: AsyncSession, user_id: int, course_id: int) -> bool:
+    return (await get_course_access(db, user_id, course_id)).is_teacher
 
 
 @router.get("", response_model=List[FileResponse])
 async def get_all_files(
     course_id: Optional[int] = None,
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get all files or files for a specific course
@@ -134,7 +134,7 @@ async def get_all_files(
 
         # If course_id provided, verify course exists and user has access
         if course_id:
-            course = db.query(Course).filter(Course.id == course_id).first()
+            course = await db.scalar(select(Course).where(Course.id == course_id))
             if not course:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
@@ -143,17 +143,18 @@ async def get_all_files(
             # Verify user has permission to view course files
             if (
                 user_role not in ["teacher", "admin"]
-                and not check_course_ownership(db, user_id, course_id)
-                and not check_enrollment(db, user_id, course_id)
+                and not await check_course_ownership(db, user_id, course_id)
+                and not await check_enrollment(db, user_id, course_id)
             ):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Not authorized to view files for this course",
                 )
 
-            # Filter by course prefix in S3
-            prefix = f"course_{course_id}/"
-            response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix)
+            query = select(FileMetadata).where(
+                FileMetadata.course_id == course_id,
+                FileMetadata.kind == COURSE_FILE,
+            )
         else:
             # For non-admin/teacher users, only show files from their courses
             if user_role not in ["teacher", "admin"]:
@@ -163,22 +164,9 @@ async def get_all_files(
                 )
 
             # Get all files
-            response = s3.list_objects_v2(Bucket=BUCKET_NAME)
-
-        if "Contents" not in response:
-            return []
-
-        files = []
-        for item in response.get("Contents", []):
-            files.append(
-                FileResponse(
-                    key=item["Key"],
-                    size=item["Size"],
-                    last_modified=item["LastModified"],
-                    etag=item["ETag"],
-                )
-            )
-        return files
+            query = select(FileMetadata)
+
+        return (await db.scalars(query.order_by(FileMetadata.id))).all()
 
     except Exception as e:
         raise HTTPException(
@@ -187,6 +175,114 @@ async def get_all_files(
         )
 
 
+# Helper functions that check upload permissions and build the S3 key
+async def course_upload_key(
+    db: AsyncSession, current_user: dict, course_id: Optional[int], filename: str
+) -> str:
+    user_id = current_user.get("user_id")
+    user_role = current_user.get("role")
+
+    # If course_id provided, verify course exists and user has permissions
+    if course_id:
+        course = await db.scalar(select(Course).where(Course.id == course_id))
+        if not course:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
+            )
+
+        # Verify user has permission to upload to this course
+        if user_role not in ["teacher", "admin"] and not await check_course_ownership(
+            db, user_id, course_id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to upload to this course",
+            )
+
+        # Create a prefix for this course
+        return f"course_{course_id}/{uuid.uuid4().hex}_{filename}"
+
+    # Only admins and teachers can upload general files
+    if user_role not in ["teacher", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to upload general files",
+        )
+
+    # Generate a unique filename with a folder structure to avoid collisions
+    timestamp = datetime.now().strftime("%Y%m%d")
+    unique_filename = f"{uuid.uuid4().hex}_{filename}"
+    return f"general/{timestamp}/{unique_filename}"
+
+
+async def task_upload_key(
+    db: AsyncSession, current_user: dict, assignment_id: int, filename: str
+) -> tuple[str, Course]:
+    user_id = current_user.get("user_id")
+    user_role = current_user.get("role")
+
+    # Check if assignment exists
+    assignment = await db.scalar(
+        select(Assignment).where(Assignment.id == assignment_id)
+    )
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+        )
+
+    # Check course access permissions
+    course = await db.scalar(select(Course).where(Course.id == assignment.course_id))
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
+        )
+
+    # For tasks, only teacher can upload
+    if user_role not in ["teacher", "admin"] and course.teacher_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to upload task files",
+        )
+
+    # Create a structured key for assignments with uniqueness
+    return f"assignments/{assignment_id}/task/{uuid.uuid4().hex}_{filename}", course
+
+
+async def submission_upload_key(
+    db: AsyncSession, current_user: dict, assignment_id: int, filename: str
+) -> tuple[str, Course, str]:
+    user_id = current_user.get("user_id")
+    user_role = current_user.get("role")
+
+    # Check if assignment exists
+    assignment = await db.scalar(
+        select(Assignment).where(Assignment.id == assignment_id)
+    )
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+        )
+
+    # Get the associated course and verify enrollment
+    course = await db.scalar(select(Course).where(Course.id == assignment.course_id))
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
+        )
+
+    # For students, check if they're enrolled in the course
+    if user_role == "student" and not await check_enrollment(db, user_id, course.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not enrolled in this course",
+        )
+
+    # Create a structured key for submissions with timestamp for versioning
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    key = f"assignments/{assignment_id}/submissions/{user_id}/{timestamp}_{filename}"
+    return key, course, timestamp
+
+
 @router.post(
     "", response_model=FileUploadResponse, status_code=status.HTTP_201_CREATED
 )
@@ -194,57 +290,29 @@ async def upload_file(
     file: UploadFile = File(...),
     course_id: Optional[int] = Form(None),
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Upload a file to S3
     """
     try:
         # Validate file
-        file_content = await validate_file(file)
-
-        user_id = current_user.get("user_id")
-        user_role = current_user.get("role")
-
-        # If course_id provided, verify course exists and user has permissions
-        if course_id:
-            course = db.query(Course).filter(Course.id == course_id).first()
-            if not course:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
-                )
-
-            # Verify user has permission to upload to this course
-            if user_role not in ["teacher", "admin"] and not check_course_ownership(
-                db, user_id, course_id
-            ):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Not authorized to upload to this course",
-                )
-
-            # Create a prefix for this course
-            key = f"course_{course_id}/{uuid.uuid4().hex}_{file.filename}"
-        else:
-            # Only admins and teachers can upload general files
-            if user_role not in ["teacher", "admin"]:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Not authorized to upload general files",
-                )
-
-            # Generate a unique filename with a folder structure to avoid collisions
-            timestamp = datetime.now().strftime("%Y%m%d")
-            unique_filename = f"{uuid.uuid4().hex}_{file.filename}"
-            key = f"general/{timestamp}/{unique_filename}"
-
-        # Upload directly from memory to S3
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=key,
-            Body=file_content,
-            ContentType=file.content_type,
+        await validate_file(file)
+
+        key = await course_upload_key(db, current_user, course_id, file.filename)
+
+        # Stream to S3 in parts, the whole file is never held in memory
+        uploaded = await upload_stream(file, key, MAX_FILE_SIZE)
+        await record_upload(
+            db,
+            key,
+            size=uploaded["size"],
+            etag=uploaded["etag"],
+            content_type=file.content_type,
+            owner_id=current_user.get("user_id"),
+            course_id=course_id,
         )
+        await db.commit()
 
         return FileUploadResponse(message="File uploaded successfully", file_key=key)
 
@@ -266,49 +334,30 @@ async def upload_assignment_file(
     assignment_id: int,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Upload a file for a specific assignment
     """
     try:
         # Validate file
-        file_content = await validate_file(file)
-
-        user_id = current_user.get("user_id")
-        user_role = current_user.get("role")
-
-        # Check if assignment exists
-        assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-        if not assignment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
-            )
-
-        # Check course access permissions
-        course = db.query(Course).filter(Course.id == assignment.course_id).first()
-        if not course:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
-            )
-
-        # For tasks, only teacher can upload
-        if user_role not in ["teacher", "admin"] and course.teacher_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to upload task files",
-            )
-
-        # Create a structured key for assignments with uniqueness
-        key = f"assignments/{assignment_id}/task/{uuid.uuid4().hex}_{file.filename}"
-
-        # Upload directly from memory to S3
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=key,
-            Body=file_content,
-            ContentType=file.content_type,
+        await validate_file(file)
+
+        key, course = await task_upload_key(db, current_user, assignment_id, file.filename)
+
+        # Stream to S3 in parts, the whole file is never held in memory
+        uploaded = await upload_stream(file, key, MAX_FILE_SIZE)
+        await record_upload(
+            db,
+            key,
+            size=uploaded["size"],
+            etag=uploaded["etag"],
+            content_type=file.content_type,
+            owner_id=current_user.get("user_id"),
+            course_id=course.id,
+            assignment_id=assignment_id,
         )
+        await db.commit()
 
         return FileUploadResponse(
             message="Assignment file uploaded successfully", file_key=key
@@ -333,51 +382,37 @@ async def submit_assignment(
     file: UploadFile = File(...),
     comment: Optional[str] = Form(None),
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Submit a solution for an assignment
     """
     try:
         # Validate file
-        file_content = await validate_file(file)
-
-        user_id = current_user.get("user_id")
-        user_role = current_user.get("role")
-
-        # Check if assignment exists
-        assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-        if not assignment:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
-            )
-
-        # Get the associated course and verify enrollment
-        course = db.query(Course).filter(Course.id == assignment.course_id).first()
-        if not course:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
-            )
-
-        # For students, check if they're enrolled in the course
-        if user_role == "student" and not check_enrollment(db, user_id, course.id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You are not enrolled in this course",
-            )
+        await validate_file(file)
 
-        # Create a structured key for submissions with timestamp for versioning
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        key = f"assignments/{assignment_id}/submissions/{user_id}/{timestamp}_{file.filename}"
+        key, course, timestamp = await submission_upload_key(
+            db, current_user, assignment_id, file.filename
+        )
 
-        # Upload directly from memory to S3
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=key,
-            Body=file_content,
-            ContentType=file.content_type,
-            Metadata={"comment": comment if comment else "", "timestamp": timestamp},
+        # Stream to S3 in parts, the whole file is never held in memory
+        uploaded = await upload_stream(
+            file,
+            key,
+            MAX_FILE_SIZE,
+            metadata={"comment": comment if comment else "", "timestamp": timestamp},
+        )
+        await record_upload(
+            db,
+            key,
+            size=uploaded["size"],
+            etag=uploaded["etag"],
+            content_type=file.content_type,
+            owner_id=current_user.get("user_id"),
+            course_id=course.id,
+            assignment_id=assignment_id,
         )
+        await db.commit()
 
         # Update or create submission record in database
         # This would require a Submission model that you should implement
@@ -405,13 +440,119 @@ async def submit_assignment(
         )
 
 
+@router.post(
+    "/presigned",
+    response_model=PresignedUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_presigned_upload(
+    upload_request: PresignedUploadRequest,
+    current_user: dict = Depends(get_current_user_jwt),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Let the client upload straight to S3, the same permissions as the
+    upload endpoints apply. Confirm the upload with /files/presigned/confirm.
+    """
+    check_content_type(upload_request.content_type)
+
+    course_id = upload_request.course_id
+    if upload_request.assignment_id is None:
+        key = await course_upload_key(
+            db, current_user, course_id, upload_request.filename
+        )
+    elif upload_request.submission:
+        key, course, _ = await submission_upload_key(
+            db, current_user, upload_request.assignment_id, upload_request.filename
+        )
+        course_id = course.id
+    else:
+        key, course = await task_upload_key(
+            db, current_user, upload_request.assignment_id, upload_request.filename
+        )
+        course_id = course.id
+
+    try:
+        upload = presigned_upload(
+            key, upload_request.content_type, MAX_FILE_SIZE, upload_request.method
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"S3 service error: {str(e)}",
+        )
+
+    upload_token = create_upload_token(
+        key,
+        current_user.get("user_id"),
+        upload_request.content_type,
+        course_id,
+        upload_request.assignment_id,
+        # Leave time to finish an upload that started just before expiry
+        timedelta(seconds=PRESIGNED_URL_EXPIRES * 2),
+    )
+    return PresignedUploadResponse(
+        file_key=key,
+        method=upload_request.method,
+        expires_in=PRESIGNED_URL_EXPIRES,
+        upload_token=upload_token,
+        **upload,
+    )
+
+
+@router.post(
+    "/presigned/confirm",
+    response_model=FileUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def confirm_presigned_upload(
+    confirm_request: UploadConfirmRequest,
+    current_user: dict = Depends(get_current_user_jwt),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Record a finished direct upload in the files table
+    """
+    upload = verify_upload_token(confirm_request.upload_token, current_user.get("user_id"))
+    key = upload["key"]
+
+    try:
+        head = await asyncio.to_thread(s3.head_object, Bucket=BUCKET_NAME, Key=key)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Uploaded file not found"
+        )
+
+    # PUT uploads are not limited by S3, drop oversized objects here
+    if head["ContentLength"] > MAX_FILE_SIZE:
+        await asyncio.to_thread(s3.delete_object, Bucket=BUCKET_NAME, Key=key)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024 * 1024)} MB",
+        )
+
+    await record_upload(
+        db,
+        key,
+        size=head["ContentLength"],
+        etag=head["ETag"],
+        content_type=upload["content_type"],
+        owner_id=upload["id"],
+        course_id=upload["course_id"],
+        assignment_id=upload["assignment_id"],
+    )
+    await db.commit()
+
+    return FileUploadResponse(message="File uploaded successfully", file_key=key)
+
+
 @router.get(
     "/assignments/{assignment_id}/task", response_model=List[FileResponse]
 )
 async def get_assignment_files(
     assignment_id: int,
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get files for a specific assignment task
@@ -421,14 +562,16 @@ async def get_assignment_files(
         user_role = current_user.get("role")
 
         # Check if assignment exists
-        assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+        assignment = await db.scalar(
+            select(Assignment).where(Assignment.id == assignment_id)
+        )
         if not assignment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
             )
 
         # Get the associated course
-        course = db.query(Course).filter(Course.id == assignment.course_id).first()
+        course = await db.scalar(select(Course).where(Course.id == assignment.course_id))
         if not course:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
@@ -438,31 +581,23 @@ async def get_assignment_files(
         if (
             user_role not in ["teacher", "admin"]
             and course.teacher_id != user_id
-            and not check_enrollment(db, user_id, course.id)
+            and not await check_enrollment(db, user_id, course.id)
         ):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to view assignment files",
             )
 
-        # Filter by assignment prefix in S3
-        prefix = f"assignments/{assignment_id}/task/"
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix)
-
-        if "Contents" not in response:
-            return []
-
-        files = []
-        for item in response.get("Contents", []):
-            files.append(
-                FileResponse(
-                    key=item["Key"],
-                    size=item["Size"],
-                    last_modified=item["LastModified"],
-                    etag=item["ETag"],
+        return (
+            await db.scalars(
+                select(FileMetadata)
+                .where(
+                    FileMetadata.assignment_id == assignment_id,
+                    FileMetadata.kind == TASK_FILE,
                 )
+                .order_by(FileMetadata.id)
             )
-        return files
+        ).all()
 
     except Exception as e:
         raise HTTPException(
@@ -478,7 +613,7 @@ async def get_assignment_submissions(
     assignment_id: int,
     student_id: Optional[int] = Query(None),
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get submissions for a specific assignment
@@ -488,25 +623,31 @@ async def get_assignment_submissions(
         user_role = current_user.get("role")
 
         # Check if assignment exists
-        assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+        assignment = await db.scalar(
+            select(Assignment).where(Assignment.id == assignment_id)
+        )
         if not assignment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
             )
 
         # Get the associated course
-        course = db.query(Course).filter(Course.id == assignment.course_id).first()
+        course = await db.scalar(select(Course).where(Course.id == assignment.course_id))
         if not course:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
             )
 
+        query = select(FileMetadata).where(
+            FileMetadata.assignment_id == assignment_id,
+            FileMetadata.kind == SUBMISSION_FILE,
+        )
+
         # Teachers and admins can see all submissions, students can only see their own
         if user_role in ["teacher", "admin"] or course.teacher_id == user_id:
             # Teacher can see all submissions or filter by student
-            prefix = f"assignments/{assignment_id}/submissions/"
             if student_id:
-                prefix = f"{prefix}{student_id}/"
+                query = query.where(FileMetadata.owner_id == student_id)
         elif user_role == "student":
             # Students can only see their own submissions
             if student_id and student_id != user_id:
@@ -516,36 +657,20 @@ async def get_assignment_submissions(
                 )
 
             # Check if student is enrolled in the course
-            if not check_enrollment(db, user_id, course.id):
+            if not await check_enrollment(db, user_id, course.id):
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="You are not enrolled in this course",
                 )
 
-            prefix = f"assignments/{assignment_id}/submissions/{user_id}/"
+            query = query.where(FileMetadata.owner_id == user_id)
         else:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to view submissions",
             )
 
-        # Get submissions from S3
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix)
-
-        if "Contents" not in response:
-            return []
-
-        files = []
-        for item in response.get("Contents", []):
-            files.append(
-                FileResponse(
-                    key=item["Key"],
-                    size=item["Size"],
-                    last_modified=item["LastModified"],
-                    etag=item["ETag"],
-                )
-            )
-        return files
+        return (await db.scalars(query.order_by(FileMetadata.id))).all()
 
     except Exception as e:
         raise HTTPException(
@@ -554,11 +679,11 @@ async def get_assignment_submissions(
         )
 
 
-def validate_file_access(
-    db: Session,
+async def validate_file_access(
+    db: AsyncSession,
     file_key: str,
     current_user: dict
-) -> tuple[Course, bool]:
+) -> tuple[Optional[Course], bool]:
     """
     Validate user's access to a file.
 
@@ -568,22 +693,46 @@ def validate_file_access(
         current_user: Current authenticated user
 
     Returns:
-        tuple[Course, bool]: Course object and boolean indicating if user has access
+        tuple[Optional[Course], bool]: Course the file belongs to (None for
+        general files) and boolean indicating if user manages it
 
     Raises:
         HTTPException: If file access is not allowed
     """
+    user_id = current_user.get("user_id")
+    is_admin = current_user.get("role") == "admin"
+    submitted_by = None
+
     # Extract course_id from file key
-    try:
-        course_id = int(file_key.split("/")[1].split("_")[1])
-    except (IndexError, ValueError):
+    if match := COURSE_KEY.match(file_key):
+        course_id = int(match.group(1))
+    elif match := TASK_KEY.match(file_key) or SUBMISSION_KEY.match(file_key):
+        course_id = await db.scalar(
+            select(Assignment.course_id).where(Assignment.id == int(match.group(1)))
+        )
+        if course_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Assignment not found"
+            )
+        if match.re is SUBMISSION_KEY:
+            submitted_by = int(match.group(2))
+    elif file_key.startswith("general/"):
+        # General files are uploaded and used by teachers and admins only
+        if current_user.get("role") not in ["teacher", "admin"]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this file"
+            )
+        return None, True
+    else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid file key format"
         )
 
     # Get course
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -591,18 +740,24 @@ def validate_file_access(
         )
 
     # Check access
-    user_id = current_user.get("user_id")
     is_teacher = course.teacher_id == user_id
-    is_admin = current_user.get("role") == "admin"
-    is_enrolled = check_enrollment(db, user_id, course_id)
+    if is_teacher or is_admin:
+        return course, True
 
-    if not (is_teacher or is_admin or is_enrolled):
+    # Students only see their own submissions
+    if submitted_by is not None and submitted_by != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this file"
         )
 
-    return course, is_teacher or is_admin
+    if not await check_enrollment(db, user_id, course_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this file"
+        )
+
+    return course, False
 
 def get_file_from_s3(file_key: str) -> tuple[StreamingResponse, str]:
     """
@@ -643,53 +798,110 @@ def get_file_from_s3(file_key: str) -> tuple[StreamingResponse, str]:
             detail=f"S3 service error: {str(e)}"
         )
 
-@router.get("/download/{file_key:path}")
+async def get_presigned_download(db: AsyncSession, file_key: str) -> PresignedDownloadResponse:
+    """
+    Create a short-lived URL so the client downloads the file from S3 directly.
+
+    Args:
+        db: Database session
+        file_key: Key of the file in S3
+
+    Returns:
+        PresignedDownloadResponse: URL and its lifetime in seconds
+
+    Raises:
+        HTTPException: If file not found or S3 error occurs
+    """
+    # Signing works for any key, make sure the file is indexed first
+    if await db.scalar(select(FileMetadata.id).where(FileMetadata.key == file_key)) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    try:
+        url = presigned_download_url(file_key)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"S3 service error: {str(e)}"
+        )
+    return PresignedDownloadResponse(url=url, expires_in=PRESIGNED_URL_EXPIRES)
+
+@router.get("/download/{file_key:path}", response_model=None)
 async def download_file(
     file_key: str,
-    db: Session = Depends(get_db),
+    presigned: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt)
-) -> StreamingResponse:
+) -> Union[StreamingResponse, PresignedDownloadResponse]:
     """
     Download a file from S3.
 
     Args:
         file_key: Key of the file in S3
+        presigned: Return a short-lived S3 URL instead of streaming the file
         db: Database session
         current_user: Current authenticated user
 
     Returns:
-        StreamingResponse: File streaming response
+        StreamingResponse: File streaming response, or
+        PresignedDownloadResponse: URL to download the file from S3
 
     Raises:
         HTTPException: If file access not allowed or file not found
     """
-    try:
-        # Get file from S3
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=file_key)
-        content_type = response["ContentType"]
-        filename = file_key.split("/")[-1]
+    await validate_file_access(db, file_key, current_user)
 
-        def iterfile():
-            yield from response["Body"]
+    if presigned:
+        return await get_presigned_download(db, file_key)
 
-        return StreamingResponse(
-            iterfile(),
-            media_type=content_type,
-            headers={
-                "Content-Disposition": f'attachment; filename="{filename}"'
-            }
-        )
-    except s3.exceptions.NoSuchKey:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found"
-        )
-    except Exception as e:
+    response, _ = get_file_from_s3(file_key)
+    return response
+
+
+@router.get("/purge/{task_id}", response_model=PurgeStatusResponse)
+async def get_purge_status(
+    task_id: str,
+    current_user: dict = Depends(get_current_user_jwt),
+):
+    """
+    Progress of the S3 cleanup started by deleting a course or assignment
+    """
+    if current_user.get("role") not in ["teacher", "admin"]:
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"S3 service error: {str(e)}"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view purge status",
         )
 
+    # Teachers only see the purges they started
+    if current_user.get("role") != "admin":
+        try:
+            owner_id = await get_purge_owner(task_id)
+        except RedisError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Purge status unavailable: {str(e)}",
+            )
+        if owner_id != current_user.get("user_id"):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Purge task not found"
+            )
+
+    # The result backend is read with blocking calls
+    return await asyncio.to_thread(read_purge_status, task_id)
+
+
+def read_purge_status(task_id: str) -> PurgeStatusResponse:
+    result = celery_app.AsyncResult(task_id)
+    state = result.state
+    info = result.info  # progress meta, the return value or the exception
+    purge_status = PurgeStatusResponse(task_id=task_id, state=state)
+    if state in ["PROGRESS", "SUCCESS"] and isinstance(info, dict):
+        purge_status.deleted = info.get("deleted", 0)
+    elif state in ["FAILURE", "RETRY"]:
+        purge_status.error = str(info)
+    return purge_status
+
 
 @router.delete(
     "/{file_key:path}",
@@ -699,7 +911,7 @@ async def download_file(
 async def delete_file(
     file_key: str,
     current_user: dict = Depends(get_current_user_jwt),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Delete a file from S3
@@ -707,7 +919,7 @@ async def delete_file(
     try:
         # Check if file exists
         try:
-            s3.head_object(Bucket=BUCKET_NAME, Key=file_key)
+            await asyncio.to_thread(s3.head_object, Bucket=BUCKET_NAME, Key=file_key)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
@@ -730,14 +942,12 @@ async def delete_file(
                 assignment_id = int(match.group(1))
 
                 # Verify assignment exists and user has rights to it
-                assignment = (
-                    db.query(Assignment).filter(Assignment.id == assignment_id).first()
+                assignment = await db.scalar(
+                    select(Assignment).where(Assignment.id == assignment_id)
                 )
                 if assignment:
-                    course = (
-                        db.query(Course)
-                        .filter(Course.id == assignment.course_id)
-                        .first()
+                    course = await db.scalar(
+                        select(Course).where(Course.id == assignment.course_id)
                     )
 
                     # If not admin, verify teacher owns the course
@@ -753,7 +963,7 @@ async def delete_file(
                 course_id = int(match.group(1))
 
                 # If not admin, verify teacher owns the course
-                if user_role != "admin" and not check_course_ownership(
+                if user_role != "admin" and not await check_course_ownership(
                     db, user_id, course_id
                 ):
                     raise HTTPException(
@@ -763,12 +973,14 @@ async def delete_file(
 
         # Delete the file
         try:
-            s3.delete_object(Bucket=BUCKET_NAME, Key=file_key)
+            await asyncio.to_thread(s3.delete_object, Bucket=BUCKET_NAME, Key=file_key)
         except boto3.exceptions.Boto3Error as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=f"S3 service error: {str(e)}",
             )
+        await record_deletion(db, [file_key])
+        await db.commit()
 
         return FileDeleteResponse(message="File deleted successfully")
 
@@ -4,13 +4,15 @@ Module for handling course and assignment progress tracking.
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from backend.dependencies.getdb import get_db
+from backend.dependencies.getdb import get_async_db
+from backend.dependencies.query_budget import QueryBudget
 from backend.models import Assignment, Course, AssignmentProgress, CourseProgress
-from backend.models.enrollment import Enrollment
 from backend.oauth2 import get_current_user_jwt
 from backend.schemas.progress import (
     AssignmentProgressCreate,
@@ -19,11 +21,17 @@ from backend.schemas.progress import (
     CourseProgressResponse,
 )
 from backend.schemas.assignment import AssignmentWithProgressResponse
+from backend.services import progress_service
+from backend.services.course_access import get_course_access
+from backend.services.http_cache import changes, conditional_get
+from backend.responses import json_response
 
 router = APIRouter(prefix="/progress", tags=["progress"])
 
+assignments_with_progress_adapter = TypeAdapter(List[AssignmentWithProgressResponse])
 
-def check_enrollment(db: Session, student_id: int, course_id: int) -> bool:
+
+async def check_enrollment(db: AsyncSession, student_id: int, course_id: int) -> bool:
     """
     Check if a student is enrolled in a course.
 
@@ -35,29 +43,22 @@ def check_enrollment(db: Session, student_id: int, course_id: int) -> bool:
     Returns:
         bool: True if student is enrolled, False otherwise
     """
-    return (
-        db.query(Enrollment)
-        .filter(Enrollment.user_id == student_id, Enrollment.course_id == course_id)
-        .first()
-        is not None
-    )
+    return (await get_course_access(db, student_id, course_id)).is_enrolled
 
 
 # Helper function to ensure course progress record exists
-def get_or_create_course_progress(db: Session, student_id: int, course_id: int):
-    progress = (
-        db.query(CourseProgress)
-        .filter(
+async def get_or_create_course_progress(db: AsyncSession, student_id: int, course_id: int):
+    progress = await db.scalar(
+        select(CourseProgress).where(
             CourseProgress.student_id == student_id,
             CourseProgress.course_id == course_id,
         )
-        .first()
     )
 
     if not progress:
         # Get total assignments for this course
-        total_assignments = (
-            db.query(Assignment).filter(Assignment.course_id == course_id).count()
+        total_assignments = await db.scalar(
+            select(func.count(Assignment.id)).where(Assignment.course_id == course_id)
         )
 
         # Create new progress record
@@ -69,41 +70,38 @@ def get_or_create_course_progress(db: Session, student_id: int, course_id: int):
             last_activity=datetime.now(),
         )
         db.add(progress)
-        db.commit()
-        db.refresh(progress)
+        await db.commit()
+        await db.refresh(progress)
 
     return progress
 
 
 # Helper function to update course progress after assignment completion
-def update_course_progress(db: Session, student_id: int, course_id: int):
-    course_progress = (
-        db.query(CourseProgress)
-        .filter(
+async def update_course_progress(db: AsyncSession, student_id: int, course_id: int):
+    course_progress = await db.scalar(
+        select(CourseProgress).where(
             CourseProgress.student_id == student_id,
             CourseProgress.course_id == course_id,
         )
-        .first()
     )
 
     if course_progress:
         # Count completed assignments
-        completed_count = (
-            db.query(AssignmentProgress)
+        completed_count = await db.scalar(
+            select(func.count(AssignmentProgress.id))
             .join(Assignment, Assignment.id == AssignmentProgress.assignment_id)
-            .filter(
+            .where(
                 Assignment.course_id == course_id,
                 AssignmentProgress.student_id == student_id,
                 AssignmentProgress.is_completed == True,
             )
-            .count()
         )
 
         # Update course progress
         course_progress.completed_assignments = completed_count
         course_progress.last_activity = datetime.now()
-        db.commit()
-        db.refresh(course_progress)
+        await db.commit()
+        await db.refresh(course_progress)
 
     return course_progress
 
@@ -112,7 +110,7 @@ def update_course_progress(db: Session, student_id: int, course_id: int):
 async def create_or_update_assignment_progress(
     assignment_id: int,
     progress_data: AssignmentProgressCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Create or update progress for an assignment"""
@@ -129,66 +127,47 @@ async def create_or_update_assignment_progress(
         )
 
     # Check if assignment exists
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+    assignment = await db.scalar(select(Assignment).where(Assignment.id == assignment_id))
     if not assignment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
         )
 
     # Check if student is enrolled in the course
-    if not check_enrollment(db, progress_data.student_id, assignment.course_id):
+    if not await check_enrollment(db, progress_data.student_id, assignment.course_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Student is not enrolled in this course",
         )
 
-    # Check if progress record already exists
-    progress = (
-        db.query(AssignmentProgress)
-        .filter(
-            AssignmentProgress.student_id == progress_data.student_id,
-            AssignmentProgress.assignment_id == assignment_id,
-        )
-        .first()
+    progress, created = await progress_service.get_or_create_assignment_progress(
+        db, progress_data.student_id, assignment_id
     )
 
-    if progress:
-        # Update existing progress
-        update_data = progress_data.model_dump(exclude_unset=True)
-        update_data.pop("student_id", None)  # Cannot change student ID
-        update_data.pop("assignment_id", None)  # Cannot change assignment ID
-
-        for key, value in update_data.items():
-            setattr(progress, key, value)
+    # A new record takes every field, an existing one only those sent
+    update_data = progress_data.model_dump(exclude_unset=not created)
+    update_data.pop("student_id", None)  # Cannot change student ID
+    update_data.pop("assignment_id", None)  # Cannot change assignment ID
 
-        # If marking as complete, set completed_at time
-        if progress_data.is_completed and not progress.completed_at:
-            progress.completed_at = datetime.now()
-
-        db.commit()
-        db.refresh(progress)
-    else:
-        # Create new progress record
-        progress = AssignmentProgress(
-            student_id=progress_data.student_id,
-            assignment_id=assignment_id,
-            **progress_data.model_dump(exclude={"student_id", "assignment_id"})
-        )
+    for key, value in update_data.items():
+        setattr(progress, key, value)
 
-        # If marked as complete, set completed_at time
-        if progress_data.is_completed:
-            progress.completed_at = datetime.now()
+    # If marking as complete, set completed_at time
+    if progress_data.is_completed and not progress.completed_at:
+        progress.completed_at = datetime.now()
 
-        # If has submission, set submitted_at time
-        if progress_data.submission_file_key:
-            progress.submitted_at = datetime.now()
+    # If a new record has a submission, set submitted_at time
+    if created and progress_data.submission_file_key:
+        progress.submitted_at = datetime.now()
 
-        db.add(progress)
-        db.commit()
-        db.refresh(progress)
+    await db.commit()
+    await db.refresh(progress)
 
     # Update course progress
-    update_course_progress(db, progress_data.student_id, assignment.course_id)
+    await update_course_progress(db, progress_data.student_id, assignment.course_id)
+
+    # Attach the loaded assignment so course_id resolves without a lazy load
+    progress.assignment = assignment
 
     return progress
 
@@ -200,7 +179,7 @@ async def create_or_update_assignment_progress(
 async def get_assignment_progress(
     assignment_id: int,
     student_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get progress for an assignment"""
@@ -214,20 +193,22 @@ async def get_assignment_progress(
         )
 
     # Check if assignment exists
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+    assignment = await db.scalar(select(Assignment).where(Assignment.id == assignment_id))
     if not assignment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
         )
 
     # Get progress
-    progress = get_assignment_progress(db, student_id, assignment_id)
+    progress = await get_assignment_progress(db, student_id, assignment_id)
 
     if not progress:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Progress not found"
         )
 
+    progress.assignment = assignment
+
     return progress
 
 
@@ -236,7 +217,7 @@ async def update_assignment_progress(
     assignment_id: int,
     progress_data: AssignmentProgressUpdate,
     student_id: int = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Update progress for an assignment"""
@@ -254,21 +235,21 @@ async def update_assignment_progress(
         )
 
     # Check if assignment exists
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+    assignment = await db.scalar(select(Assignment).where(Assignment.id == assignment_id))
     if not assignment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
         )
 
     # Check if student is enrolled in the course
-    if not check_enrollment(db, student_id, assignment.course_id):
+    if not await check_enrollment(db, student_id, assignment.course_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Student is not enrolled in this course",
         )
 
     # Get progress
-    progress = get_assignment_progress(db, student_id, assignment_id)
+    progress = await get_assignment_progress(db, student_id, assignment_id)
 
     if not progress:
         raise HTTPException(
@@ -292,11 +273,13 @@ async def update_assignment_progress(
     ):
         progress.submitted_at = datetime.now()
 
-    db.commit()
-    db.refresh(progress)
+    await db.commit()
+    await db.refresh(progress)
 
     # Update course progress
-    update_course_progress(db, student_id, assignment.course_id)
+    await update_course_progress(db, student_id, assignment.course_id)
+
+    progress.assignment = assignment
 
     return progress
 
@@ -307,7 +290,7 @@ async def update_assignment_progress(
 async def get_course_progress(
     course_id: int,
     student_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get progress for a course"""
@@ -321,21 +304,21 @@ async def get_course_progress(
         )
 
     # Check if course exists
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
         )
 
     # Check if student is enrolled in the course
-    if not check_enrollment(db, student_id, course_id):
+    if not await check_enrollment(db, student_id, course_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Student is not enrolled in this course",
         )
 
     # Get or create progress
-    progress = get_or_create_course_progress(db, student_id, course_id)
+    progress = await get_or_create_course_progress(db, student_id, course_id)
 
     return progress
 
@@ -343,17 +326,20 @@ async def get_course_progress(
 @router.get(
     "/courses/{course_id}/assignments",
     response_model=List[AssignmentWithProgressResponse],
+    dependencies=[Depends(QueryBudget(6))],
 )
 async def get_assignments_with_progress(
     course_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get all assignments for a course with progress for the current user"""
     user_id = current_user.get("user_id")
 
     # Check if course exists
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
@@ -365,44 +351,34 @@ async def get_assignments_with_progress(
 
     if not (is_teacher or is_admin):
         # Check if student is enrolled
-        if not check_enrollment(db, user_id, course_id):
+        if not await check_enrollment(db, user_id, course_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to view this course",
             )
 
-    # Get all assignments for the course
-    assignments = db.query(Assignment).filter(Assignment.course_id == course_id).all()
-
-    # Get progress for each assignment
-    result = []
-    for assignment in assignments:
-        progress = get_assignment_progress(db, user_id, assignment.id)
-
-        assignment_dict = assignment.to_dict()
-
-        if progress:
-            assignment_dict.update(
-                {
-                    "is_completed": progress.is_completed,
-                    "submission_file_key": progress.submission_file_key,
-                    "score": progress.score,
-                    "feedback": progress.feedback,
-                }
-            )
-        else:
-            assignment_dict.update(
-                {
-                    "is_completed": False,
-                    "submission_file_key": None,
-                    "score": None,
-                    "feedback": None,
-                }
-            )
-
-        result.append(AssignmentWithProgressResponse(**assignment_dict))
+    not_modified = await conditional_get(
+        request,
+        response,
+        db,
+        changes(Assignment, Assignment.course_id == course_id),
+        changes(
+            AssignmentProgress,
+            AssignmentProgress.student_id == user_id,
+            AssignmentProgress.assignment_id.in_(
+                select(Assignment.id).where(Assignment.course_id == course_id)
+            ),
+        ),
+        vary=user_id,
+    )
+    if not_modified is not None:
+        return not_modified
 
-    return result
+    # Assignments and the user's progress in one LEFT OUTER JOIN
+    assignments = await progress_service.get_assignments_with_progress(
+        db, course_id, user_id
+    )
+    return json_response(assignments_with_progress_adapter.dump_json(assignments), response)
 
 
 @router.post(
@@ -411,52 +387,45 @@ async def get_assignments_with_progress(
 )
 async def mark_assignment_complete(
     assignment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Mark an assignment as complete for the current user"""
     user_id = current_user.get("user_id")
 
     # Check if assignment exists
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+    assignment = await db.scalar(select(Assignment).where(Assignment.id == assignment_id))
     if not assignment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
         )
 
     # Check if student is enrolled in the course
-    if not check_enrollment(db, user_id, assignment.course_id):
+    if not await check_enrollment(db, user_id, assignment.course_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not enrolled in this course",
         )
 
-    # Get progress or create new
-    progress = get_assignment_progress(db, user_id, assignment_id)
-
-    if not progress:
-        progress = AssignmentProgress(
-            student_id=user_id,
-            assignment_id=assignment_id,
-            is_completed=True,
-            completed_at=datetime.now(),
-        )
-        db.add(progress)
-    else:
-        progress.is_completed = True
-        if not progress.completed_at:
-            progress.completed_at = datetime.now()
+    progress, _ = await progress_service.get_or_create_assignment_progress(
+        db, user_id, assignment_id
+    )
+    progress.is_completed = True
+    if not progress.completed_at:
+        progress.completed_at = datetime.now()
 
-    db.commit()
-    db.refresh(progress)
+    await db.commit()
+    await db.refresh(progress)
 
     # Update course progress
-    update_course_progress(db, user_id, assignment.course_id)
+    await update_course_progress(db, user_id, assignment.course_id)
+
+    progress.assignment = assignment
 
     return progress
 
 
-def get_assignment_progress(db: Session, student_id: int, assignment_id: int) -> Optional[AssignmentProgress]:
+async def get_assignment_progress(db: AsyncSession, student_id: int, assignment_id: int) -> Optional[AssignmentProgress]:
     """
     Get progress for a specific assignment.
 
@@ -468,8 +437,9 @@ def get_assignment_progress(db: Session, student_id: int, assignment_id: int) ->
     Returns:
         Optional[AssignmentProgress]: Progress record if found, None otherwise
     """
-    return db.query(AssignmentProgress).filter(
-        AssignmentProgress.student_id == student_id,
-        AssignmentProgress.assignment_id == assignment_id,
-        AssignmentProgress.is_completed is True  # Fixed comparison
-    ).first()
+    return await db.scalar(
+        select(AssignmentProgress).where(
+            AssignmentProgress.student_id == student_id,
+            AssignmentProgress.assignment_id == assignment_id,
+        )
+    )
@@ -1,13 +1,25 @@
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import List, Optional, Sequence
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from starlette import status
 
-from backend.dependencies.getdb import get_db
-from backend.models import Course, Section
+from backend.dependencies.getdb import get_async_db
+from backend.dependencies.query_budget import QueryBudget
+from backend.models import Assignment, AssignmentProgress, Course, Section
 from backend.oauth2 import get_current_user_jwt
+from backend.services import progress_service
+from backend.services.course_access import get_course_access
+from backend.services.http_cache import changes, conditional_get
+from backend.responses import json_response
 from backend.schemas.section import (
+    CourseOutline,
+    OutlineAssignment,
+    OutlineSection,
     SectionCreate,
     SectionResponse,
     SectionUpdate,
@@ -16,12 +28,14 @@ from backend.schemas.section import (
 
 router = APIRouter(prefix="/sections", tags=["sections"])
 
+section_list_adapter = TypeAdapter(List[SectionWithAssignments])
+
 
 @router.post("", response_model=SectionResponse, status_code=status.HTTP_201_CREATED)
 async def create_section(
     course_id: int,
     section_data: SectionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Create a new section for a course"""
@@ -33,7 +47,7 @@ async def create_section(
         )
 
     # Check if course exists and user is the teacher of the course
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
@@ -53,11 +67,11 @@ async def create_section(
 
     try:
         db.add(section)
-        db.commit()
-        db.refresh(section)
+        await db.commit()
+        await db.refresh(section)
         return section
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating section: {str(e)}",
@@ -67,49 +81,61 @@ async def create_section(
 @router.get("/{section_id}", response_model=SectionWithAssignments)
 async def get_section(
     section_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get a section by ID with its assignments"""
-    section = db.query(Section).filter(Section.id == section_id).first()
-    if not section:
+    course_id = await db.scalar(select(Section.course_id).where(Section.id == section_id))
+    if course_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Section not found"
         )
 
-    # Get the associated course to check permissions
-    course = db.query(Course).filter(Course.id == section.course_id).first()
-
     # Check if user has permission to view (enrolled in course, teacher, or admin)
-    is_teacher = course.teacher_id == current_user.get("user_id")
+    access = await get_course_access(db, current_user.get("user_id"), course_id)
     is_admin = current_user.get("role") == "admin"
 
-    if not (is_teacher or is_admin):
-        # Check if student is enrolled in the course
-        is_enrolled = False
-        for student in course.students:
-            if student.id == current_user.get("user_id"):
-                is_enrolled = True
-                break
+    if not (access.is_teacher or access.is_enrolled or is_admin):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this section",
+        )
 
-        if not is_enrolled:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to view this section",
-            )
+    not_modified = await conditional_get(
+        request,
+        response,
+        db,
+        changes(Section, Section.id == section_id),
+        changes(Assignment, Assignment.section_id == section_id),
+    )
+    if not_modified is not None:
+        return not_modified
 
+    section = await db.scalar(
+        select(Section)
+        .options(selectinload(Section.assignments))
+        .where(Section.id == section_id)
+    )
     return section
 
 
-@router.get("/course/{course_id}", response_model=List[SectionWithAssignments])
+@router.get(
+    "/course/{course_id}",
+    response_model=List[SectionWithAssignments],
+    dependencies=[Depends(QueryBudget(6))],
+)
 async def get_course_sections(
     course_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get all sections for a course"""
     # Check if course exists
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
@@ -121,11 +147,9 @@ async def get_course_sections(
 
     if not (is_teacher or is_admin):
         # Check if student is enrolled in the course
-        is_enrolled = False
-        for student in course.students:
-            if student.id == current_user.get("user_id"):
-                is_enrolled = True
-                break
+        is_enrolled = (
+            await get_course_access(db, current_user.get("user_id"), course.id)
+        ).is_enrolled
 
         if not is_enrolled:
             raise HTTPException(
@@ -133,33 +157,173 @@ async def get_course_sections(
                 detail="Not authorized to view sections for this course",
             )
 
+    not_modified = await conditional_get(
+        request,
+        response,
+        db,
+        changes(Section, Section.course_id == course_id),
+        changes(Assignment, Assignment.course_id == course_id),
+    )
+    if not_modified is not None:
+        return not_modified
+
     # Get all sections for the course
     sections = (
-        db.query(Section)
-        .filter(Section.course_id == course_id)
-        .order_by(Section.order)
-        .all()
+        await db.scalars(
+            select(Section)
+            .options(selectinload(Section.assignments))
+            .where(Section.course_id == course_id)
+            .order_by(Section.order)
+        )
+    ).all()
+    return json_response(
+        section_list_adapter.dump_json(
+            section_list_adapter.validate_python(sections, from_attributes=True)
+        ),
+        response,
+    )
+
+
+def outline_assignment(assignment: Assignment, progress: Optional[dict]) -> OutlineAssignment:
+    item = OutlineAssignment(
+        id=assignment.id,
+        title=assignment.title,
+        order=assignment.order,
+        due_date=assignment.due_date,
     )
-    return sections
+    if progress is not None:
+        row = progress.get(assignment.id)
+        item.is_completed = bool(row and row.is_completed)
+        item.score = row.score if row else None
+    return item
+
+
+def build_outline(
+    course_id: int,
+    sections: Sequence[Section],
+    assignments: Sequence[Assignment],
+    progress: Optional[dict],
+) -> CourseOutline:
+    """
+    Group assignments under their sections, in (order, id) order.
+
+    Assignments without a section are listed in ``unsectioned``. ``progress``
+    maps assignment ids to progress rows, None leaves the progress fields out.
+    """
+    by_section = defaultdict(list)
+    for assignment in sorted(assignments, key=lambda a: (a.order, a.id)):
+        by_section[assignment.section_id].append(outline_assignment(assignment, progress))
+    return CourseOutline(
+        course_id=course_id,
+        sections=[
+            OutlineSection(
+                id=section.id,
+                title=section.title,
+                order=section.order,
+                assignments=by_section.get(section.id, []),
+            )
+            for section in sorted(sections, key=lambda s: (s.order, s.id))
+        ],
+        unsectioned=by_section.get(None, []),
+    )
+
+
+@router.get("/course/{course_id}/outline", response_model=CourseOutline)
+async def get_course_outline(
+    course_id: int,
+    request: Request,
+    response: Response,
+    include_progress: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_jwt),
+):
+    """
+    Sections of a course with their assignments, ordered for rendering.
+
+    With ``include_progress`` the current student's completion and score
+    are added to each assignment. Answers 304 when the client's copy is
+    still current.
+    """
+    user_id = current_user.get("user_id")
+    access = await get_course_access(db, user_id, course_id)
+    if current_user.get("role") != "admin" and not (access.is_teacher or access.is_enrolled):
+        if await db.scalar(select(Course.id).where(Course.id == course_id)) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Course not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view sections for this course",
+        )
+
+    with_progress = include_progress and access.is_enrolled
+    # Assignments by course, so unsectioned ones count too
+    sources = [
+        changes(Section, Section.course_id == course_id),
+        changes(Assignment, Assignment.course_id == course_id),
+    ]
+    if with_progress:
+        sources.append(
+            changes(
+                AssignmentProgress,
+                AssignmentProgress.student_id == user_id,
+                AssignmentProgress.assignment_id.in_(
+                    select(Assignment.id).where(Assignment.course_id == course_id)
+                ),
+            )
+        )
+    not_modified = await conditional_get(
+        request, response, db, *sources, vary=user_id if with_progress else None
+    )
+    if not_modified is not None:
+        return not_modified
+
+    # Sections and all assignments of the course in two queries
+    sections = (
+        await db.scalars(select(Section).where(Section.course_id == course_id))
+    ).all()
+    assignments = (
+        await db.scalars(select(Assignment).where(Assignment.course_id == course_id))
+    ).all()
+
+    # assignment id -> progress row, only for students asking for it
+    progress = None
+    if with_progress:
+        rows = await db.execute(
+            select(
+                AssignmentProgress.assignment_id,
+                AssignmentProgress.is_completed,
+                AssignmentProgress.score,
+            )
+            .join(Assignment, Assignment.id == AssignmentProgress.assignment_id)
+            .where(
+                Assignment.course_id == course_id,
+                AssignmentProgress.student_id == user_id,
+            )
+        )
+        progress = {row.assignment_id: row for row in rows}
+
+    outline = build_outline(course_id, sections, assignments, progress)
+    return json_response(outline.model_dump_json(), response)
 
 
 @router.put("/{section_id}", response_model=SectionResponse)
 async def update_section(
     section_id: int,
     section_data: SectionUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Update a section"""
     # Check if section exists
-    section = db.query(Section).filter(Section.id == section_id).first()
+    section = await db.scalar(select(Section).where(Section.id == section_id))
     if not section:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Section not found"
         )
 
     # Get the associated course
-    course = db.query(Course).filter(Course.id == section.course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == section.course_id))
 
     if current_user.get("role") != "admin" and course.teacher_id != current_user.get(
         "user_id"
@@ -175,11 +339,11 @@ async def update_section(
         setattr(section, key, value)
 
     try:
-        db.commit()
-        db.refresh(section)
+        await db.commit()
+        await db.refresh(section)
         return section
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating section: {str(e)}",
@@ -189,19 +353,19 @@ async def update_section(
 @router.delete("/{section_id}", status_code=status.HTTP_200_OK)
 async def delete_section(
     section_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Delete a section"""
     # Check if section exists
-    section = db.query(Section).filter(Section.id == section_id).first()
+    section = await db.scalar(select(Section).where(Section.id == section_id))
     if not section:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Section not found"
         )
 
     # Get the associated course
-    course = db.query(Course).filter(Course.id == section.course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == section.course_id))
 
     # Check if user is the teacher of the course or admin
     if current_user.get("role") != "admin" and course.teacher_id != current_user.get(
@@ -213,11 +377,18 @@ async def delete_section(
         )
 
     try:
-        db.delete(section)
-        db.commit()
+        # The section's assignments are deleted with it
+        assignment_ids = (
+            await db.scalars(select(Assignment.id).where(Assignment.section_id == section_id))
+        ).all()
+        await progress_service.remove_assignments_from_progress(
+            db, section.course_id, assignment_ids
+        )
+        await db.delete(section)
+        await db.commit()
         return {"message": "Section deleted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting section: {str(e)}",
@@ -1,59 +1,81 @@
 """
 Module for handling student-related operations including course enrollment and management.
 """
-from typing import List, Optional
+import csv
+from typing import List, Optional, Sequence
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, HTTPException, UploadFile
 from fastapi.params import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from starlette import status
 
-from backend.database import get_db
-from backend.models import OurUsers, Course
+from backend.dependencies.getdb import get_async_db
+from backend.dependencies.pagination import CoursePageParams
+from backend.dependencies.query_budget import QueryBudget
+from backend.models import OurUsers, Course, Section
 from backend.models.enrollment import Enrollment
 from backend.oauth2 import get_current_user_jwt
 from backend.schemas.course import CourseResponse
+from backend.schemas.enrollment import (
+    MAX_BULK_ENROLLMENT,
+    BulkEnrollmentRequest,
+    BulkEnrollmentResponse,
+)
 from backend.schemas.user import UserLoginResponse
+from backend.services import course_access, enrollment_service
 
 router = APIRouter(
     prefix="/students",
     tags=["students"]
 )
 
+# CourseResponse serializes the teacher and the section tree
+COURSE_RESPONSE_LOAD_OPTIONS = (
+    selectinload(Course.teacher),
+    selectinload(Course.sections).selectinload(Section.assignments),
+)
+
+MAX_ENROLLMENT_CSV_SIZE = 1024 * 1024  # 1 MB
+
 
 @router.post("/enrollments/courses/{course_id}")
 async def enroll_in_course(
     course_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt)) -> dict:
     
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="This course does not exist"
         )
 
-    student: Optional[OurUsers] = db.query(OurUsers).filter(
-        OurUsers.id == current_user['user_id']
-    ).first()
+    student: Optional[OurUsers] = await db.scalar(
+        select(OurUsers).where(OurUsers.id == current_user['user_id'])
+    )
     if student is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    existing_enrollment = db.query(Enrollment).filter(
-        Enrollment.user_id == student.id,
-        Enrollment.course_id == course_id
-    ).first()
+    existing_enrollment = await db.scalar(
+        select(Enrollment).where(
+            Enrollment.user_id == student.id,
+            Enrollment.course_id == course_id
+        )
+    )
 
     if existing_enrollment:
         return {"message": "User is already enrolled in this course"}
 
     new_enrollment = Enrollment(user_id=student.id, course_id=course_id)
     db.add(new_enrollment)
-    db.commit()
+    await db.commit()
+    await course_access.grant_enrollment([student.id], course_id)
 
     return {"message": "User successfully enrolled in the course"}
 
@@ -65,7 +87,7 @@ async def enroll_in_course(
 )
 async def get_course_students(
     course_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Get all students enrolled in a specific course taught by the current teacher"""
@@ -82,10 +104,8 @@ async def get_course_students(
             detail="Invalid user token. Missing teacher ID.",
         )
 
-    course = (
-        db.query(Course)
-        .filter(Course.id == course_id, Course.teacher_id == teacher_id)
-        .first()
+    course = await db.scalar(
+        select(Course).where(Course.id == course_id, Course.teacher_id == teacher_id)
     )
     if not course:
         raise HTTPException(
@@ -94,12 +114,13 @@ async def get_course_students(
         )
 
     students = (
-        db.query(OurUsers)
-        .join(Enrollment)
-        .filter(Enrollment.course_id == course_id)
-        .distinct()
-        .all()
-    )
+        await db.scalars(
+            select(OurUsers)
+            .join(Enrollment)
+            .where(Enrollment.course_id == course_id)
+            .distinct()
+        )
+    ).all()
 
     return students
 
@@ -110,7 +131,7 @@ async def get_course_students(
 )
 async def check_enrollment_status(
     course_id: int,
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     current_user: dict = Depends(get_current_user_jwt)
 ):
     """Check if the current user is enrolled in a specific course"""
@@ -121,17 +142,19 @@ async def check_enrollment_status(
             detail="Invalid user token. Missing user ID."
         )
 
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found"
         )
 
-    enrollment = db.query(Enrollment).filter(
-        Enrollment.user_id == user_id,
-        Enrollment.course_id == course_id
-    ).first()
+    enrollment = await db.scalar(
+        select(Enrollment).where(
+            Enrollment.user_id == user_id,
+            Enrollment.course_id == course_id
+        )
+    )
 
     return {"is_enrolled": enrollment is not None}
 
@@ -142,7 +165,8 @@ async def check_enrollment_status(
     status_code=status.HTTP_200_OK
 )
 async def get_enrolled_courses(
-    db: Session = Depends(get_db), 
+    page: CoursePageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt)
 ):
     """Get all courses the current student is enrolled in"""
@@ -153,26 +177,127 @@ async def get_enrolled_courses(
             detail="Invalid user token. Missing student ID.",
         )
 
-    student = db.query(OurUsers).filter(OurUsers.id == student_id).first()
+    student = await db.scalar(select(OurUsers).where(OurUsers.id == student_id))
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Student not found."
         )
 
     courses = (
-        db.query(Course).join(Enrollment).filter(Enrollment.user_id == student_id).all()
-    )
+        await db.scalars(
+            page.apply(
+                select(Course)
+                .join(Enrollment)
+                .where(Enrollment.user_id == student_id)
+                .options(*COURSE_RESPONSE_LOAD_OPTIONS),
+                key_column=Enrollment.course_id,
+            )
+        )
+    ).all()
 
     return courses
 
 
+async def check_enrollment_manager(db: AsyncSession, current_user: dict, course_id: int) -> None:
+    """Only the teacher of the course and admins manage its enrollments"""
+    if current_user.get("role") not in ["teacher", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+        )
+
+    teacher_id = await db.scalar(select(Course.teacher_id).where(Course.id == course_id))
+    if teacher_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="This course does not exist"
+        )
+    if current_user.get("role") != "admin" and teacher_id != current_user.get("user_id"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
+        )
+
+
+async def enroll_entries(
+    db: AsyncSession, course_id: int, entries: Sequence[enrollment_service.Entry]
+) -> BulkEnrollmentResponse:
+    result = await enrollment_service.bulk_enroll(db, course_id, entries)
+    await db.commit()
+    await course_access.grant_enrollment(
+        [row.user_id for row in result.results if row.status == enrollment_service.ENROLLED],
+        course_id,
+    )
+    return result
+
+
+@router.post(
+    "/teaching/courses/{course_id}/students",
+    response_model=BulkEnrollmentResponse,
+    dependencies=[Depends(QueryBudget(6))],
+)
+async def bulk_enroll_students(
+    course_id: int,
+    enrollment_request: BulkEnrollmentRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_jwt),
+):
+    """
+    Enroll many users at once by id or email, with an outcome per entry.
+
+    Users who are already enrolled or do not exist are reported in the
+    results and do not fail the request.
+    """
+    await check_enrollment_manager(db, current_user, course_id)
+
+    entries = [*enrollment_request.user_ids, *(email.strip() for email in enrollment_request.emails)]
+    return await enroll_entries(db, course_id, entries)
+
+
+@router.post(
+    "/teaching/courses/{course_id}/students/csv",
+    response_model=BulkEnrollmentResponse,
+    dependencies=[Depends(QueryBudget(6))],
+)
+async def bulk_enroll_students_csv(
+    course_id: int,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user_jwt),
+):
+    """Enroll the users listed in a CSV file, one user id or email per row"""
+    await check_enrollment_manager(db, current_user, course_id)
+
+    content = await file.read(MAX_ENROLLMENT_CSV_SIZE + 1)
+    if len(content) > MAX_ENROLLMENT_CSV_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size is {MAX_ENROLLMENT_CSV_SIZE // 1024} KB",
+        )
+    try:
+        entries = enrollment_service.parse_csv(content)
+    except (UnicodeDecodeError, csv.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid CSV file"
+        )
+    if not entries:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="The file lists no users"
+        )
+    if len(entries) > MAX_BULK_ENROLLMENT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_ENROLLMENT} users can be enrolled per request",
+        )
+
+    return await enroll_entries(db, course_id, entries)
+
+
 @router.get(
     "/teaching/courses",
     response_model=List[CourseResponse],
     status_code=status.HTTP_200_OK,
 )
 async def get_teaching_courses(
-    db: Session = Depends(get_db), 
+    page: CoursePageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt)
 ):
     """Get all courses the current teacher is teaching"""
@@ -189,7 +314,15 @@ async def get_teaching_courses(
             detail="Invalid user token. Missing teacher ID.",
         )
 
-    courses = db.query(Course).filter(Course.teacher_id == teacher_id).all()
+    courses = (
+        await db.scalars(
+            page.apply(
+                select(Course)
+                .where(Course.teacher_id == teacher_id)
+                .options(*COURSE_RESPONSE_LOAD_OPTIONS)
+            )
+        )
+    ).all()
 
     return courses
 
@@ -200,7 +333,7 @@ async def get_teaching_courses(
 async def remove_student_enrollment(
     course_id: int,
     student_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(get_current_user_jwt),
 ):
     """Remove a student's enrollment from a course"""
@@ -209,22 +342,22 @@ async def remove_student_enrollment(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
         )
 
-    course = db.query(Course).filter(Course.id == course_id).first()
+    course = await db.scalar(select(Course).where(Course.id == course_id))
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="This course does not exist"
         )
 
-    student = db.query(OurUsers).filter(OurUsers.id == student_id).first()
+    student = await db.scalar(select(OurUsers).where(OurUsers.id == student_id))
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="This student does not exist"
         )
 
-    enrollment = (
-        db.query(Enrollment)
-        .filter(Enrollment.course_id == course_id, Enrollment.user_id == student_id)
-        .first()
+    enrollment = await db.scalar(
+        select(Enrollment).where(
+            Enrollment.course_id == course_id, Enrollment.user_id == student_id
+        )
     )
     if not enrollment:
         raise HTTPException(
@@ -232,7 +365,8 @@ async def remove_student_enrollment(
             detail="Student is not enrolled in this course",
         )
 
-    db.delete(enrollment)
-    db.commit()
+    await db.delete(enrollment)
+    await db.commit()
+    await course_access.revoke_enrollment([student_id], course_id)
 
     return {"message": "Student successfully removed from the course"}
@@ -1,19 +1,37 @@
 import os
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from backend import config
+from backend.config import config
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('DATABASE_PORT')}/{os.getenv('POSTGRES_DB')}"
+ASYNC_SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(
+    "postgresql://", "postgresql+asyncpg://", 1
+)
 
 
-# Create a synchronous engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+# Pool size, recycling and statement echo come from the ENVIRONMENT profile
+ENGINE_OPTIONS = config.engine_options()
+
+# Create a synchronous engine (startup tasks, Celery workers and Alembic)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **ENGINE_OPTIONS)
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Create an asynchronous engine for request handlers
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **ENGINE_OPTIONS)
+
+# Objects stay usable after commit, lazy loading is not available in async code
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Base model
 Base = declarative_base()
 
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from fastapi import Query
+from sqlalchemy import Select
+
+from backend.models import Course
+
+
+class CoursePageParams:
+    """Keyset pagination and filters shared by the course listing endpoints.
+
+    Pages are ordered by course id; to fetch the next page pass the id of the
+    last course received as ``after_id``.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(50, ge=1, le=100),
+        after_id: Optional[int] = Query(None, ge=0),
+        category: Optional[str] = Query(None),
+        teacher_id: Optional[int] = Query(None),
+    ):
+        self.limit = limit
+        self.after_id = after_id
+        self.category = category
+        self.teacher_id = teacher_id
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.limit}:{self.after_id}:{self.category}:{self.teacher_id}"
+
+    def apply(self, stmt: Select, key_column=Course.id) -> Select:
+        """Add filters, the cursor condition, ordering and limit to a course query.
+
+        ``key_column`` must equal ``Course.id`` in the query, e.g.
+        ``Enrollment.course_id`` so the enrollment primary key serves the cursor.
+        """
+        if self.category is not None:
+            stmt = stmt.where(Course.category == self.category)
+        if self.teacher_id is not None:
+            stmt = stmt.where(Course.teacher_id == self.teacher_id)
+        if self.after_id is not None:
+            stmt = stmt.where(key_column > self.after_id)
+        return stmt.order_by(key_column).limit(self.limit)
@@ -0,0 +1,19 @@
+from backend.services.instrumentation import current_request_stats
+
+
+class QueryBudget:
+    """Declare how many SQL statements a route may issue per request.
+
+    Only checked when QUERY_BUDGET_MODE is warn or raise, e.g.
+    ``dependencies=[Depends(QueryBudget(4))]``. Statements issued by other
+    dependencies such as authentication count towards the budget.
+    """
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+
+    async def __call__(self) -> None:
+        # Async so it runs in the request's context rather than a worker thread
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.query_budget = self.max_queries
@@ -0,0 +1,85 @@
+import time
+import uuid
+from collections import deque
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from backend.cache import TTLCache, get_redis, redis_settings
+
+
+class RateLimiter:
+    """Sliding-window limit per client IP and per submitted email.
+
+    Used as a route dependency so throttled requests are rejected before the
+    endpoint hashes passwords or queries the database. Windows are kept in
+    Redis sorted sets shared by all workers; while Redis is unavailable each
+    worker falls back to its own in-memory windows.
+    """
+
+    def __init__(self, scope: str, limit: int, window: int):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+        self._local = TTLCache(window, maxsize=10000)
+
+    async def __call__(self, request: Request) -> None:
+        if not redis_settings.RATE_LIMIT_ENABLED:
+            return
+
+        keys = [f"ratelimit:{self.scope}:ip:{request.client.host if request.client else 'unknown'}"]
+        email = await _submitted_email(request)
+        if email:
+            keys.append(f"ratelimit:{self.scope}:email:{email.strip().lower()}")
+
+        try:
+            counts = await self._hit_redis(keys)
+        except RedisError as e:
+            print(f"Warning: Redis not available, using local rate limits: {str(e)}")
+            counts = [self._hit_local(key) for key in keys]
+
+        if any(count > self.limit for count in counts):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(self.window)},
+            )
+
+    async def _hit_redis(self, keys: List[str]) -> List[int]:
+        now = time.time()
+        async with get_redis().pipeline(transaction=True) as pipe:
+            for key in keys:
+                pipe.zremrangebyscore(key, 0, now - self.window)
+                pipe.zadd(key, {f"{now}:{uuid.uuid4().hex}": now})
+                pipe.zcard(key)
+                pipe.expire(key, self.window)
+            results = await pipe.execute()
+        # zcard result of each key
+        return results[2::4]
+
+    def _hit_local(self, key: str) -> int:
+        now = time.monotonic()
+        hits = self._local.get(key)
+        if hits is None:
+            hits = deque()
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        hits.append(now)
+        self._local.set(key, hits)
+        return len(hits)
+
+
+async def _submitted_email(request: Request) -> Optional[str]:
+    # Email from the query string or a JSON body, whichever the route uses
+    email = request.query_params.get("email")
+    if email:
+        return email
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        if isinstance(body, dict) and isinstance(body.get("email"), str):
+            return body["email"]
+    return None
@@ -1,6 +1,9 @@
+import asyncio
+
 from fastapi import FastAPI, Depends
 from sqlalchemy.orm import Session
 
+from backend.cache import close_redis, listen_for_invalidations
 from backend.controllers import (
     auth,
     courses,
@@ -10,14 +13,18 @@ from backend.controllers import (
     sections,
     progress,
 )
-from backend.database import Base, engine
+from backend.database import Base, engine, async_engine
 from backend.dependencies.getdb import get_db
 from backend.middlewares.cors import setup_cors
+from backend.middlewares.metrics import setup_metrics
+from backend.responses import DefaultResponse
+from backend.services.password_hasher import shutdown_password_hasher
 from backend.utils import create_admin_user
 
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultResponse)
 
 setup_cors(app)
+setup_metrics(app)
 Base.metadata.create_all(bind=engine)
 app.include_router(auth.router)
 app.include_router(courses.router)
@@ -31,9 +38,21 @@ app.include_router(progress.router)
 @app.on_event("startup")
 async def startup_event():
     """Initialize application data on startup"""
+    app.state.invalidation_listener = asyncio.create_task(
+        listen_for_invalidations()
+    )
     db = next(get_db())
     try:
         # Create admin user if it doesn't exist
         create_admin_user(db)
     finally:
         db.close()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled database and Redis connections"""
+    app.state.invalidation_listener.cancel()
+    await async_engine.dispose()
+    await close_redis()
+    shutdown_password_hasher()
@@ -0,0 +1,77 @@
+import os
+import time
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+
+from backend.database import async_engine, engine
+from backend.services.instrumentation import (
+    HTTP_IN_PROGRESS,
+    RequestStats,
+    current_request_stats,
+    instrument_boto3_client,
+    instrument_engine,
+    observe_request,
+)
+from backend.services.query_budget import enforce_query_budget, query_budget_enabled
+from backend.services.storage import s3
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and per-request work by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats(track_statements=query_budget_enabled())
+        token = current_request_stats.set(stats)
+        HTTP_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            observe_request(
+                scope["method"], route_label(scope), status_code, time.perf_counter() - start, stats
+            )
+            current_request_stats.reset(token)
+        # Runs after the response is sent; in raise mode the error reaches the
+        # test client, which re-raises it in the test
+        enforce_query_budget(scope["method"], route_label(scope), stats)
+
+
+def route_label(scope) -> str:
+    # The router stores the matched route in the scope, its template keeps
+    # label cardinality bounded
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    registry = REGISTRY
+    # With several worker processes each one writes to PROMETHEUS_MULTIPROC_DIR
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app: FastAPI) -> None:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    instrument_boto3_client(s3)
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
@@ -4,6 +4,7 @@ from .section import Section
 from .assignment import Assignment
 from .progress import AssignmentProgress, CourseProgress
 from .enrollment import Enrollment
+from .file import FileMetadata
 
 # Import all models here
 # This way when we import Base to alembic env.py all models are also will be imported
@@ -1,16 +1,26 @@
+from datetime import datetime, timezone
+
 from sqlalchemy import Column, TIMESTAMP, text
 
 from backend.database import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class BaseModel(Base):
     __abstract__ = True
 
     created_at = Column(
         TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
     )
+    # Set on every ORM and Core UPDATE, HTTP validators are derived from it
     updated_at = Column(
-        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=text("now()"),
+        onupdate=utcnow,
     )
 
     def to_dict(self) -> dict:
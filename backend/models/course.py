@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ARRAY
+from sqlalchemy import Column, Integer, Float, String, ARRAY, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from backend.models.basemodel import BaseModel
@@ -8,6 +8,11 @@ from sqlalchemy.sql.schema import ForeignKey
 
 class Course(BaseModel):
     __tablename__ = "courses"
+    ### Keyset pagination: filter column first, then the id cursor ###
+    __table_args__ = (
+        Index("ix_courses_category_id", "category", "id"),
+        Index("ix_courses_teacher_id_id", "teacher_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, index=True, autoincrement=True
@@ -19,6 +24,9 @@ class Course(BaseModel):
     lessons_duration: Mapped[int] = mapped_column(Integer)
     rating: Mapped[int] = mapped_column(Integer)
     ratings_count: Mapped[int] = mapped_column(Integer, default=0)
+    ### Running aggregate of ratings, rating keeps the rounded average ###
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rating_average: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
     files = Column(ARRAY(String))  # Для PostgreSQL
     teacher_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("our_users.id"), nullable=False
@@ -50,6 +58,7 @@ class Course(BaseModel):
             "lessons_duration": self.lessons_duration,
             "rating": self.rating,
             "ratings_count": self.ratings_count,
+            "rating_average": self.rating_average,
             "files": self.files,
             "teacher_id": self.teacher_id,
         }
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.models.basemodel import BaseModel
+
+
+class FileMetadata(BaseModel):
+    """One row per object stored in S3, listings are served from this table"""
+
+    __tablename__ = "files"
+
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, index=True, autoincrement=True
+    )
+    key: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)  # course, task, submission, general
+    owner_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("our_users.id", ondelete="SET NULL"), nullable=True
+    )
+    course_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=True
+    )
+    assignment_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("assignments.id", ondelete="CASCADE"), nullable=True
+    )
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    etag: Mapped[str] = mapped_column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ix_files_course_id_kind", "course_id", "kind"),
+        Index("ix_files_assignment_id_kind_owner_id", "assignment_id", "kind", "owner_id"),
+    )
+
+    @property
+    def last_modified(self) -> datetime:
+        return self.updated_at
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from backend.models.basemodel import BaseModel
@@ -8,6 +8,11 @@ from backend.models.basemodel import BaseModel
 class AssignmentProgress(BaseModel):
     __tablename__ = "assignment_progress"
 
+    ### One progress record per student and assignment ###
+    __table_args__ = (
+        UniqueConstraint("student_id", "assignment_id", name="_student_assignment_progress_uc"),
+    )
+
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, index=True, autoincrement=True
     )
@@ -55,6 +60,11 @@ class AssignmentProgress(BaseModel):
 class CourseProgress(BaseModel):
     __tablename__ = "course_progress"
 
+    ### One progress record per student and course ###
+    __table_args__ = (
+        UniqueConstraint("student_id", "course_id", name="_student_course_progress_uc"),
+    )
+
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, index=True, autoincrement=True
     )
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, ForeignKey
+from sqlalchemy import Integer, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.models.basemodel import BaseModel
@@ -14,5 +14,10 @@ class Rating(BaseModel):
     course_id: Mapped[int] = mapped_column(Integer, ForeignKey("courses.id"))
     rating: Mapped[int] = mapped_column(Integer, nullable=False)
 
+    ### One vote per user and course ###
+    __table_args__ = (
+        UniqueConstraint("user_id", "course_id", name="_user_course_rating_uc"),
+    )
+
     user = relationship("OurUsers", backref="course_ratings")
     course = relationship("Course", backref="ratings")
@@ -1,36 +1,42 @@
 import os
 from datetime import timezone, datetime, timedelta
+from typing import Optional
 
 from fastapi import Depends, HTTPException, Cookie
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from backend.dependencies.getdb import get_db
+from backend.cache import user_cache
+from backend.dependencies.getdb import get_async_db
 from backend.models import OurUsers
+from backend.services.password_hasher import verify_password
 from backend.services.token_blacklist import is_blacklisted
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = os.environ.get("ALGORITHM")
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", 1))
 
 ### Check if user is in our DATABASE ###
-def authenticate_user(email: EmailStr, password: str, db):
-    user = db.query(OurUsers).filter(OurUsers.email == email).first()
+async def authenticate_user(email: EmailStr, password: str, db: AsyncSession):
+    user = await db.scalar(select(OurUsers).where(OurUsers.email == email))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
-    if not bcrypt_context.verify(password, user.hashed_password):
+    valid, new_hash = await verify_password(password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+    # Upgrade hashes created with a different BCRYPT_ROUNDS
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 ### Create a JWT token for user ###
@@ -51,10 +57,46 @@ def create_refresh_token(user_id: int):
     encode.update({"exp": expire})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
+### Signed description of a presigned upload, checked when it is confirmed ###
+def create_upload_token(
+    file_key: str,
+    user_id: int,
+    content_type: str,
+    course_id: Optional[int],
+    assignment_id: Optional[int],
+    expires_delta: timedelta,
+) -> str:
+    encode = {
+        "key": file_key,
+        "id": user_id,
+        "content_type": content_type,
+        "course_id": course_id,
+        "assignment_id": assignment_id,
+        "token_type": "upload_token",
+    }
+    expire = datetime.now(timezone.utc) + expires_delta
+    encode.update({"exp": expire})
+    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def verify_upload_token(upload_token: str, user_id: int) -> dict:
+    try:
+        payload = jwt.decode(upload_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired upload token"
+        )
+    if payload.get("token_type") != "upload_token" or payload.get("id") != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Upload token does not belong to this user"
+        )
+    return payload
+
 ### Get current user from cookie ###
 async def get_current_user_jwt(
     access_token: str = Cookie(None, alias="access_token"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,7 +108,7 @@ async def get_current_user_jwt(
 
     try:
         # Check if token is blacklisted
-        if is_blacklisted(access_token):
+        if await is_blacklisted(access_token):
             raise credentials_exception
 
         payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -82,9 +124,18 @@ async def get_current_user_jwt(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(OurUsers).filter(OurUsers.email == email).first()
-    if user is None:
-        raise credentials_exception
+    # Users validated recently are served from the in-process cache
+    if user_cache.get(user_id) != email:
+        user = (
+            await db.execute(
+                select(OurUsers.id, OurUsers.is_active).where(OurUsers.email == email)
+            )
+        ).first()
+        # The token's id must be the id of the account with that email; rows
+        # created before is_active had a default hold NULL and count as active
+        if user is None or user.id != user_id or user.is_active is False:
+            raise credentials_exception
+        user_cache.set(user_id, email)
         
     return {
         "user_id": user_id,
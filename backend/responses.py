@@ -0,0 +1,27 @@
+from typing import Optional, Union
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+# Default response class of the app, see backend/main.py
+DefaultResponse = ORJSONResponse
+
+
+def json_response(payload: Union[bytes, str], response: Optional[Response] = None) -> Response:
+    """
+    Wrap an already serialized body.
+
+    Hot endpoints serialize their schema once with ``TypeAdapter.dump_json``
+    or ``model_dump_json``; returning a Response makes FastAPI skip
+    validating and encoding it again against ``response_model``.
+
+    Args:
+        payload: JSON body
+        response: Response injected into the endpoint, its headers (e.g.
+            ETag from conditional_get) are copied
+
+    Returns:
+        Response: application/json response
+    """
+    headers = dict(response.headers) if response is not None else None
+    return Response(content=payload, media_type="application/json", headers=headers)
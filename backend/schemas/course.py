@@ -25,6 +25,7 @@ class CourseResponse(BaseModel):
     category: str
     rating: int
     ratings_count: int
+    rating_average: float = 0.0
     lessons_count: int
     lessons_duration: int
     files: Optional[List[str]] = None  ### Updated
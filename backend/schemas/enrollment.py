@@ -0,0 +1,36 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+# Entries per bulk request, ids and emails together
+MAX_BULK_ENROLLMENT = 10000
+
+
+class BulkEnrollmentRequest(BaseModel):
+    user_ids: List[int] = Field(default_factory=list)
+    emails: List[str] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def check_size(self):
+        total = len(self.user_ids) + len(self.emails)
+        if total == 0:
+            raise ValueError("Provide at least one user id or email")
+        if total > MAX_BULK_ENROLLMENT:
+            raise ValueError(f"At most {MAX_BULK_ENROLLMENT} users can be enrolled per request")
+        return self
+
+
+class BulkEnrollmentResult(BaseModel):
+    value: str  # the id or email as submitted
+    user_id: Optional[int] = None
+    status: str  # enrolled | already_enrolled | duplicate | not_found | invalid
+
+
+class BulkEnrollmentResponse(BaseModel):
+    course_id: int
+    enrolled: int
+    already_enrolled: int
+    duplicate: int
+    not_found: int
+    invalid: int
+    results: List[BulkEnrollmentResult]
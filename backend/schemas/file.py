@@ -1,16 +1,18 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class FileResponse(BaseModel):
-    """Schema for file information returned from S3"""
+    """Schema for file information, built from the files table"""
 
     key: str
     size: int
     last_modified: datetime
     etag: str
 
+    model_config = ConfigDict(from_attributes=True)
+
 
 class FileUploadResponse(BaseModel):
     """Schema for successful file upload response"""
@@ -23,3 +25,53 @@ class FileDeleteResponse(BaseModel):
     """Schema for successful file deletion response"""
 
     message: str
+
+
+class PresignedDownloadResponse(BaseModel):
+    """Schema for a short-lived direct download URL"""
+
+    url: str
+    expires_in: int
+
+
+class PresignedUploadRequest(BaseModel):
+    """Schema for requesting a direct upload to S3.
+
+    Without assignment_id the file is a course file (or a general file when
+    course_id is also empty); with it, a task file or, if submission is set,
+    the current student's submission.
+    """
+
+    filename: str
+    content_type: str
+    course_id: Optional[int] = None
+    assignment_id: Optional[int] = None
+    submission: bool = False
+    method: Literal["post", "put"] = "post"
+
+
+class PresignedUploadResponse(BaseModel):
+    """Schema for a direct upload, confirm it with upload_token afterwards"""
+
+    file_key: str
+    method: str
+    url: str
+    fields: Dict[str, str] = Field(default_factory=dict)
+    headers: Dict[str, str] = Field(default_factory=dict)
+    expires_in: int
+    upload_token: str
+
+
+class UploadConfirmRequest(BaseModel):
+    """Schema for confirming a finished direct upload"""
+
+    upload_token: str
+
+
+class PurgeStatusResponse(BaseModel):
+    """Schema for the progress of a background S3 purge"""
+
+    task_id: str
+    state: str
+    deleted: int = 0
+    error: Optional[str] = None
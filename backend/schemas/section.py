@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, ConfigDict
 
@@ -32,6 +33,27 @@ class SectionWithAssignments(SectionInDB):
     model_config = ConfigDict(from_attributes=True)
 
 
+class OutlineAssignment(BaseModel):
+    id: int
+    title: str
+    order: int
+    due_date: Optional[datetime] = None
+    # Set only when the outline is requested with the student's progress
+    is_completed: Optional[bool] = None
+    score: Optional[float] = None
+
+
+class OutlineSection(SectionInDB):
+    assignments: List[OutlineAssignment] = []
+
+
+class CourseOutline(BaseModel):
+    course_id: int
+    sections: List[OutlineSection] = []
+    # Assignments that belong to no section
+    unsectioned: List[OutlineAssignment] = []
+
+
 # This will be imported in assignment.py
 from backend.schemas.assignment import AssignmentInDB
 
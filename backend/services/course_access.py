@@ -0,0 +1,146 @@
+from typing import Iterable, NamedTuple, Set
+
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.cache import get_redis, redis_settings
+from backend.models import Course
+from backend.models.enrollment import Enrollment
+
+TEACHER = "teacher"
+STUDENT = "student"
+# Marks a membership hash that holds every course of the user
+LOADED_FIELD = "loaded"
+
+# Keys whose invalidation failed; this worker answers from the database for
+# them and deletes them before its next cache lookup
+_stale_keys: Set[str] = set()
+
+
+class CourseAccess(NamedTuple):
+    is_teacher: bool
+    is_enrolled: bool
+
+
+def _key(user_id: int) -> str:
+    return f"access:user:{user_id}"
+
+
+def _version_key(user_id: int) -> str:
+    return f"access:version:{user_id}"
+
+
+async def _load_memberships(db: AsyncSession, user_id: int) -> dict:
+    rows = await db.execute(
+        union_all(
+            select(Course.id, literal(TEACHER)).where(Course.teacher_id == user_id),
+            select(Enrollment.course_id, literal(STUDENT)).where(Enrollment.user_id == user_id),
+        )
+    )
+    memberships = {f"{kind}:{course_id}": 1 for course_id, kind in rows}
+    memberships[LOADED_FIELD] = 1
+    return memberships
+
+
+async def _query_access(db: AsyncSession, user_id: int, course_id: int) -> CourseAccess:
+    is_teacher = await db.scalar(
+        select(Course.id).where(Course.id == course_id, Course.teacher_id == user_id)
+    )
+    is_enrolled = await db.scalar(
+        select(Enrollment.user_id).where(
+            Enrollment.user_id == user_id, Enrollment.course_id == course_id
+        )
+    )
+    return CourseAccess(is_teacher is not None, is_enrolled is not None)
+
+
+async def _rebuild(redis, db: AsyncSession, user_id: int) -> dict:
+    """
+    Load a user's memberships and cache them unless they changed meanwhile.
+
+    The version key is watched from before the database read, so a grant or
+    revoke landing in between makes the write fail instead of caching the
+    memberships it replaced; the next lookup rebuilds again.
+    """
+    key = _key(user_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        await pipe.watch(_version_key(user_id))
+        memberships = await _load_memberships(db, user_id)
+        pipe.multi()
+        pipe.delete(key)
+        pipe.hset(key, mapping=memberships)
+        pipe.expire(key, redis_settings.COURSE_ACCESS_TTL)
+        try:
+            await pipe.execute()
+        except WatchError:
+            pass
+    return memberships
+
+
+async def get_course_access(db: AsyncSession, user_id: int, course_id: int) -> CourseAccess:
+    """
+    Whether a user teaches or is enrolled in a course.
+
+    Answered with one HMGET on the user's cached membership hash; the hash
+    is rebuilt from the database when missing or expired. Falls back to
+    querying the database while Redis is unavailable.
+    """
+    key = _key(user_id)
+    try:
+        redis = get_redis()
+        if _stale_keys:
+            stale = list(_stale_keys)
+            await redis.delete(*stale)
+            _stale_keys.difference_update(stale)
+        is_teacher, is_enrolled, loaded = await redis.hmget(
+            key, f"{TEACHER}:{course_id}", f"{STUDENT}:{course_id}", LOADED_FIELD
+        )
+        if loaded is None:
+            memberships = await _rebuild(redis, db, user_id)
+            is_teacher = memberships.get(f"{TEACHER}:{course_id}")
+            is_enrolled = memberships.get(f"{STUDENT}:{course_id}")
+        return CourseAccess(is_teacher is not None, is_enrolled is not None)
+    except RedisError as e:
+        print(f"Warning: course access cache unavailable: {str(e)}")
+        return await _query_access(db, user_id, course_id)
+
+
+async def _write_through(user_ids: Iterable[int], field: str, granted: bool) -> None:
+    # A hash that is not loaded yet only gets the field and is rebuilt on the
+    # next lookup, so granting unconditionally is safe. A revoke deletes the
+    # whole hash rather than the field, and both bump the version so that a
+    # rebuild racing with the change is not cached
+    user_ids = list(user_ids)
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.incr(_version_key(user_id))
+                pipe.expire(_version_key(user_id), redis_settings.COURSE_ACCESS_TTL)
+                if granted:
+                    pipe.hset(_key(user_id), field, 1)
+                    pipe.expire(_key(user_id), redis_settings.COURSE_ACCESS_TTL, nx=True)
+                else:
+                    pipe.delete(_key(user_id))
+            await pipe.execute()
+    except RedisError as e:
+        print(f"Warning: course access cache update failed: {str(e)}")
+        _stale_keys.update(_key(user_id) for user_id in user_ids)
+
+
+async def grant_enrollment(user_ids: Iterable[int], course_id: int) -> None:
+    """Call after enrollments are committed"""
+    await _write_through(user_ids, f"{STUDENT}:{course_id}", True)
+
+
+async def revoke_enrollment(user_ids: Iterable[int], course_id: int) -> None:
+    """Call after enrollments are deleted"""
+    await _write_through(user_ids, f"{STUDENT}:{course_id}", False)
+
+
+async def grant_teaching(user_id: int, course_id: int) -> None:
+    await _write_through([user_id], f"{TEACHER}:{course_id}", True)
+
+
+async def revoke_teaching(user_id: int, course_id: int) -> None:
+    await _write_through([user_id], f"{TEACHER}:{course_id}", False)
@@ -0,0 +1,148 @@
+"""
+Set-based enrollment of many students into one course.
+"""
+import csv
+import io
+from collections import Counter
+from typing import List, Sequence, Set, Tuple, Union
+
+from sqlalchemy import ARRAY, Integer, String, any_, bindparam, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import OurUsers
+from backend.models.enrollment import Enrollment
+from backend.roles import UserRole
+from backend.schemas.enrollment import BulkEnrollmentResponse, BulkEnrollmentResult
+from backend.services import progress_service
+
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already_enrolled"
+DUPLICATE = "duplicate"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+
+# User ids are int4, larger values cannot be bound as parameters
+MAX_USER_ID = 2**31 - 1
+# First-row values taken for a column title rather than an entry
+CSV_HEADERS = {"email", "user_id", "id"}
+
+# A user id, an email, or the raw value when it is neither
+Entry = Union[int, str]
+
+
+def parse_entry(value: str) -> Entry:
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    return value
+
+
+def is_valid_entry(entry: Entry) -> bool:
+    if isinstance(entry, int):
+        return 1 <= entry <= MAX_USER_ID
+    return "@" in entry
+
+
+def parse_csv(content: bytes) -> List[Entry]:
+    """
+    Entries from the first column of a CSV file, one user id or email per row.
+
+    A header row of ``email``, ``user_id`` or ``id`` is skipped.
+    """
+    rows = [row for row in csv.reader(io.StringIO(content.decode("utf-8-sig"))) if row and row[0].strip()]
+    entries = [parse_entry(row[0]) for row in rows]
+    if entries and isinstance(entries[0], str) and entries[0].lower() in CSV_HEADERS:
+        entries = entries[1:]
+    return entries
+
+
+def entry_results(
+    entries: Sequence[Entry], users: Sequence[Tuple[int, str, str]], enrolled_ids: Set[int]
+) -> List[BulkEnrollmentResult]:
+    """
+    Outcome of each entry, in order.
+
+    ``users`` are the (id, email, role) rows the entries matched and
+    ``enrolled_ids`` the users newly enrolled. Only students can be
+    enrolled, other users are reported as invalid.
+    """
+    ids_by_email = {email: user_id for user_id, email, _ in users}
+    roles = {user_id: role for user_id, _, role in users}
+
+    results = []
+    seen = set()
+    for entry in entries:
+        if isinstance(entry, int):
+            user_id = entry if entry in roles else None
+        else:
+            user_id = ids_by_email.get(entry)
+        if not is_valid_entry(entry):
+            status = INVALID
+        elif user_id is None:
+            status = NOT_FOUND
+        elif roles[user_id] != UserRole.STUDENT.value:
+            status = INVALID
+        elif user_id in seen:
+            status = DUPLICATE
+        else:
+            status = ENROLLED if user_id in enrolled_ids else ALREADY_ENROLLED
+        if user_id is not None:
+            seen.add(user_id)
+        results.append(BulkEnrollmentResult(value=str(entry), user_id=user_id, status=status))
+    return results
+
+
+async def bulk_enroll(db: AsyncSession, course_id: int, entries: Sequence[Entry]) -> BulkEnrollmentResponse:
+    """
+    Enroll the students named by ids and emails, with an outcome per entry.
+
+    Users are resolved in one query and enrolled with one INSERT ... ON
+    CONFLICT DO NOTHING, so existing enrollments are reported instead of
+    failing the batch; course progress is created for the new enrollments.
+    The caller commits.
+    """
+    valid = [entry for entry in entries if is_valid_entry(entry)]
+    user_ids = list({entry for entry in valid if isinstance(entry, int)})
+    emails = list({entry for entry in valid if isinstance(entry, str)})
+
+    # Array parameters keep the statements the same size for any batch
+    users = (
+        await db.execute(
+            select(OurUsers.id, OurUsers.email, OurUsers.role).where(
+                or_(
+                    OurUsers.id == any_(bindparam("user_ids", user_ids, type_=ARRAY(Integer))),
+                    OurUsers.email == any_(bindparam("emails", emails, type_=ARRAY(String))),
+                )
+            )
+        )
+    ).all()
+    student_ids = {user_id for user_id, _, role in users if role == UserRole.STUDENT.value}
+
+    enrolled_ids = set()
+    if student_ids:
+        user_id = func.unnest(bindparam("student_ids", list(student_ids), type_=ARRAY(Integer)))
+        enrolled_ids = set(
+            (
+                await db.scalars(
+                    insert(Enrollment)
+                    .from_select(["user_id", "course_id"], select(user_id, literal(course_id)))
+                    .on_conflict_do_nothing()
+                    .returning(Enrollment.user_id)
+                )
+            ).all()
+        )
+    if enrolled_ids:
+        await progress_service.init_course_progress(db, course_id, list(enrolled_ids))
+
+    results = entry_results(entries, users, enrolled_ids)
+    counts = Counter(result.status for result in results)
+    return BulkEnrollmentResponse(
+        course_id=course_id,
+        enrolled=counts[ENROLLED],
+        already_enrolled=counts[ALREADY_ENROLLED],
+        duplicate=counts[DUPLICATE],
+        not_found=counts[NOT_FOUND],
+        invalid=counts[INVALID],
+        results=results,
+    )
@@ -0,0 +1,177 @@
+"""
+Database index of the objects stored in S3.
+
+Uploads and deletions are recorded here so file listings are answered by
+indexed queries instead of paging through list_objects_v2.
+"""
+import asyncio
+import re
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.models import Assignment, Course, OurUsers
+from backend.models.file import FileMetadata
+from backend.services.storage import s3, BUCKET_NAME, delete_keys
+
+COURSE_FILE = "course"
+TASK_FILE = "task"
+SUBMISSION_FILE = "submission"
+GENERAL_FILE = "general"
+
+COURSE_KEY = re.compile(r"course_(\d+)/")
+TASK_KEY = re.compile(r"assignments/(\d+)/task/")
+SUBMISSION_KEY = re.compile(r"assignments/(\d+)/submissions/(\d+)/")
+
+
+def file_kind(key: str) -> str:
+    if COURSE_KEY.match(key):
+        return COURSE_FILE
+    if TASK_KEY.match(key):
+        return TASK_FILE
+    if SUBMISSION_KEY.match(key):
+        return SUBMISSION_FILE
+    return GENERAL_FILE
+
+
+def _upsert_statement(values: dict):
+    stmt = insert(FileMetadata).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=[FileMetadata.key],
+        set_={
+            "owner_id": stmt.excluded.owner_id,
+            "size": stmt.excluded.size,
+            "content_type": stmt.excluded.content_type,
+            "etag": stmt.excluded.etag,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+async def record_upload(
+    db: AsyncSession,
+    key: str,
+    *,
+    size: int,
+    etag: str,
+    content_type: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    assignment_id: Optional[int] = None,
+) -> None:
+    """Insert or refresh the row for an uploaded object, the caller commits"""
+    await db.execute(
+        _upsert_statement(
+            {
+                "key": key,
+                "kind": file_kind(key),
+                "owner_id": owner_id,
+                "course_id": course_id,
+                "assignment_id": assignment_id,
+                "size": size,
+                "content_type": content_type,
+                "etag": etag,
+            }
+        )
+    )
+
+
+async def record_deletion(db: AsyncSession, keys: Iterable[str]) -> None:
+    """Remove the rows of deleted objects, the caller commits"""
+    keys = list(keys)
+    if keys:
+        await db.execute(delete(FileMetadata).where(FileMetadata.key.in_(keys)))
+
+
+async def task_files(db: AsyncSession, assignment_ids: Iterable[int]) -> Dict[int, List[dict]]:
+    """Task files of many assignments in one query, as AssignmentFile payloads"""
+    files = {assignment_id: [] for assignment_id in assignment_ids}
+    if files:
+        rows = await db.scalars(
+            select(FileMetadata)
+            .where(FileMetadata.kind == TASK_FILE, FileMetadata.assignment_id.in_(list(files)))
+            .order_by(FileMetadata.id)
+        )
+        for row in rows:
+            files[row.assignment_id].append(
+                {
+                    "key": row.key,
+                    "size": row.size,
+                    "last_modified": row.last_modified,
+                    "filename": row.key.split("/")[-1],
+                }
+            )
+    return files
+
+
+async def delete_task_files(db: AsyncSession, assignment_id: int) -> int:
+    """
+    Delete an assignment's task files from S3 together with their rows.
+
+    The keys come from the files table, the caller commits. Returns the
+    number of deleted objects.
+    """
+    keys = (
+        await db.scalars(
+            delete(FileMetadata)
+            .where(FileMetadata.assignment_id == assignment_id, FileMetadata.kind == TASK_FILE)
+            .returning(FileMetadata.key)
+        )
+    ).all()
+    if not keys:
+        return 0
+    return (await asyncio.to_thread(delete_keys, keys))["deleted"]
+
+
+def sync_from_bucket(db: Session) -> int:
+    """Index objects uploaded before the files table existed.
+
+    Objects of deleted courses or assignments are skipped. Returns the number
+    of objects seen in the bucket.
+    """
+    course_ids = set(db.scalars(select(Course.id)))
+    assignment_courses = dict(db.execute(select(Assignment.id, Assignment.course_id)).all())
+    user_ids = set(db.scalars(select(OurUsers.id)))
+
+    seen = 0
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME):
+        for item in page.get("Contents", []):
+            seen += 1
+            key = item["Key"]
+            values = {
+                "key": key,
+                "kind": file_kind(key),
+                "owner_id": None,
+                "course_id": None,
+                "assignment_id": None,
+                "size": item["Size"],
+                "content_type": None,
+                "etag": item["ETag"],
+                "created_at": item["LastModified"],
+                "updated_at": item["LastModified"],
+            }
+            if match := COURSE_KEY.match(key):
+                values["course_id"] = int(match.group(1))
+                if values["course_id"] not in course_ids:
+                    continue
+            elif match := TASK_KEY.match(key) or SUBMISSION_KEY.match(key):
+                values["assignment_id"] = int(match.group(1))
+                if values["assignment_id"] not in assignment_courses:
+                    continue
+                values["course_id"] = assignment_courses[values["assignment_id"]]
+                if values["kind"] == SUBMISSION_FILE and int(match.group(2)) in user_ids:
+                    values["owner_id"] = int(match.group(2))
+            db.execute(_upsert_statement(values))
+        db.commit()
+    return seen
+
+
+if __name__ == "__main__":
+    from backend.database import SessionLocal
+
+    with SessionLocal() as session:
+        print(f"Indexed {sync_from_bucket(session)} objects from {BUCKET_NAME}")
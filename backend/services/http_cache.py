@@ -0,0 +1,104 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, NamedTuple, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import Select, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses weak comparison and may list several tags or "*"
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def changes(model, *criteria) -> Select:
+    """Latest updated_at and row count of the rows a response is built from.
+
+    The count makes deletions change the validators too.
+    """
+    return select(func.max(model.updated_at), func.count()).select_from(model).where(*criteria)
+
+
+async def load_validators(db: AsyncSession, *sources: Select, vary: Any = None) -> Validators:
+    """
+    Compute ETag and Last-Modified from ``changes`` selects in one query.
+
+    Args:
+        db: Database session
+        sources: ``changes(...)`` of every table the response reads
+        vary: Extra value the response depends on, e.g. the user id
+
+    Returns:
+        Validators: Weak ETag and the latest modification time
+    """
+    rows = (await db.execute(union_all(*sources))).all()
+    last_modified = max((row[0] for row in rows if row[0] is not None), default=None)
+    digest = hashlib.sha1(repr((sorted(map(repr, rows)), vary)).encode()).hexdigest()
+    return Validators(f'W/"{digest}"', last_modified)
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if request.headers.get("if-none-match") is not None:
+        return etag_matches(request, validators.etag)
+    since = request.headers.get("if-modified-since")
+    if since and validators.last_modified is not None:
+        try:
+            since_date = parsedate_to_datetime(since)
+        except (TypeError, ValueError):
+            return False
+        if since_date.tzinfo is None:
+            since_date = since_date.replace(tzinfo=timezone.utc)
+        # HTTP dates have second precision
+        return validators.last_modified.replace(microsecond=0) <= since_date
+    return False
+
+
+def validator_headers(validators: Validators) -> dict:
+    headers = {"ETag": validators.etag, "Cache-Control": "private, no-cache"}
+    if validators.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            validators.last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    *sources: Select,
+    vary: Any = None,
+    collection: bool = True,
+) -> Optional[Response]:
+    """
+    Answer a GET from its validators before the payload is loaded.
+
+    Returns a 304 response when the client's copy is current; otherwise sets
+    ETag and Last-Modified on ``response`` and returns None so the handler
+    builds the body as usual. Deleting a row of a collection does not move
+    its latest updated_at, so collections only send and honor the ETag; pass
+    ``collection=False`` for responses built from single rows.
+    """
+    validators = await load_validators(db, *sources, vary=vary)
+    if collection:
+        validators = validators._replace(last_modified=None)
+    headers = validator_headers(validators)
+    if is_not_modified(request, validators):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
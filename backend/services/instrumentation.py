@@ -0,0 +1,189 @@
+"""
+Prometheus metrics and the hooks that feed them.
+
+Every HTTP request gets a RequestStats in a context variable (set by
+backend.middlewares.metrics); database, S3 and Redis hooks add to it so the
+middleware can report per-route totals when the request finishes.
+"""
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from typing import Optional
+
+import redis.asyncio as redis
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Requests are interactive, S3 transfers and slow queries need the upper buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served")
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements per HTTP request", ["route"], buckets=COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent in SQL statements per HTTP request",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement latency", buckets=LATENCY_BUCKETS
+)
+
+S3_CALLS = Counter("s3_calls_total", "S3 API calls", ["operation", "outcome"])
+S3_LATENCY = Histogram(
+    "s3_call_duration_seconds", "S3 API call latency", ["operation"], buckets=LATENCY_BUCKETS
+)
+S3_CALLS_PER_REQUEST = Histogram(
+    "s3_calls_per_request", "S3 API calls per HTTP request", ["route"], buckets=COUNT_BUCKETS
+)
+
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds",
+    "Redis round-trip latency, pipelines count once",
+    ["command"],
+    buckets=LATENCY_BUCKETS,
+)
+REDIS_CALLS_PER_REQUEST = Histogram(
+    "redis_calls_per_request", "Redis round-trips per HTTP request", ["route"], buckets=COUNT_BUCKETS
+)
+
+# Queue time is spent waiting for a slot in the password hashing pool
+PASSWORD_HASH_QUEUE = Histogram(
+    "password_hash_queue_seconds", "Wait for a password hashing slot", buckets=LATENCY_BUCKETS
+)
+PASSWORD_HASH_WAITING = Gauge("password_hash_waiting", "Password hashes waiting for a slot")
+PASSWORD_HASH_IN_FLIGHT = Gauge("password_hash_in_flight", "Password hashes running in the pool")
+PASSWORD_HASH_COMPLETED = Counter("password_hash_completed_total", "Password hashes finished")
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Password hashes rejected after the queue timeout"
+)
+
+
+class RequestStats:
+    """Work done on behalf of one HTTP request"""
+
+    __slots__ = ("db_queries", "db_seconds", "s3_calls", "redis_calls", "statements", "query_budget")
+
+    def __init__(self, track_statements: bool = False):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.s3_calls = 0
+        self.redis_calls = 0
+        # SQL text -> executions, only kept while query budgets are checked
+        self.statements: Optional[StatementCounter] = StatementCounter() if track_statements else None
+        # Declared by the route through the QueryBudget dependency
+        self.query_budget: Optional[int] = None
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def observe_request(method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+    HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+    HTTP_LATENCY.labels(method, route).observe(seconds)
+    DB_QUERIES_PER_REQUEST.labels(route).observe(stats.db_queries)
+    DB_TIME_PER_REQUEST.labels(route).observe(stats.db_seconds)
+    S3_CALLS_PER_REQUEST.labels(route).observe(stats.s3_calls)
+    REDIS_CALLS_PER_REQUEST.labels(route).observe(stats.redis_calls)
+
+
+### SQLAlchemy ###
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement; pass ``async_engine.sync_engine`` for async engines"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_LATENCY.observe(seconds)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_seconds += seconds
+            if stats.statements is not None:
+                stats.statements[statement] += 1
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # after_cursor_execute is not called for failed statements
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+
+### boto3 ###
+def instrument_boto3_client(client) -> None:
+    """Time S3 API calls through botocore's event system"""
+
+    def before_call(context, **kwargs):
+        context["metrics_start"] = time.perf_counter()
+
+    def after_call(model, context, http_response=None, **kwargs):
+        start = context.pop("metrics_start", None)
+        if start is None:
+            return
+        S3_LATENCY.labels(model.name).observe(time.perf_counter() - start)
+        outcome = "ok" if http_response is not None and http_response.status_code < 400 else "error"
+        S3_CALLS.labels(model.name, outcome).inc()
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.s3_calls += 1
+
+    def after_call_error(model, context, **kwargs):
+        after_call(model, context)
+
+    client.meta.events.register("before-call.s3", before_call)
+    client.meta.events.register("after-call.s3", after_call)
+    client.meta.events.register("after-call-error.s3", after_call_error)
+
+
+### Redis ###
+def _observe_redis(command: str, start: float) -> None:
+    REDIS_LATENCY.labels(command).observe(time.perf_counter() - start)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.redis_calls += 1
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            _observe_redis("PIPELINE", start)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client timing each round-trip"""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            _observe_redis(str(args[0]).upper(), start)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from backend.config import config
+from backend.services.instrumentation import (
+    PASSWORD_HASH_COMPLETED,
+    PASSWORD_HASH_IN_FLIGHT,
+    PASSWORD_HASH_QUEUE,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_WAITING,
+)
+
+# Context used in this process, e.g. by the startup admin creation
+password_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=config.BCRYPT_ROUNDS
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+@lru_cache(maxsize=None)
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+### Run inside the worker processes ###
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=config.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+        )
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(config.PASSWORD_HASH_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def _run(fn, *args):
+    # Cap the work handed to the pool so a login storm queues here, with a
+    # timeout, instead of piling up unbounded inside the executor
+    semaphore = _get_semaphore()
+    queued_at = time.monotonic()
+    PASSWORD_HASH_WAITING.inc()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), config.PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again later",
+        )
+    finally:
+        PASSWORD_HASH_WAITING.dec()
+
+    PASSWORD_HASH_QUEUE.observe(time.monotonic() - queued_at)
+    PASSWORD_HASH_IN_FLIGHT.inc()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        PASSWORD_HASH_IN_FLIGHT.dec()
+        PASSWORD_HASH_COMPLETED.inc()
+        semaphore.release()
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured bcrypt cost off the event loop"""
+    return await _run(_hash, password, config.BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password against its hash off the event loop.
+
+    Returns:
+        (valid, new_hash) where new_hash is set when the stored hash uses a
+        different cost than BCRYPT_ROUNDS and should be replaced
+    """
+    return await _run(_verify_and_update, password, hashed, config.BCRYPT_ROUNDS)
+
+
+def shutdown_password_hasher() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,179 @@
+"""
+Queries and updates for assignment and course progress that work on whole
+sets of rows at once.
+"""
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import ARRAY, Integer, and_, bindparam, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Assignment, AssignmentProgress, CourseProgress, Enrollment
+from backend.schemas.assignment import AssignmentWithProgressResponse
+
+
+async def get_assignments_with_progress(
+    db: AsyncSession, course_id: int, student_id: int
+) -> List[AssignmentWithProgressResponse]:
+    """
+    All assignments of a course with the student's progress, in one query.
+
+    Assignments the student has not started come back with default progress
+    values thanks to the LEFT OUTER JOIN.
+    """
+    rows = await db.execute(
+        select(
+            Assignment,
+            AssignmentProgress.is_completed,
+            AssignmentProgress.submission_file_key,
+            AssignmentProgress.score,
+            AssignmentProgress.feedback,
+        )
+        .outerjoin(
+            AssignmentProgress,
+            and_(
+                AssignmentProgress.assignment_id == Assignment.id,
+                AssignmentProgress.student_id == student_id,
+            ),
+        )
+        .where(Assignment.course_id == course_id)
+        .order_by(Assignment.section_id, Assignment.order, Assignment.id)
+    )
+
+    return [
+        AssignmentWithProgressResponse(
+            **assignment.to_dict(),
+            created_at=assignment.created_at,
+            updated_at=assignment.updated_at,
+            is_completed=bool(is_completed),
+            submission_file_key=submission_file_key,
+            score=score,
+            feedback=feedback,
+        )
+        for assignment, is_completed, submission_file_key, score, feedback in rows
+    ]
+
+
+async def get_or_create_assignment_progress(
+    db: AsyncSession, student_id: int, assignment_id: int
+) -> Tuple[AssignmentProgress, bool]:
+    """
+    The student's progress record for an assignment, created when missing.
+
+    ON CONFLICT DO NOTHING lets concurrent first writes share one record
+    instead of failing on the unique constraint. Returns the record and
+    whether this call created it; the caller commits.
+    """
+    created_id = await db.scalar(
+        insert(AssignmentProgress)
+        .values(student_id=student_id, assignment_id=assignment_id, is_completed=False)
+        .on_conflict_do_nothing(constraint="_student_assignment_progress_uc")
+        .returning(AssignmentProgress.id)
+    )
+    progress = await db.scalar(
+        select(AssignmentProgress)
+        .where(
+            AssignmentProgress.student_id == student_id,
+            AssignmentProgress.assignment_id == assignment_id,
+        )
+        .execution_options(populate_existing=True)
+    )
+    return progress, created_id is not None
+
+
+async def add_assignment_to_progress(db: AsyncSession, course_id: int) -> None:
+    """
+    Count a new assignment in the course progress of every enrolled student.
+
+    One INSERT ... SELECT over the enrollment set; students without a progress
+    record get one with the current number of assignments, existing records
+    are incremented. Call after the assignment is flushed, the caller commits.
+    """
+    total_assignments = (
+        select(func.count(Assignment.id))
+        .where(Assignment.course_id == course_id)
+        .scalar_subquery()
+    )
+    stmt = insert(CourseProgress).from_select(
+        ["student_id", "course_id", "completed_assignments", "total_assignments"],
+        select(
+            Enrollment.user_id,
+            Enrollment.course_id,
+            literal(0),
+            total_assignments,
+        ).where(Enrollment.course_id == course_id),
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            constraint="_student_course_progress_uc",
+            set_={
+                "total_assignments": CourseProgress.total_assignments + 1,
+                # onupdate is not applied to ON CONFLICT updates
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+async def init_course_progress(db: AsyncSession, course_id: int, student_ids: Sequence[int]) -> None:
+    """
+    Create the course progress of newly enrolled students in one INSERT ... SELECT.
+
+    Records that already exist are left alone. The caller commits, together
+    with the enrollments.
+    """
+    total_assignments = (
+        select(func.count(Assignment.id))
+        .where(Assignment.course_id == course_id)
+        .scalar_subquery()
+    )
+    student_id = func.unnest(bindparam("student_ids", list(student_ids), type_=ARRAY(Integer)))
+    await db.execute(
+        insert(CourseProgress)
+        .from_select(
+            ["student_id", "course_id", "completed_assignments", "total_assignments"],
+            select(student_id, literal(course_id), literal(0), total_assignments),
+        )
+        .on_conflict_do_nothing(constraint="_student_course_progress_uc")
+    )
+
+
+async def remove_assignments_from_progress(
+    db: AsyncSession, course_id: int, assignment_ids: Sequence[int]
+) -> None:
+    """
+    Take assignments out of course progress before they are deleted.
+
+    Decrements totals, and completed counts of the students who finished
+    them, then deletes their AssignmentProgress rows. The caller deletes the
+    assignments and commits, so everything happens in one transaction.
+    """
+    if not assignment_ids:
+        return
+
+    completed = (
+        select(func.count(AssignmentProgress.id))
+        .where(
+            AssignmentProgress.student_id == CourseProgress.student_id,
+            AssignmentProgress.assignment_id.in_(assignment_ids),
+            AssignmentProgress.is_completed.is_(True),
+        )
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(CourseProgress)
+        .where(CourseProgress.course_id == course_id)
+        .values(
+            total_assignments=func.greatest(
+                CourseProgress.total_assignments - len(assignment_ids), 0
+            ),
+            completed_assignments=func.greatest(
+                CourseProgress.completed_assignments - completed, 0
+            ),
+        )
+    )
+    await db.execute(
+        delete(AssignmentProgress).where(
+            AssignmentProgress.assignment_id.in_(assignment_ids)
+        )
+    )
@@ -0,0 +1,58 @@
+"""
+Per-request SQL budgets and N+1 detection.
+
+Enabled with QUERY_BUDGET_MODE=warn or raise. Routes declare their budget with
+the QueryBudget dependency; QUERY_BUDGET_DEFAULT covers the rest. Independently
+of the budget, a statement executed QUERY_REPEAT_THRESHOLD times or more in one
+request is reported, which is how N+1 loops show up.
+"""
+from typing import List, Optional
+
+from backend.config import QueryBudgetSettings
+from backend.services.instrumentation import RequestStats
+
+query_budget_settings = QueryBudgetSettings()
+
+QUERY_BUDGET_MODES = ("off", "warn", "raise")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget_enabled() -> bool:
+    return query_budget_settings.QUERY_BUDGET_MODE != "off"
+
+
+def _shape(statement: str, width: int = 120) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= width else statement[: width - 3] + "..."
+
+
+def query_budget_problems(stats: RequestStats, default_budget: Optional[int], repeat_threshold: int) -> List[str]:
+    """Budget overrun and repeated statements of one request, empty when within limits"""
+    problems = []
+    budget = stats.query_budget if stats.query_budget is not None else default_budget
+    if budget is not None and stats.db_queries > budget:
+        problems.append(f"{stats.db_queries} queries, budget is {budget}")
+    for statement, count in (stats.statements or {}).items():
+        if count >= repeat_threshold:
+            problems.append(f"{count}x {_shape(statement)}")
+    return problems
+
+
+def enforce_query_budget(method: str, route: str, stats: RequestStats) -> None:
+    mode = query_budget_settings.QUERY_BUDGET_MODE
+    if mode == "off":
+        return
+    if mode not in QUERY_BUDGET_MODES:
+        raise ValueError(f"Unknown QUERY_BUDGET_MODE '{mode}', expected one of {', '.join(QUERY_BUDGET_MODES)}")
+    problems = query_budget_problems(
+        stats, query_budget_settings.QUERY_BUDGET_DEFAULT, query_budget_settings.QUERY_REPEAT_THRESHOLD
+    )
+    if not problems:
+        return
+    message = f"{method} {route}: " + "; ".join(problems)
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    print(f"Warning: query budget exceeded: {message}")
@@ -0,0 +1,63 @@
+"""
+Course votes and the running rating aggregate kept on the course.
+"""
+from typing import Optional, Tuple
+
+from sqlalchemy import Float, cast, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Course
+from backend.models.rating import Rating
+
+
+def rating_delta(previous: Optional[int], rating: int) -> Tuple[int, int]:
+    """Change to (ratings_count, rating_sum) when a vote goes from ``previous`` to ``rating``"""
+    if previous is None:
+        return 1, rating
+    return 0, rating - previous
+
+
+async def save_rating(db: AsyncSession, user_id: int, course_id: int, rating: int) -> Rating:
+    """
+    Record a user's vote for a course, replacing an earlier one.
+
+    The earlier vote is read with FOR UPDATE so the delta folded into the
+    aggregate is taken from the value actually replaced. A first vote that
+    loses a race with another first vote of the same user does not
+    overwrite it blindly; it is retried as a change of the winning vote.
+    The caller commits.
+    """
+    criteria = (Rating.user_id == user_id, Rating.course_id == course_id)
+    while True:
+        previous = await db.scalar(select(Rating.rating).where(*criteria).with_for_update())
+        stmt = insert(Rating).values(user_id=user_id, course_id=course_id, rating=rating)
+        stmt = stmt.on_conflict_do_update(
+            constraint="_user_course_rating_uc",
+            set_={"rating": stmt.excluded.rating, "updated_at": func.now()},
+            # Only a vote read above may be replaced
+            where=literal(previous is not None),
+        ).returning(Rating.id)
+        rating_id = await db.scalar(stmt)
+        if rating_id is not None:
+            break
+
+    # SET expressions read the old row values so concurrent votes for the
+    # course cannot overwrite each other
+    count_delta, sum_delta = rating_delta(previous, rating)
+    ratings_count = func.coalesce(Course.ratings_count, 0) + count_delta
+    rating_sum = Course.rating_sum + sum_delta
+    rating_average = cast(rating_sum, Float) / ratings_count
+    await db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(
+            ratings_count=ratings_count,
+            rating_sum=rating_sum,
+            rating_average=rating_average,
+            rating=func.round(rating_average),
+        )
+    )
+    return await db.scalar(
+        select(Rating).where(Rating.id == rating_id).execution_options(populate_existing=True)
+    )
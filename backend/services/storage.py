@@ -0,0 +1,229 @@
+import asyncio
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+from starlette import status
+
+load_dotenv()  # take environment variables from .env.
+
+# Requests fan out S3 calls to worker threads, keep enough pooled connections
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+
+s3 = boto3.client(
+    "s3",
+    aws_access_key_id=os.getenv("ACCESS_KEY_ID"),
+    aws_secret_access_key=os.getenv("SECRET_ACCESS_KEY"),
+    config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+)
+BUCKET_NAME = os.getenv("BUCKET_NAME", "files-for-team-project")
+
+
+# S3 accepts parts of at least 5 MB (except the last one), so this also
+# bounds the memory one upload needs
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size is {max_size / (1024 * 1024)} MB",
+    )
+
+
+async def upload_stream(
+    file: UploadFile,
+    key: str,
+    max_size: int,
+    metadata: Optional[Dict[str, str]] = None,
+) -> dict:
+    """
+    Upload a file to S3 reading at most one part at a time.
+
+    Files smaller than one part are sent with a single put_object, larger ones
+    with a multipart upload that is aborted if the size limit is exceeded.
+
+    Returns:
+        dict: size in bytes and etag of the stored object
+
+    Raises:
+        HTTPException: 413 if the file is larger than max_size
+    """
+    # Reject early when the client announced the size
+    if file.size is not None and file.size > max_size:
+        raise _too_large(max_size)
+
+    extra_args = {"ContentType": file.content_type}
+    if metadata:
+        extra_args["Metadata"] = metadata
+
+    chunk = await file.read(MULTIPART_PART_SIZE)
+    if len(chunk) < MULTIPART_PART_SIZE:
+        if len(chunk) > max_size:
+            raise _too_large(max_size)
+        result = await asyncio.to_thread(
+            s3.put_object, Bucket=BUCKET_NAME, Key=key, Body=chunk, **extra_args
+        )
+        return {"size": len(chunk), "etag": result["ETag"]}
+
+    upload = await asyncio.to_thread(
+        s3.create_multipart_upload, Bucket=BUCKET_NAME, Key=key, **extra_args
+    )
+    upload_id = upload["UploadId"]
+    parts = []
+    size = 0
+    try:
+        while chunk:
+            size += len(chunk)
+            if size > max_size:
+                raise _too_large(max_size)
+            part_number = len(parts) + 1
+            part = await asyncio.to_thread(
+                s3.upload_part,
+                Bucket=BUCKET_NAME,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=chunk,
+            )
+            parts.append({"PartNumber": part_number, "ETag": part["ETag"]})
+            chunk = await file.read(MULTIPART_PART_SIZE)
+
+        result = await asyncio.to_thread(
+            s3.complete_multipart_upload,
+            Bucket=BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        # Do not leave orphaned parts behind, they are billed until aborted
+        await asyncio.to_thread(
+            s3.abort_multipart_upload, Bucket=BUCKET_NAME, Key=key, UploadId=upload_id
+        )
+        raise
+
+    return {"size": size, "etag": result["ETag"]}
+
+
+# Lifetime of presigned download and upload URLs
+PRESIGNED_URL_EXPIRES = int(os.getenv("PRESIGNED_URL_EXPIRES", "300"))  # seconds
+
+
+def presigned_download_url(key: str) -> str:
+    """Short-lived GET URL that makes the browser save the object as a file"""
+    filename = key.split("/")[-1]
+    return s3.generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": BUCKET_NAME,
+            "Key": key,
+            "ResponseContentDisposition": f'attachment; filename="{filename}"',
+        },
+        ExpiresIn=PRESIGNED_URL_EXPIRES,
+    )
+
+
+def presigned_upload(key: str, content_type: str, max_size: int, method: str) -> dict:
+    """
+    Short-lived direct upload to S3.
+
+    POST uploads enforce the size limit in the signed policy. PUT URLs cannot,
+    so the size is checked again when the upload is confirmed.
+
+    Returns:
+        dict: url, form fields for POST and headers the client must send
+    """
+    if method == "post":
+        post = s3.generate_presigned_post(
+            Bucket=BUCKET_NAME,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 0, max_size],
+            ],
+            ExpiresIn=PRESIGNED_URL_EXPIRES,
+        )
+        return {"url": post["url"], "fields": post["fields"], "headers": {}}
+
+    url = s3.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": BUCKET_NAME, "Key": key, "ContentType": content_type},
+        ExpiresIn=PRESIGNED_URL_EXPIRES,
+    )
+    return {"url": url, "fields": {}, "headers": {"Content-Type": content_type}}
+
+
+# delete_objects accepts at most 1000 keys per call
+DELETE_BATCH_SIZE = 1000
+
+
+def delete_keys(
+    keys: Iterable[str], on_progress: Optional[Callable[[int], None]] = None
+) -> dict:
+    """
+    Delete objects by key with batched delete_objects (blocking).
+
+    Deleting is idempotent, so a failed run can simply be repeated.
+
+    Args:
+        keys: Keys of the objects to delete
+        on_progress: Called with the number of objects deleted so far
+
+    Returns:
+        dict: number of deleted objects
+
+    Raises:
+        RuntimeError: If S3 reported keys it could not delete
+    """
+    deleted = 0
+    failed = []
+
+    def delete_batch(keys: List[str]) -> None:
+        nonlocal deleted
+        response = s3.delete_objects(
+            Bucket=BUCKET_NAME,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        errors = response.get("Errors", [])
+        failed.extend(error["Key"] for error in errors)
+        deleted += len(keys) - len(errors)
+        if on_progress:
+            on_progress(deleted)
+
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) == DELETE_BATCH_SIZE:
+            delete_batch(batch)
+            batch = []
+    if batch:
+        delete_batch(batch)
+
+    if failed:
+        raise RuntimeError(f"Could not delete {len(failed)} objects, e.g. {failed[0]}")
+    return {"deleted": deleted}
+
+
+def purge_prefixes(
+    prefixes: List[str], on_progress: Optional[Callable[[int], None]] = None
+) -> dict:
+    """
+    Delete every object under the given prefixes, see delete_keys.
+
+    Args:
+        prefixes: Key prefixes to empty, each should end with "/"
+        on_progress: Called with the number of objects deleted so far
+    """
+    paginator = s3.get_paginator("list_objects_v2")
+    keys = (
+        item["Key"]
+        for prefix in prefixes
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix)
+        for item in page.get("Contents", [])
+    )
+    return delete_keys(keys, on_progress)
@@ -0,0 +1,285 @@
+"""
+Synthetic dataset for scale testing.
+
+Creates teachers with courses, sections and assignments, students enrolled in
+a few courses each with their course and assignment progress, and ratings.
+Rows are streamed into Postgres with COPY; ids are assigned here from the
+current maximum of each table, so related rows need no round-trips and the
+serial sequences are moved past them at the end. With --reset the same seed
+and scale always produce the same rows. Every user's password is
+SYNTHETIC_PASSWORD.
+
+    python -m backend.services.synthetic_data --students 1000000 --reset
+"""
+import argparse
+import io
+import random
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Any, Dict, Sequence
+
+from sqlalchemy import Connection, func, select, text, update
+
+from backend.models import (
+    Assignment,
+    AssignmentProgress,
+    Course,
+    CourseProgress,
+    Enrollment,
+    FileMetadata,
+    OurUsers,
+    Section,
+)
+from backend.models.comment import Comment
+from backend.models.rating import Rating
+from backend.roles import UserRole
+from backend.services.password_hasher import password_context
+
+SYNTHETIC_PASSWORD = "Synthetic1!"
+CATEGORIES = ["programming", "design", "marketing", "data", "languages", "music"]
+COPY_CHUNK_ROWS = 100_000
+EPOCH = datetime(2026, 1, 1)
+
+
+@dataclass
+class Scale:
+    teachers: int = 20
+    courses_per_teacher: int = 5
+    sections_per_course: int = 5
+    assignments_per_section: int = 4
+    students: int = 2000
+    enrollments_per_student: int = 5
+    completion: float = 0.3  # share of assignments a student has completed
+    rating_share: float = 0.2  # share of enrollments with a course rating
+
+
+def teacher_email(index: int) -> str:
+    return f"teacher{index}@synthetic.example.com"
+
+
+def student_email(index: int) -> str:
+    return f"student{index}@synthetic.example.com"
+
+
+def _text(value: Any) -> str:
+    """Value in COPY text format, generated strings never need escaping"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class CopyWriter:
+    """Buffers rows of one table and sends them with COPY in chunks"""
+
+    def __init__(self, cursor, model, columns: Sequence[str]):
+        self.cursor = cursor
+        self.table = model.__tablename__
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        self.statement = f"COPY {self.table} ({quoted}) FROM STDIN"
+        self.lines = []
+        self.count = 0  # rows added so far, flushed or not
+
+    def add(self, *values: Any) -> None:
+        self.lines.append("\t".join(map(_text, values)))
+        self.count += 1
+        if len(self.lines) == COPY_CHUNK_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.lines:
+            self.cursor.copy_expert(self.statement, io.StringIO("\n".join(self.lines) + "\n"))
+            self.lines = []
+
+
+def _next_id(conn: Connection, model) -> int:
+    return conn.scalar(select(func.coalesce(func.max(model.id), 0))) + 1
+
+
+def _sync_sequence(conn: Connection, model) -> None:
+    table = model.__tablename__
+    conn.execute(
+        text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+    )
+
+
+def reset(conn: Connection) -> None:
+    """Empty every table the generator writes to, and the rows that depend on them"""
+    tables = ", ".join(
+        model.__tablename__
+        for model in (
+            Comment,
+            Rating,
+            FileMetadata,
+            AssignmentProgress,
+            CourseProgress,
+            Enrollment,
+            Assignment,
+            Section,
+            Course,
+            OurUsers,
+        )
+    )
+    conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+def generate(conn: Connection, scale: Scale, seed: int = 0) -> Dict[str, int]:
+    """Insert the dataset in the connection's transaction, returns row counts per table"""
+    rng = random.Random(seed)
+    cursor = conn.connection.cursor()
+    # Hashing is the slow part of creating users, every user shares one hash
+    hashed_password = password_context.hash(SYNTHETIC_PASSWORD)
+
+    first_user = _next_id(conn, OurUsers)
+    first_course = _next_id(conn, Course)
+    first_section = _next_id(conn, Section)
+    first_assignment = _next_id(conn, Assignment)
+    first_course_progress = _next_id(conn, CourseProgress)
+    first_assignment_progress = _next_id(conn, AssignmentProgress)
+    first_rating = _next_id(conn, Rating)
+
+    course_count = scale.teachers * scale.courses_per_teacher
+    assignments_per_course = scale.sections_per_course * scale.assignments_per_section
+
+    users = CopyWriter(
+        cursor, OurUsers, ["id", "email", "first_name", "last_name", "hashed_password", "is_active", "role"]
+    )
+    for i in range(scale.teachers):
+        users.add(
+            first_user + i, teacher_email(i), f"Teacher{i}", "Synthetic",
+            hashed_password, True, UserRole.TEACHER.value,
+        )
+    first_student = first_user + scale.teachers
+    for i in range(scale.students):
+        users.add(
+            first_student + i, student_email(i), f"Student{i}", "Synthetic",
+            hashed_password, True, UserRole.STUDENT.value,
+        )
+    users.flush()
+
+    courses = CopyWriter(
+        cursor,
+        Course,
+        ["id", "title", "category", "description", "lessons_count", "lessons_duration",
+         "rating", "ratings_count", "rating_sum", "rating_average", "teacher_id"],
+    )
+    sections = CopyWriter(cursor, Section, ["id", "title", "order", "course_id"])
+    assignments = CopyWriter(
+        cursor,
+        Assignment,
+        ["id", "course_id", "section_id", "title", "description", "due_date", "teacher_comments", "order"],
+    )
+    # One pass per table so every chunk only references rows already copied
+    for c in range(course_count):
+        courses.add(
+            first_course + c, f"Course {c + 1}", rng.choice(CATEGORIES), "Synthetic course. " * 8,
+            rng.randint(5, 40), rng.randint(30, 600), 0, 0, 0, 0.0,
+            first_user + c // scale.courses_per_teacher,
+        )
+    courses.flush()
+    for i in range(course_count * scale.sections_per_course):
+        sections.add(
+            first_section + i, f"Section {i % scale.sections_per_course + 1}",
+            i % scale.sections_per_course, first_course + i // scale.sections_per_course,
+        )
+    sections.flush()
+    description = "Read the chapter and answer the questions. " * 4
+    for i in range(course_count * assignments_per_course):
+        assignments.add(
+            first_assignment + i, first_course + i // assignments_per_course,
+            first_section + i // scale.assignments_per_section,
+            f"Assignment {i % scale.assignments_per_section + 1}", description,
+            EPOCH + timedelta(days=rng.randint(1, 90)), "", i % scale.assignments_per_section,
+        )
+    assignments.flush()
+
+    enrollments = CopyWriter(cursor, Enrollment, ["user_id", "course_id"])
+    course_progress = CopyWriter(
+        cursor,
+        CourseProgress,
+        ["id", "student_id", "course_id", "completed_assignments", "total_assignments", "last_activity"],
+    )
+    assignment_progress = CopyWriter(
+        cursor,
+        AssignmentProgress,
+        ["id", "student_id", "assignment_id", "is_completed", "completed_at", "submitted_at"],
+    )
+    ratings = CopyWriter(cursor, Rating, ["id", "user_id", "course_id", "rating"])
+    per_student = min(scale.enrollments_per_student, course_count)
+    for i in range(scale.students):
+        student_id = first_student + i
+        for c in rng.sample(range(course_count), per_student):
+            course_id = first_course + c
+            enrollments.add(student_id, course_id)
+            completed = 0
+            for a in range(assignments_per_course):
+                if rng.random() < scale.completion:
+                    done_at = EPOCH + timedelta(minutes=rng.randrange(90 * 24 * 60))
+                    assignment_progress.add(
+                        first_assignment_progress + assignment_progress.count,
+                        student_id, first_assignment + c * assignments_per_course + a, True, done_at, done_at,
+                    )
+                    completed += 1
+            course_progress.add(
+                first_course_progress + course_progress.count,
+                student_id, course_id, completed, assignments_per_course, EPOCH if completed else None,
+            )
+            if rng.random() < scale.rating_share:
+                ratings.add(first_rating + ratings.count, student_id, course_id, rng.randint(1, 5))
+    for writer in (enrollments, course_progress, assignment_progress, ratings):
+        writer.flush()
+
+    # Same aggregate rate_course maintains
+    totals = (
+        select(Rating.course_id, func.count().label("count"), func.sum(Rating.rating).label("total"))
+        .where(Rating.id >= first_rating)
+        .group_by(Rating.course_id)
+        .subquery()
+    )
+    conn.execute(
+        update(Course)
+        .where(Course.id == totals.c.course_id)
+        .values(
+            ratings_count=totals.c.count,
+            rating_sum=totals.c.total,
+            rating_average=totals.c.total * 1.0 / totals.c.count,
+            rating=func.round(totals.c.total * 1.0 / totals.c.count),
+        )
+    )
+    for model in (OurUsers, Course, Section, Assignment, CourseProgress, AssignmentProgress, Rating):
+        _sync_sequence(conn, model)
+
+    return {
+        writer.table: writer.count
+        for writer in (
+            users, courses, sections, assignments, enrollments, course_progress, assignment_progress, ratings
+        )
+    }
+
+
+def main() -> None:
+    from backend.database import engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for field in fields(Scale):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type, default=field.default)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="empty the tables first, this deletes all data")
+    args = parser.parse_args()
+    scale = Scale(**{field.name: getattr(args, field.name) for field in fields(Scale)})
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        if args.reset:
+            reset(conn)
+        counts = generate(conn, scale, args.seed)
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    print(f"Generated in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,54 @@
-from datetime import datetime, timedelta
-import redis
-import os
-from backend.config import RedisSettings
-
-# Initialize Redis settings
-redis_settings = RedisSettings()
-
-# Make Redis client optional
-redis_client = None
-try:
-    redis_client = redis.Redis(
-        host=redis_settings.REDIS_HOST,
-        port=redis_settings.REDIS_PORT,
-        password=redis_settings.REDIS_PASSWORD,
-        decode_responses=True
-    )
-    # Test the connection
-    redis_client.ping()
-except (redis.ConnectionError, redis.AuthenticationError, Exception):
-    print("Warning: Redis not available. Token blacklisting will be disabled.")
-    redis_client = None
-
-def add_to_blacklist(token: str, expires_in: int) -> None:
-    if redis_client:
-        redis_client.setex(f"blacklist_token:{token}", expires_in, "1")
-
-def is_blacklisted(token: str) -> bool:
-    if redis_client:
-        return redis_client.exists(f"blacklist_token:{token}") == 1
-    return False
-
-def remove_from_blacklist(token: str) -> None:
-    if redis_client:
-        redis_client.delete(f"blacklist_token:{token}") 
\ No newline at end of file
+import time
+from typing import Dict
+
+from redis.exceptions import RedisError
+
+from backend.cache import TOKEN_REVOCATION_CHANNEL, get_redis, redis_settings, token_negative_cache
+
+# After a failed check the blacklist is skipped until this monotonic time,
+# so requests do not each wait out the connect timeout while Redis is down
+_retry_at = 0.0
+
+
+def _key(token: str) -> str:
+    return f"blacklist_token:{token}"
+
+
+async def add_to_blacklist(tokens: Dict[str, int]) -> None:
+    """Blacklist tokens (token -> seconds until it expires) in one round-trip"""
+    for token in tokens:
+        token_negative_cache.discard(token)
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for token, expires_in in tokens.items():
+                pipe.setex(_key(token), expires_in, "1")
+                # Other workers drop the token from their negative cache
+                pipe.publish(TOKEN_REVOCATION_CHANNEL, token)
+            await pipe.execute()
+    except RedisError as e:
+        print(f"Warning: Redis not available, tokens were not blacklisted: {str(e)}")
+
+
+async def is_blacklisted(token: str) -> bool:
+    # Most tokens were never revoked, those seen recently skip Redis
+    global _retry_at
+    if token_negative_cache.get(token):
+        return False
+    if time.monotonic() < _retry_at:
+        return False
+    try:
+        blacklisted = await get_redis().exists(_key(token)) == 1
+    except RedisError as e:
+        print(f"Warning: Redis not available, token blacklist not checked: {str(e)}")
+        _retry_at = time.monotonic() + redis_settings.BLACKLIST_RETRY_INTERVAL
+        return False
+    if not blacklisted:
+        token_negative_cache.set(token, True)
+    return blacklisted
+
+
+async def remove_from_blacklist(token: str) -> None:
+    try:
+        await get_redis().delete(_key(token))
+    except RedisError as e:
+        print(f"Warning: Redis not available, token not removed from blacklist: {str(e)}")
@@ -1,12 +1,15 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.models.ourusers import OurUsers
 
 
-def check_if_user_exists(db: Session, email: str, create_user_request=None):
+async def check_if_user_exists(db: AsyncSession, email: str, create_user_request=None):
     if email:  # Перевіряємо email, тільки якщо він переданий
-        existing_email = db.query(OurUsers).filter(OurUsers.email == email).first()
+        existing_email = await db.scalar(
+            select(OurUsers.id).where(OurUsers.email == email)
+        )
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Email already in use."
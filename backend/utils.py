@@ -1,18 +1,14 @@
 import os
 from typing import Optional
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-
 from backend.models import OurUsers
 from backend.roles import UserRole
-
-# Password encryption utility
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from backend.services.password_hasher import password_context
 
 
 def get_password_hash(password: str) -> str:
     """Create password hash from plain text password"""
-    return pwd_context.hash(password)
+    return password_context.hash(password)
 
 
 def create_admin_user(db: Session) -> Optional[OurUsers]:
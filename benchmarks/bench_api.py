@@ -0,0 +1,93 @@
+"""
+Per-endpoint latency with pytest-benchmark, against a database seeded with
+backend.services.synthetic_data. Not collected by the test suite, run it
+explicitly and compare runs with --benchmark-autosave / --benchmark-compare:
+
+    python -m pytest benchmarks/bench_api.py --benchmark-autosave
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+# Sets the benchmark environment before the backend reads its settings
+from benchmarks.stack import local_services
+from backend.services.synthetic_data import SYNTHETIC_PASSWORD, student_email, teacher_email
+
+
+@pytest.fixture(scope="module")
+def client():
+    with local_services():
+        from backend.main import app
+
+        with TestClient(app) as client:
+            yield client
+
+
+def login(client: TestClient, email: str) -> None:
+    client.cookies.clear()
+    response = client.post("/auth/token", json={"email": email, "password": SYNTHETIC_PASSWORD})
+    assert response.status_code == 200, response.text
+
+
+@pytest.fixture
+def student(client):
+    login(client, student_email(0))
+    return client
+
+
+@pytest.fixture
+def teacher(client):
+    login(client, teacher_email(0))
+    return client
+
+
+@pytest.fixture
+def enrolled_course_id(student):
+    return student.get("/students/enrollments/courses").json()[0]["id"]
+
+
+def test_catalog_page(benchmark, client):
+    response = benchmark(client.get, "/courses", params={"limit": 50})
+    assert response.status_code == 200
+
+
+def test_login(benchmark, client):
+    # bcrypt dominates, a few rounds are enough
+    response = benchmark.pedantic(
+        client.post,
+        args=("/auth/token",),
+        kwargs={"json": {"email": student_email(1), "password": SYNTHETIC_PASSWORD}},
+        rounds=10,
+    )
+    assert response.status_code == 200
+
+
+def test_enrolled_courses(benchmark, student):
+    response = benchmark(student.get, "/students/enrollments/courses")
+    assert response.status_code == 200
+
+
+def test_course_outline_with_progress(benchmark, student, enrolled_course_id):
+    response = benchmark(
+        student.get, f"/sections/course/{enrolled_course_id}/outline", params={"include_progress": "true"}
+    )
+    assert response.status_code == 200
+
+
+def test_assignments_with_progress(benchmark, student, enrolled_course_id):
+    response = benchmark(student.get, f"/progress/courses/{enrolled_course_id}/assignments")
+    assert response.status_code == 200
+
+
+def test_upload_course_file(benchmark, teacher):
+    course_id = teacher.get("/students/teaching/courses").json()[0]["id"]
+    payload = b"benchmark upload\n" * 16384
+
+    def upload():
+        return teacher.post(
+            "/files",
+            data={"course_id": str(course_id)},
+            files={"file": ("notes.txt", payload, "text/plain")},
+        )
+
+    response = benchmark(upload)
+    assert response.status_code == 201
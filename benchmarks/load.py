@@ -0,0 +1,240 @@
+"""
+Closed-loop load test of the main user flows.
+
+Each virtual user logs in once, then repeats its flow until the duration is
+over; throughput and latency percentiles are reported per request. Without
+--base-url the app runs in this process on top of benchmarks.stack, otherwise
+the flows run against a deployed server. Seed the database first:
+
+    python -m backend.services.synthetic_data --reset
+    python -m benchmarks.load --flow dashboard --concurrency 20 --duration 30
+    python -m benchmarks.load --flow all --output after.json
+
+Flows: catalog (anonymous course listing), login, dashboard (enrolled courses,
+course outline with progress, assignments with progress) and upload (a
+teacher uploading a course file).
+"""
+import abc
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from typing import Dict, List, Optional
+
+import httpx
+
+# Sets the benchmark environment before the backend reads its settings
+from benchmarks.stack import local_services
+from backend.services.synthetic_data import (
+    CATEGORIES,
+    SYNTHETIC_PASSWORD,
+    Scale,
+    student_email,
+    teacher_email,
+)
+
+UPLOAD_SIZE = 256 * 1024
+
+
+class Recorder:
+    """Latencies and failures per request name"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.latencies[name].append(time.perf_counter() - start)
+        if response is None or response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+async def login(client: httpx.AsyncClient, email: str) -> None:
+    response = await client.post("/auth/token", json={"email": email, "password": SYNTHETIC_PASSWORD})
+    response.raise_for_status()
+
+
+class Flow(abc.ABC):
+    def __init__(self, scale: Scale, user: int):
+        self.scale = scale
+        self.user = user
+        self.rng = random.Random(user)
+
+    async def setup(self, client: httpx.AsyncClient) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def run(self, client: httpx.AsyncClient, recorder: Recorder) -> None:
+        """One iteration of the flow, every request goes through the recorder"""
+
+
+class CatalogFlow(Flow):
+    async def run(self, client, recorder):
+        params = {"limit": 50}
+        if self.rng.random() < 0.5:
+            params["category"] = self.rng.choice(CATEGORIES)
+        await recorder.request(client, "GET /courses", "GET", "/courses", params=params)
+
+
+class LoginFlow(Flow):
+    async def run(self, client, recorder):
+        email = student_email(self.rng.randrange(self.scale.students))
+        await recorder.request(
+            client, "POST /auth/token", "POST", "/auth/token",
+            json={"email": email, "password": SYNTHETIC_PASSWORD},
+        )
+
+
+class DashboardFlow(Flow):
+    async def setup(self, client):
+        await login(client, student_email(self.user % self.scale.students))
+
+    async def run(self, client, recorder):
+        response = await recorder.request(
+            client, "GET /students/enrollments/courses", "GET", "/students/enrollments/courses"
+        )
+        if response is None or response.status_code != 200 or not response.json():
+            return
+        course_id = self.rng.choice(response.json())["id"]
+        await recorder.request(
+            client, "GET /sections/course/{course_id}/outline", "GET",
+            f"/sections/course/{course_id}/outline", params={"include_progress": "true"},
+        )
+        await recorder.request(
+            client, "GET /progress/courses/{course_id}/assignments", "GET",
+            f"/progress/courses/{course_id}/assignments",
+        )
+
+
+class UploadFlow(Flow):
+    async def setup(self, client):
+        await login(client, teacher_email(self.user % self.scale.teachers))
+        response = await client.get("/students/teaching/courses")
+        response.raise_for_status()
+        self.course_ids = [course["id"] for course in response.json()]
+        self.payload = self.rng.randbytes(UPLOAD_SIZE // 2).hex().encode()
+
+    async def run(self, client, recorder):
+        await recorder.request(
+            client, "POST /files", "POST", "/files",
+            data={"course_id": str(self.rng.choice(self.course_ids))},
+            files={"file": ("notes.txt", self.payload, "text/plain")},
+        )
+
+
+FLOWS = {
+    "catalog": CatalogFlow,
+    "login": LoginFlow,
+    "dashboard": DashboardFlow,
+    "upload": UploadFlow,
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, dict]:
+    summary = {}
+    for name, latencies in recorder.latencies.items():
+        latencies = sorted(latencies)
+        summary[name] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[name],
+            "rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
+    return summary
+
+
+def print_summary(flow: str, summary: Dict[str, dict]) -> None:
+    print(f"\n{flow}")
+    print(f"{'request':<48}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in summary.items():
+        print(
+            f"{name:<48}{row['requests']:>8}{row['errors']:>8}{row['rps']:>9.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        )
+
+
+async def run_flow(flow_class, make_client, scale: Scale, concurrency: int, duration: float) -> Dict[str, dict]:
+    recorder = Recorder()
+    async with AsyncExitStack() as stack:
+        clients = [await stack.enter_async_context(make_client()) for _ in range(concurrency)]
+        flows = [flow_class(scale, user) for user in range(concurrency)]
+        # Logins are not measured, the clock starts once every user is set up
+        await asyncio.gather(*(flow.setup(client) for flow, client in zip(flows, clients)))
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def virtual_user(flow: Flow, client: httpx.AsyncClient) -> None:
+            while time.perf_counter() < deadline:
+                await flow.run(client, recorder)
+
+        await asyncio.gather(*(virtual_user(flow, client) for flow, client in zip(flows, clients)))
+        return summarize(recorder, time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace, app=None) -> Dict[str, Dict[str, dict]]:
+    if app is not None:
+        await app.router.startup()
+        transport = httpx.ASGITransport(app=app)
+
+        def make_client():
+            return httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60)
+    else:
+        def make_client():
+            return httpx.AsyncClient(base_url=args.base_url, timeout=60)
+
+    scale = Scale(teachers=args.teachers, students=args.students)
+    flows = list(FLOWS) if args.flow == "all" else [args.flow]
+    results = {}
+    try:
+        for name in flows:
+            results[name] = await run_flow(FLOWS[name], make_client, scale, args.concurrency, args.duration)
+            print_summary(name, results[name])
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flow", choices=["all", *FLOWS], default="all")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per flow")
+    parser.add_argument("--base-url", help="run against a server instead of in-process")
+    parser.add_argument("--teachers", type=int, default=Scale.teachers, help="as seeded")
+    parser.add_argument("--students", type=int, default=Scale.students, help="as seeded")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    if args.base_url:
+        results = asyncio.run(run(args))
+    else:
+        with local_services():
+            from backend.main import app
+
+            results = asyncio.run(run(args, app))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
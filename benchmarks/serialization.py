@@ -0,0 +1,91 @@
+"""
+Per-request serialization cost of a large assignment list.
+
+Compares the previous path of GET /courses/{course_id}/assignments, where
+handlers build models from dicts and FastAPI validates them again against
+response_model before encoding with the stdlib json module, with the current
+path, which validates once and encodes with TypeAdapter.dump_json.
+
+Run from the repository root:
+
+    python -m benchmarks.serialization --assignments 2000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend.schemas.assignment import AssignmentResponse
+
+adapter = TypeAdapter(List[AssignmentResponse])
+
+
+def make_rows(count: int) -> List[dict]:
+    """Assignment dicts as the handler builds them from ORM rows"""
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": i,
+            "course_id": 1,
+            "section_id": i // 20,
+            "title": f"Assignment {i}",
+            "description": "Read the chapter and answer the questions. " * 4,
+            "due_date": now + timedelta(days=i % 30),
+            "teacher_comments": "",
+            "order": i % 20,
+            "created_at": now,
+            "updated_at": now,
+            "files": [
+                {
+                    "key": f"assignments/{i}/task/{i:032x}_task.pdf",
+                    "size": 1024 * i,
+                    "last_modified": now,
+                    "filename": f"{i:032x}_task.pdf",
+                }
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def before(rows: List[dict]) -> bytes:
+    # Handler builds models, FastAPI re-validates them for response_model,
+    # dumps to JSON-compatible python and JSONResponse encodes with json
+    models = [AssignmentResponse(**row) for row in rows]
+    content = adapter.dump_python(adapter.validate_python(models), mode="json")
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode()
+
+
+def after(rows: List[dict]) -> bytes:
+    # Validated once, encoded by pydantic-core, returned as a raw Response
+    models = [AssignmentResponse(**row) for row in rows]
+    return adapter.dump_json(models)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--assignments", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.assignments)
+    assert json.loads(before(rows)) == json.loads(after(rows))
+
+    print(f"{args.assignments} assignments, best of {args.repeat} x {args.number} calls")
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        best = min(timeit.repeat(lambda: fn(rows), repeat=args.repeat, number=args.number))
+        results[name] = best / args.number * 1000
+        print(f"  {name:<7} {results[name]:8.2f} ms/request")
+    print(f"  speedup {results['before'] / results['after']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
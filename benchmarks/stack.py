@@ -0,0 +1,58 @@
+"""
+Local stand-ins for the services the API depends on.
+
+Postgres is the real thing, configured through the usual POSTGRES_* variables.
+Redis is replaced by a fakeredis server on a free local port and S3 by moto,
+both inside the benchmark process. Import this module before any backend
+module so the defaults below are in place when the settings are read, and
+import the app after entering local_services() so it picks up the Redis
+address.
+"""
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+BENCHMARK_ENVIRONMENT = {
+    # Benchmark users log in far more often than the limits allow
+    "RATE_LIMIT_ENABLED": "false",
+    "DB_ECHO": "false",
+    "ACCESS_KEY_ID": "benchmark",
+    "SECRET_ACCESS_KEY": "benchmark",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "BUCKET_NAME": "benchmark",
+    # Replaced by local_services()
+    "REDIS_HOST": "127.0.0.1",
+    "REDIS_PORT": "6379",
+    "REDIS_PASSWORD": "",
+}
+for name, value in BENCHMARK_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_services() -> Iterator[None]:
+    import boto3
+    from fakeredis import TcpFakeServer
+    from moto import mock_aws
+
+    port = _free_port()
+    redis_server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    thread = threading.Thread(target=redis_server.serve_forever, daemon=True)
+    thread.start()
+    os.environ.update(REDIS_HOST="127.0.0.1", REDIS_PORT=str(port), REDIS_PASSWORD="")
+
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket=os.environ["BUCKET_NAME"])
+        try:
+            yield
+        finally:
+            redis_server.shutdown()
+            redis_server.server_close()
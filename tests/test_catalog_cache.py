@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+from redis.exceptions import RedisError
+
+from backend import cache
+from backend.cache import CATALOG_CACHE_KEY, get_catalog, invalidate_catalog, set_catalog
+from backend.controllers import courses
+from backend.schemas.rating import RatingCreate
+
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        raise RedisError("down")
+
+
+def test_invalidate_drops_every_page(monkeypatch):
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis()
+        monkeypatch.setattr(cache, "get_redis", lambda: redis)
+        await set_catalog("50:None:None:None", b"first")
+        await set_catalog("50:50:math:None", b"second")
+        assert await get_catalog("50:None:None:None") == b"first"
+        assert await redis.ttl(CATALOG_CACHE_KEY) > 0
+
+        await invalidate_catalog()
+
+        assert await get_catalog("50:None:None:None") is None
+        assert await get_catalog("50:50:math:None") is None
+        assert not await redis.exists(CATALOG_CACHE_KEY)
+
+    asyncio.run(scenario())
+
+
+def test_ttl_counts_from_first_page(monkeypatch):
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis()
+        monkeypatch.setattr(cache, "get_redis", lambda: redis)
+        await set_catalog("a", b"1")
+        await redis.expire(CATALOG_CACHE_KEY, 5)
+        await set_catalog("b", b"2")
+        assert await redis.ttl(CATALOG_CACHE_KEY) <= 5
+
+    asyncio.run(scenario())
+
+
+def test_redis_errors_are_not_raised(monkeypatch):
+    monkeypatch.setattr(cache, "get_redis", lambda: BrokenRedis())
+
+    async def scenario():
+        assert await get_catalog("a") is None
+        await set_catalog("a", b"1")
+        await invalidate_catalog()
+
+    asyncio.run(scenario())
+
+
+def test_rating_invalidates_after_commit(monkeypatch):
+    calls = []
+
+    class Session:
+        async def scalar(self, stmt):
+            return SimpleNamespace(id=1)
+
+        async def commit(self):
+            calls.append("commit")
+
+    async def save_rating(db, user_id, course_id, rating):
+        calls.append(("save", user_id, course_id, rating))
+
+    async def invalidate():
+        calls.append("invalidate")
+
+    monkeypatch.setattr(courses.rating_service, "save_rating", save_rating)
+    monkeypatch.setattr(courses, "invalidate_catalog", invalidate)
+
+    asyncio.run(courses.rate_course(1, RatingCreate(rating=4), {"user_id": 7}, Session()))
+
+    assert calls == [("save", 7, 1, 4), "commit", "invalidate"]
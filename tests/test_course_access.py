@@ -0,0 +1,112 @@
+import asyncio
+
+import fakeredis.aioredis
+from redis.exceptions import RedisError
+
+from backend.services import course_access
+from backend.services.course_access import (
+    CourseAccess,
+    get_course_access,
+    grant_enrollment,
+    revoke_enrollment,
+)
+
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        raise RedisError("down")
+
+
+def use_redis(monkeypatch, redis, memberships):
+    """Serve lookups from ``redis`` and rebuilds from the ``memberships`` dict"""
+    loads = []
+
+    async def load(db, user_id):
+        loads.append(user_id)
+        return {**memberships, course_access.LOADED_FIELD: 1}
+
+    monkeypatch.setattr(course_access, "get_redis", lambda: redis)
+    monkeypatch.setattr(course_access, "_load_memberships", load)
+    monkeypatch.setattr(course_access, "_stale_keys", set())
+    return loads
+
+
+def test_lookup_rebuilds_once(monkeypatch):
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis()
+        loads = use_redis(monkeypatch, redis, {"student:1": 1, "teacher:2": 1})
+
+        assert await get_course_access(None, 7, 1) == CourseAccess(False, True)
+        assert await get_course_access(None, 7, 2) == CourseAccess(True, False)
+        assert await get_course_access(None, 7, 3) == CourseAccess(False, False)
+        assert loads == [7]
+
+    asyncio.run(scenario())
+
+
+def test_grant_and_revoke_update_cached_memberships(monkeypatch):
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis()
+        loads = use_redis(monkeypatch, redis, {})
+
+        assert await get_course_access(None, 7, 1) == CourseAccess(False, False)
+        await grant_enrollment([7], 1)
+        assert await get_course_access(None, 7, 1) == CourseAccess(False, True)
+        assert await redis.get("access:version:7") == b"1"
+        assert loads == [7]
+
+        await revoke_enrollment([7], 1)
+        assert not await redis.exists("access:user:7")
+        assert await redis.get("access:version:7") == b"2"
+        assert await get_course_access(None, 7, 1) == CourseAccess(False, False)
+        assert loads == [7, 7]
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_racing_with_revoke_is_not_cached(monkeypatch):
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis()
+        monkeypatch.setattr(course_access, "get_redis", lambda: redis)
+        monkeypatch.setattr(course_access, "_stale_keys", set())
+
+        async def load(db, user_id):
+            # Read before the enrollment is deleted, revoked before caching
+            await revoke_enrollment([user_id], 1)
+            return {"student:1": 1, course_access.LOADED_FIELD: 1}
+
+        monkeypatch.setattr(course_access, "_load_memberships", load)
+        await get_course_access(None, 7, 1)
+
+        assert not await redis.exists("access:user:7")
+
+    asyncio.run(scenario())
+
+
+def test_failed_invalidation_marks_key_stale(monkeypatch):
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis()
+        loads = use_redis(monkeypatch, redis, {"student:1": 1})
+        assert await get_course_access(None, 7, 1) == CourseAccess(False, True)
+
+        monkeypatch.setattr(course_access, "get_redis", lambda: BrokenRedis())
+        await revoke_enrollment([7], 1)
+        assert course_access._stale_keys == {"access:user:7"}
+
+        # The next lookup drops the stale hash before reading it
+        monkeypatch.setattr(course_access, "get_redis", lambda: redis)
+        await get_course_access(None, 7, 1)
+        assert course_access._stale_keys == set()
+        assert loads == [7, 7]
+
+    asyncio.run(scenario())
+
+
+def test_falls_back_to_database_without_redis(monkeypatch):
+    async def query(db, user_id, course_id):
+        return CourseAccess(True, False)
+
+    monkeypatch.setattr(course_access, "get_redis", lambda: BrokenRedis())
+    monkeypatch.setattr(course_access, "_query_access", query)
+
+    assert asyncio.run(get_course_access(None, 7, 1)) == CourseAccess(True, False)
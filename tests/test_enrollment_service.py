@@ -0,0 +1,33 @@
+from backend.services import enrollment_service
+from backend.services.enrollment_service import entry_results, parse_csv
+
+
+def test_parse_csv_skips_known_header_only():
+    assert parse_csv(b"\xef\xbb\xbfemail\r\na@example.com\r\n12\r\n") == ["a@example.com", 12]
+    assert parse_csv(b"User_ID,name\n7,Ann\n\n8,Bob\n") == [7, 8]
+    # Anything else in the first row is an entry, reported as invalid later
+    assert parse_csv(b"students\n7\n") == ["students", 7]
+    assert parse_csv(b"") == []
+
+
+def test_entry_results_statuses():
+    users = [
+        (1, "new@example.com", "student"),
+        (2, "old@example.com", "student"),
+        (3, "teacher@example.com", "teacher"),
+    ]
+    entries = [1, "old@example.com", "new@example.com", 3, 99, "missing@example.com", "nobody", 0, 2**31]
+
+    results = entry_results(entries, users, enrolled_ids={1})
+
+    assert [(r.value, r.user_id, r.status) for r in results] == [
+        ("1", 1, enrollment_service.ENROLLED),
+        ("old@example.com", 2, enrollment_service.ALREADY_ENROLLED),
+        ("new@example.com", 1, enrollment_service.DUPLICATE),
+        ("3", 3, enrollment_service.INVALID),
+        ("99", None, enrollment_service.NOT_FOUND),
+        ("missing@example.com", None, enrollment_service.NOT_FOUND),
+        ("nobody", None, enrollment_service.INVALID),
+        ("0", None, enrollment_service.INVALID),
+        (str(2**31), None, enrollment_service.INVALID),
+    ]
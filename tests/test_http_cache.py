@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from fastapi import Request
+
+from backend.models import Assignment, Course
+from backend.services.http_cache import (
+    Validators,
+    changes,
+    etag_matches,
+    is_not_modified,
+    load_validators,
+)
+
+ETAG = 'W/"abc"'
+LAST_MODIFIED = datetime(2026, 3, 1, 12, 0, 0, 750000, tzinfo=timezone.utc)
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class FakeSession:
+    """Returns fixed (max updated_at, count) rows for the union of sources"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, statement):
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+def validators_for(rows, vary=None) -> Validators:
+    return asyncio.run(
+        load_validators(FakeSession(rows), changes(Course), changes(Assignment), vary=vary)
+    )
+
+
+def test_etag_matches_weakly_and_in_lists():
+    assert not etag_matches(make_request(), ETAG)
+    assert etag_matches(make_request(if_none_match='"abc"'), ETAG)
+    assert etag_matches(make_request(if_none_match='W/"x", W/"abc"'), ETAG)
+    assert etag_matches(make_request(if_none_match=" * "), ETAG)
+    assert not etag_matches(make_request(if_none_match='W/"abcd"'), ETAG)
+
+
+def test_if_none_match_takes_precedence():
+    validators = Validators(ETAG, LAST_MODIFIED)
+    current = "Sun, 01 Mar 2026 12:00:00 GMT"
+
+    assert is_not_modified(make_request(if_modified_since=current), validators)
+    assert not is_not_modified(
+        make_request(if_none_match='W/"old"', if_modified_since=current), validators
+    )
+
+
+def test_if_modified_since_has_second_precision():
+    validators = Validators(ETAG, LAST_MODIFIED)
+
+    assert is_not_modified(make_request(if_modified_since="Sun, 01 Mar 2026 12:00:00 GMT"), validators)
+    assert not is_not_modified(make_request(if_modified_since="Sun, 01 Mar 2026 11:59:59 GMT"), validators)
+    assert not is_not_modified(make_request(if_modified_since="not a date"), validators)
+    # Without a modification time only the ETag can validate
+    assert not is_not_modified(
+        make_request(if_modified_since="Sun, 01 Mar 2026 12:00:00 GMT"), Validators(ETAG, None)
+    )
+
+
+def test_load_validators():
+    earlier = LAST_MODIFIED - timedelta(days=1)
+    rows = [(earlier, 3), (LAST_MODIFIED, 2)]
+
+    validators = validators_for(rows)
+
+    assert validators.last_modified == LAST_MODIFIED
+    assert validators.etag.startswith('W/"')
+    assert validators_for(list(reversed(rows))) == validators
+    # A deletion changes the count but not the latest updated_at
+    assert validators_for([(earlier, 3), (LAST_MODIFIED, 1)]).etag != validators.etag
+    assert validators_for(rows, vary=7).etag != validators.etag
+    assert validators_for([(None, 0)]).last_modified is None
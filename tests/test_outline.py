@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from backend.controllers.sections import build_outline
+
+
+def assignment(id, section_id, order):
+    return SimpleNamespace(id=id, section_id=section_id, order=order, title=f"A{id}", due_date=None)
+
+
+SECTIONS = [
+    SimpleNamespace(id=2, title="Second", order=2),
+    SimpleNamespace(id=1, title="First", order=1),
+]
+ASSIGNMENTS = [
+    assignment(10, 1, 2),
+    assignment(11, 1, 1),
+    assignment(12, 2, 1),
+    assignment(13, None, 1),
+    assignment(14, None, 1),
+]
+
+
+def test_outline_groups_assignments_by_section():
+    outline = build_outline(5, SECTIONS, ASSIGNMENTS, progress=None)
+
+    assert [(s.id, [a.id for a in s.assignments]) for s in outline.sections] == [(1, [11, 10]), (2, [12])]
+    assert [a.id for a in outline.unsectioned] == [13, 14]
+    assert all(a.is_completed is None and a.score is None for a in outline.unsectioned)
+
+
+def test_outline_progress_overlay():
+    progress = {
+        11: SimpleNamespace(is_completed=True, score=9.5),
+        13: SimpleNamespace(is_completed=False, score=None),
+    }
+
+    outline = build_outline(5, SECTIONS, ASSIGNMENTS, progress)
+
+    items = {a.id: a for s in outline.sections for a in s.assignments}
+    items.update((a.id, a) for a in outline.unsectioned)
+    assert (items[11].is_completed, items[11].score) == (True, 9.5)
+    assert (items[10].is_completed, items[10].score) == (False, None)
+    assert (items[13].is_completed, items[14].is_completed) == (False, False)
@@ -0,0 +1,58 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from backend.dependencies.pagination import CoursePageParams
+from backend.models import Course
+from backend.models.enrollment import Enrollment
+
+
+def page(limit=50, after_id=None, category=None, teacher_id=None):
+    return CoursePageParams(limit=limit, after_id=after_id, category=category, teacher_id=teacher_id)
+
+
+def compiled(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_first_page_has_no_cursor_filter():
+    sql = compiled(page(limit=3).apply(select(Course.id)))
+
+    assert "WHERE" not in sql
+    assert sql.endswith("ORDER BY courses.id \n LIMIT 3")
+
+
+def test_cursor_and_filters():
+    sql = compiled(page(limit=10, after_id=42, category="math", teacher_id=7).apply(select(Course.id)))
+
+    assert "courses.category = 'math'" in sql
+    assert "courses.teacher_id = 7" in sql
+    assert "courses.id > 42" in sql
+    assert sql.endswith("ORDER BY courses.id \n LIMIT 10")
+
+
+def test_cursor_zero_is_applied():
+    sql = compiled(page(after_id=0).apply(select(Course.id)))
+
+    assert "courses.id > 0" in sql
+
+
+def test_custom_key_column():
+    stmt = select(Course.id).join(Enrollment, Enrollment.course_id == Course.id)
+    sql = compiled(page(limit=5, after_id=3).apply(stmt, key_column=Enrollment.course_id))
+
+    assert "enrollment.course_id > 3" in sql
+    assert "courses.id > 3" not in sql
+    assert sql.endswith("ORDER BY enrollment.course_id \n LIMIT 5")
+
+
+def test_cache_key_distinguishes_pages_and_filters():
+    keys = {
+        page().cache_key,
+        page(after_id=50).cache_key,
+        page(limit=20).cache_key,
+        page(category="math").cache_key,
+        page(teacher_id=7).cache_key,
+    }
+
+    assert len(keys) == 5
+    assert page(after_id=50, category="math").cache_key == page(after_id=50, category="math").cache_key
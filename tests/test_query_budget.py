@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.services import query_budget
+from backend.services.instrumentation import RequestStats, current_request_stats, instrument_engine
+
+
+def run_request(statements):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    stats = RequestStats(track_statements=True)
+    token = current_request_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            for statement, params in statements:
+                conn.execute(text(statement), params)
+    finally:
+        current_request_stats.reset(token)
+    return stats
+
+
+def test_repeated_statement_is_reported():
+    stats = run_request([("SELECT :id", {"id": i}) for i in range(5)])
+
+    assert stats.db_queries == 5
+    assert query_budget.query_budget_problems(stats, None, repeat_threshold=5) == ["5x SELECT ?"]
+
+
+def test_declared_budget_overrides_default(monkeypatch):
+    stats = run_request([("SELECT 1", {}), ("SELECT 2", {}), ("SELECT 3", {})])
+    stats.query_budget = 2
+    monkeypatch.setattr(query_budget.query_budget_settings, "QUERY_BUDGET_MODE", "raise")
+    monkeypatch.setattr(query_budget.query_budget_settings, "QUERY_BUDGET_DEFAULT", 10)
+
+    with pytest.raises(query_budget.QueryBudgetExceeded, match="3 queries, budget is 2"):
+        query_budget.enforce_query_budget("GET", "/items", stats)
+
+    stats.query_budget = 3
+    query_budget.enforce_query_budget("GET", "/items", stats)
@@ -0,0 +1,45 @@
+import asyncio
+
+from fastapi import Request
+
+from backend.dependencies import rate_limit
+from backend.dependencies.rate_limit import RateLimiter, _submitted_email
+
+
+def make_request(query: bytes = b"", body: bytes = b"", content_type: str = "") -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    headers = [(b"content-type", content_type.encode())] if content_type else []
+    scope = {"type": "http", "method": "POST", "path": "/", "query_string": query, "headers": headers}
+    return Request(scope, receive)
+
+
+def submitted_email(**kwargs):
+    return asyncio.run(_submitted_email(make_request(**kwargs)))
+
+
+def test_local_window_slides(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    limiter = RateLimiter("test", limit=3, window=10)
+
+    counts = []
+    for now[0] in (0.0, 1.0, 2.0):
+        counts.append(limiter._hit_local("a"))
+    assert counts == [1, 2, 3]
+
+    # The hit at 0 has left the window, the others are still in it
+    now[0] = 10.5
+    assert limiter._hit_local("a") == 3
+    now[0] = 12.0
+    assert limiter._hit_local("a") == 2
+    assert limiter._hit_local("b") == 1
+
+
+def test_submitted_email():
+    assert submitted_email(query=b"email=a%40example.com") == "a@example.com"
+    assert submitted_email(body=b'{"email": "b@example.com"}', content_type="application/json") == "b@example.com"
+    assert submitted_email(body=b'{"email": 5}', content_type="application/json") is None
+    assert submitted_email(body=b"not json", content_type="application/json") is None
+    assert submitted_email(body=b"email=c@example.com", content_type="application/x-www-form-urlencoded") is None
@@ -0,0 +1,23 @@
+from backend.services.rating_service import rating_delta
+
+
+def test_new_vote_adds_to_count_and_sum():
+    assert rating_delta(None, 4) == (1, 4)
+
+
+def test_changed_vote_only_moves_the_sum():
+    assert rating_delta(4, 2) == (0, -2)
+    assert rating_delta(2, 5) == (0, 3)
+    assert rating_delta(3, 3) == (0, 0)
+
+
+def test_deltas_keep_the_aggregate_consistent():
+    votes = {}
+    count = total = 0
+    for user_id, rating in [(1, 5), (2, 3), (1, 2), (3, 4), (2, 3), (1, 1)]:
+        count_delta, sum_delta = rating_delta(votes.get(user_id), rating)
+        votes[user_id] = rating
+        count += count_delta
+        total += sum_delta
+
+    assert (count, total) == (len(votes), sum(votes.values()))